@@ -1,27 +1,114 @@
+import http.client
 import json
+import os
 import sys
+import tempfile
+import threading
 
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from urllib.request import Request, urlopen
+from urllib.parse import urljoin, urlsplit
 
 REPO = Path(__file__).absolute().parent.parent
 sys.path.append(str(REPO / "src"))
 from manage.verutils import Version
 
 
+NUGET_SOURCE = os.getenv("NUGET_SOURCE", "https://api.nuget.org/v3/index.json")
+
+# Responses are kept here between runs and revalidated with conditional
+# requests. Set NUGET_CACHE to an empty string to disable caching.
+NUGET_CACHE = os.getenv("NUGET_CACHE", str(Path(tempfile.gettempdir()) / "pymanager-nuget-cache"))
+
+# Number of package metadata requests to make at once
+NUGET_WORKERS = int(os.getenv("NUGET_WORKERS", "8"))
+
+# (url, status) for each request, for the summary
+REQUESTS = []
+
+# Each thread keeps its own connection to each host
+_CONNECTIONS = threading.local()
+
+
+def _get_connection(scheme, netloc, reconnect=False):
+    try:
+        conns = _CONNECTIONS.conns
+    except AttributeError:
+        conns = _CONNECTIONS.conns = {}
+    conn = conns.get((scheme, netloc))
+    if conn is None or reconnect:
+        if conn is not None:
+            conn.close()
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = conns[scheme, netloc] = cls(netloc, timeout=60)
+    return conn
+
+
+def _request(url, method, headers, redirects=5):
+    parts = urlsplit(url)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    for attempt in range(2):
+        conn = _get_connection(parts.scheme, parts.netloc, reconnect=attempt > 0)
+        try:
+            conn.request(method, path, headers=headers)
+            r = conn.getresponse()
+            body = r.read()
+            break
+        except (ConnectionError, http.client.HTTPException):
+            # The server may have closed an idle connection, so retry once
+            # on a new one.
+            if attempt:
+                raise
+    if r.status in (301, 302, 303, 307, 308) and redirects:
+        return _request(urljoin(url, r.getheader("Location")), method, headers, redirects - 1)
+    REQUESTS.append((url, r.status))
+    return r, body
+
+
+def _cache_file(url):
+    if not NUGET_CACHE:
+        return None
+    from hashlib import sha256
+    return Path(NUGET_CACHE) / (sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
 # Like Invoke-RestMethod in PowerShell
 def irm(url, method="GET", headers={}):
     headers = {
-        "Accepts": "application/json",
+        "Accept": "application/json",
         **headers,
     }
-    req = Request(url, method=method, headers=headers)
-    with urlopen(req) as r:
-        return json.load(r)
-
-
-NUGET_SOURCE = "https://api.nuget.org/v3/index.json"
+    cache = _cache_file(url) if method == "GET" else None
+    cached = None
+    if cache:
+        try:
+            cached = json.loads(cache.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass
+        else:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last-modified"):
+                headers["If-Modified-Since"] = cached["last-modified"]
+    r, body = _request(url, method, headers)
+    if r.status == 304 and cached:
+        return cached["data"]
+    if r.status != 200:
+        raise OSError(f"{method} {url} failed: {r.status} {r.reason}")
+    data = json.loads(body)
+    etag, last_modified = r.getheader("ETag"), r.getheader("Last-Modified")
+    if cache and (etag or last_modified):
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_name(f"{cache.name}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({
+            "url": url,
+            "etag": etag,
+            "last-modified": last_modified,
+            "data": data,
+        }), encoding="utf-8")
+        tmp.replace(cache)
+    return data
 
 # Earlier versions than this go into "legacy.json"
 CURRENT_VERSION = Version("3.11")
@@ -480,6 +567,22 @@ SCHEMA = {
 }
 
 
+def write_json(file, data):
+    with open(file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=INDENT)
+    # Pre-compressed copies allow servers to send encoded responses.
+    # Signatures are always checked against the original file.
+    import gzip
+    raw = file.read_bytes()
+    file.with_name(file.name + ".gz").write_bytes(gzip.compress(raw, mtime=0))
+    try:
+        from compression import zstd
+    except ImportError:
+        pass
+    else:
+        file.with_name(file.name + ".zst").write_bytes(zstd.compress(raw))
+
+
 class NoSubstitution(Exception):
     pass
 
@@ -514,8 +617,15 @@ BASE_URL = RESOURCES["PackageBaseAddress/3.0.0"].rstrip("/")
 INDEX_OLD = {"versions": []}
 INDEX_CURRENT = {"versions": [], "next": ""}
 
+with ThreadPoolExecutor(max_workers=NUGET_WORKERS) as pool:
+    PACKAGES = dict(zip(SCHEMA, pool.map(lambda n: irm(f"{BASE_URL}/{n}/index.json"), SCHEMA)))
+
+print("Made {} requests ({} not modified)".format(
+    len(REQUESTS), sum(1 for _, status in REQUESTS if status == 304)
+), file=sys.stderr)
+
 for name, schema in SCHEMA.items():
-    data = irm(f"{BASE_URL}/{name}/index.json")
+    data = PACKAGES[name]
 
     all_versions = sorted((Version(ver) for ver in data["versions"]), reverse=True)
 
@@ -547,10 +657,8 @@ for file in map(Path, sys.argv[1:]):
     legacy_name = f"{file.stem}-legacy.json"
     INDEX_CURRENT["next"] = legacy_name
     file.parent.mkdir(exist_ok=True, parents=True)
-    with open(file, "w", encoding="utf-8") as f:
-        json.dump(INDEX_CURRENT, f, indent=INDENT)
-    with open(file.with_name(legacy_name), "w", encoding="utf-8") as f:
-        json.dump(INDEX_OLD, f, indent=INDENT)
+    write_json(file, INDEX_CURRENT)
+    write_json(file.with_name(legacy_name), INDEX_OLD)
 
 
 if not sys.argv[1:]:
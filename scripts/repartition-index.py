@@ -2,12 +2,14 @@ import contextlib
 import json
 import re
 import sys
+import time
 
 from pathlib import Path
 
 REPO = Path(__file__).absolute().parent.parent
 sys.path.append(str(REPO / "src"))
 
+from manage.indexutils import Index
 from manage.urlutils import IndexDownloader
 from manage.tagutils import CompanyTag, tag_or_range
 from manage.verutils import Version
@@ -17,10 +19,15 @@ def usage():
     print("Usage: repartition-index.py [-i options <FILENAME> ...] [options <OUTPUT> ...]")
     print()
     print("  --windows-default  Implies default output files and configurations.")
+    print("  --manifest <FILENAME>")
+    print("                     Also write a manifest listing each output as a shard")
+    print("  --incremental      Merge inputs into the existing outputs and only rewrite")
+    print("                     outputs whose content has changed")
     print()
     print("  -i <FILENAME>      One or more files or URLs to read existing entries from.")
     print("  -i -n/--no-recurse Do not follow 'next' info")
     print("If no files are provided, uses the current online index")
+    print("All inputs are read concurrently.")
     print()
     print("  <OUTPUT>           Filename to write entries into")
     print("  -d/--allow-dup     Include entries written in previous outputs")
@@ -29,11 +36,19 @@ def usage():
     print("  -t/--tag TAG       Include only the specified tags (comma-separated)")
     print("  -r/--range RANGE   Include only the specified range (comma-separated)")
     print("  --latest-micro     Include only the latest x.y.z version")
-    print("  --report           Write plain-text summary report")
+    print("  --report           Write plain-text summary report, including timings")
     print()
+    print("The outputs are linked by 'next' so that every client can read them in")
+    print("order. Newer clients that are given the manifest only read the outputs")
+    print("that contain the tags they need.")
+    print()
+    print("Each output is also written as .gz and (if supported) .zst files.")
     print("An output of 'nul' is permitted to drop entries.")
     print("Providing the same inputs and outputs is permitted, as all inputs are read")
     print("before any outputs are written.")
+    print()
+    print("With --incremental, entries in the existing outputs are kept unless an input")
+    print("has an entry with the same ID and sort-version, which replaces it.")
     sys.exit(1)
 
 
@@ -51,17 +66,100 @@ class ReadFile:
             return False
         raise ValueError("Unknown argument: " + arg)
 
-    def execute(self, versions, context):
-        for _, data in IndexDownloader(None, self.source, lambda *a: a):
+    def _validate(self, url, data):
+        # Check every entry up front, as clients only validate what they use
+        Index(url, data, strict=True)
+        return data
+
+    def load(self):
+        versions = []
+        for data in IndexDownloader(None, self.source, self._validate):
             versions.extend(data["versions"])
             if not self.recurse:
                 break
+        return versions
+
+    def execute(self, versions, context):
+        versions.extend(self.load())
+
+
+class ReadFiles:
+    def __init__(self, readers):
+        self.readers = readers
+
+    def __str__(self):
+        return "Read {} input(s)".format(len(self.readers))
+
+    def execute(self, versions, context):
+        if len(self.readers) == 1:
+            versions.extend(self.readers[0].load())
+            return
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(len(self.readers), 8)) as pool:
+            # map() preserves input order, so earlier inputs still take
+            # precedence when outputs are deduplicated.
+            for loaded in pool.map(lambda r: r.load(), self.readers):
+                versions.extend(loaded)
+
+
+def _entry_key(i):
+    return i["id"].casefold(), i["sort-version"].casefold()
+
+
+class MergePrevious:
+    def __init__(self, targets):
+        self.targets = targets
+
+    def __str__(self):
+        return "Merge previous outputs"
+
+    def _load(self, target):
+        file = Path(target)
+        if file.match("nul") or file.match("stdout"):
+            return []
+        try:
+            with open(file, "rb") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        return data.get("versions", [])
+
+    def execute(self, versions, context):
+        merged = {}
+        for target in self.targets:
+            for i in self._load(target):
+                merged.setdefault(_entry_key(i), i)
+        previous = len(merged)
+        added = changed = 0
+        seen = set()
+        for i in versions:
+            k = _entry_key(i)
+            if k in seen:
+                # Only the first input providing an entry is used, which
+                # matches how non-incremental outputs are deduplicated.
+                continue
+            seen.add(k)
+            old = merged.get(k)
+            if old is None:
+                added += 1
+            elif old != i:
+                changed += 1
+            else:
+                continue
+            merged[k] = i
+        versions[:] = merged.values()
+        print("Merged {} previous entries with {} new and {} changed entries".format(
+            previous, added, changed
+        ))
 
 
 class SortVersions:
     def __init__(self):
         pass
 
+    def __str__(self):
+        return "Sort entries"
+
     def add_arg(self, arg):
         raise ValueError("Unknown argument: " + arg)
 
@@ -98,6 +196,9 @@ class SplitToFile:
         self.latest_micro = False
         self.report = False
 
+    def __str__(self):
+        return "Split to {}".format(self.target)
+
     def add_arg(self, arg):
         if arg[:1] != "-":
             if self._expect_tag_or_range:
@@ -148,7 +249,7 @@ class SplitToFile:
         latest_micro_skip = set()
 
         for i in versions:
-            k = i["id"].casefold(), i["sort-version"].casefold()
+            k = _entry_key(i)
             v = Version(i["sort-version"])
             if self.only_dup and k not in written_now:
                 written_now.add(k)
@@ -175,6 +276,8 @@ class SplitToFile:
 class WriteFiles:
     def __init__(self):
         self.indent = None
+        self.manifest = None
+        self.incremental = False
 
     def add_arg(self, arg):
         if arg == "-w-indent":
@@ -197,6 +300,66 @@ class WriteFiles:
             with open(file, "w", encoding="utf-8") as f:
                 yield f
 
+    def write_compressed(self, file):
+        # Pre-compressed copies allow servers to send encoded responses.
+        # Signatures are always checked against the original file.
+        file = Path(file)
+        if file.match("nul") or file.match("stdout"):
+            return
+        import gzip
+        data = file.read_bytes()
+        with open(file.with_name(file.name + ".gz"), "wb") as f:
+            f.write(gzip.compress(data, mtime=0))
+        try:
+            from compression import zstd
+        except ImportError:
+            print("zstd is not available, so", file.name + ".zst", "was not written")
+        else:
+            with open(file.with_name(file.name + ".zst"), "wb") as f:
+                f.write(zstd.compress(data))
+
+    def write_json(self, file, data):
+        """Writes 'data' to 'file' and its compressed copies, and returns
+        True. When incremental, returns False without writing anything if
+        the file already contains the same content.
+        """
+        text = json.dumps(data, indent=self.indent)
+        path = Path(file)
+        if self.incremental and not path.match("nul") and not path.match("stdout"):
+            try:
+                unchanged = path.read_text(encoding="utf-8") == text
+            except OSError:
+                unchanged = False
+            if unchanged and path.with_name(path.name + ".gz").is_file():
+                return False
+        with self.open(file) as f:
+            f.write(text)
+        self.write_compressed(file)
+        return True
+
+    def write_manifest(self, output_order, outputs):
+        shards = []
+        for target in output_order:
+            tags = {}
+            for i in outputs[target]:
+                for t in [i["tag"], *i.get("install-for", ())]:
+                    tag = str(CompanyTag(i["company"], t))
+                    tags.setdefault(tag.casefold(), tag)
+            shards.append({
+                "url": target,
+                "install-for": list(tags.values()),
+            })
+        # An empty 'versions' list keeps the manifest readable as a normal feed
+        data = {"versions": [], "shards": shards}
+        # Check that clients will accept the manifest
+        Index(self.manifest, data, strict=True)
+        if self.write_json(self.manifest, data):
+            print("Wrote {} ({} shards, {})".format(
+                self.manifest, len(shards), self.st_size(self.manifest)
+            ))
+        else:
+            print("Unchanged {} ({} shards)".format(self.manifest, len(shards)))
+
     def st_size(self, file):
         file = Path(file)
         if file.match("nul"):
@@ -206,6 +369,7 @@ class WriteFiles:
         return f"{Path(file).stat().st_size} bytes"
 
     def execute(self, versions, context):
+        start = time.perf_counter()
         outputs = context.get("outputs") or {}
         output_order = context.get("output_order", [])
         report_data = {}
@@ -217,12 +381,17 @@ class WriteFiles:
                 data["next"] = next_target
             for i in outputs[target]:
                 report_data.setdefault(target, {}).setdefault(i["sort-version"].casefold(), []).append(i)
-            with self.open(target) as f:
-                json.dump(data, f, indent=self.indent)
-            print("Wrote {} ({} entries, {} bytes)".format(
-                target, len(data["versions"]), self.st_size(target)
-            ))
+            if self.write_json(target, data):
+                print("Wrote {} ({} entries, {})".format(
+                    target, len(data["versions"]), self.st_size(target)
+                ))
+            else:
+                print("Unchanged {} ({} entries)".format(target, len(data["versions"])))
 
+        if self.manifest:
+            self.write_manifest(output_order, outputs)
+
+        timings = [*context.get("timings", []), ("Write outputs", time.perf_counter() - start)]
         reports = context.get("reports", [])
         for target in reports:
             with self.open(target) as f:
@@ -233,7 +402,11 @@ class WriteFiles:
                         ids = ", ".join(i["id"] for i in data[key])
                         print("{}: {}".format(key, ids), file=f)
                     print(file=f)
-            print("Wrote {} ({} bytes)".format(
+                print("Timings", file=f)
+                for name, elapsed in timings:
+                    print("{}: {:.3f}s".format(name, elapsed), file=f)
+                print("Total: {:.3f}s".format(sum(t for _, t in timings)), file=f)
+            print("Wrote {} ({})".format(
                 target, self.st_size(target)
             ))
 
@@ -244,12 +417,21 @@ def parse_cli(args):
     sort = SortVersions()
     action = None
     write = WriteFiles()
+    expect_manifest = False
     for a in args:
-        if a == "--windows-default":
+        if expect_manifest:
+            write.manifest = a
+            expect_manifest = False
+        elif a == "--manifest":
+            expect_manifest = True
+        elif a == "--incremental":
+            write.incremental = True
+        elif a == "--windows-default":
             print("Using equivalent of: --pre --latest-micro -r >=3.11.0 index-windows.json")
             print("                     --pre -r >=3.11.0 index-windows-recent.json")
             print("                     index-windows-legacy.json")
             print("                     --report index-windows.txt")
+            print("                     --manifest index-windows-manifest.json")
             plan_split = [SplitToFile(), SplitToFile(), SplitToFile(), SplitToFile()]
             plan_split[0].target = "index-windows.json"
             plan_split[1].target = "index-windows-recent.json"
@@ -260,6 +442,7 @@ def parse_cli(args):
             plan_split[0].latest_micro = True
             plan_split[0].tag_or_range = [tag_or_range(">=3.11"), tag_or_range(">=3.13t")]
             plan_split[1].tag_or_range = [tag_or_range(">=3.11"), tag_or_range(">=3.13t")]
+            write.manifest = "index-windows-manifest.json"
         elif a == "-i":
             action = ReadFile()
             plan_read.append(action)
@@ -278,6 +461,9 @@ def parse_cli(args):
             except ValueError as ex:
                 print(ex)
             usage()
+    if expect_manifest:
+        print("No manifest filename specified")
+        usage()
     if not plan_read:
         action = ReadFile()
         action.source = "https://www.python.org/ftp/python/index-windows.json"
@@ -286,12 +472,20 @@ def parse_cli(args):
         print("No outputs specified")
         print(args)
         usage()
-    return [*plan_read, sort, *plan_split, write]
+    plan_merge = []
+    if write.incremental:
+        plan_merge.append(MergePrevious([
+            s.target for s in plan_split if not s.report and s.target != "nul"
+        ]))
+    return [ReadFiles(plan_read), *plan_merge, sort, *plan_split, write]
 
 
 if __name__ == "__main__":
     plan = parse_cli(sys.argv[1:])
     VERSIONS = []
-    CONTEXT = {}
+    CONTEXT = {"timings": []}
     for p in plan:
+        start = time.perf_counter()
         p.execute(VERSIONS, CONTEXT)
+        if not isinstance(p, WriteFiles):
+            CONTEXT["timings"].append((str(p), time.perf_counter() - start))
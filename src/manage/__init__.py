@@ -99,10 +99,16 @@ def main(args, root=None):
 def find_one(root, tag, script, windowed, allow_autoinstall, show_not_found_error):
     autoinstall_permitted = False
     try:
-        from .commands import load_default_config
+        if not script:
+            from .launchtable import find_in_launch_table
+            found = find_in_launch_table(root, tag, windowed)
+            if found:
+                LOGGER.debug("Selected %s %s from launch table", *found)
+                return found
+        from .launch import load_launch_config
         from .scriptutils import quote_args
         i = None
-        cmd = load_default_config(root)
+        cmd = load_launch_config(root)
         autoinstall_permitted = cmd.automatic_install
         LOGGER.debug("Finding runtime for '%s' or '%s'%s", tag, script, " (windowed)" if windowed else "")
         try:
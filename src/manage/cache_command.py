@@ -0,0 +1,85 @@
+import time
+
+from .cacheutils import get_download_cache
+from .exceptions import ArgumentError
+from .logging import LOGGER
+
+
+def _format_size(size):
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def list_packages(cmd, cache):
+    entries = cache.entries()
+    if not entries:
+        LOGGER.print("!Y!-- No cached packages. --!W!", always=True)
+        return
+
+    columns = {"id": "ID", "size": "Size", "last_access": "Last Used", "name": "File"}
+    rows = [{
+        "id": e["id"] or "",
+        "size": _format_size(e["size"]),
+        "last_access": time.strftime("%Y-%m-%d %H:%M", time.localtime(e["last_access"])),
+        "name": e["path"].name,
+    } for e in entries]
+    cwidth = {k: max(len(v), *(len(r[k]) for r in rows)) for k, v in columns.items()}
+    LOGGER.print("!B!%s!W!", "  ".join(columns[c].ljust(cwidth[c]) for c in columns), always=True)
+    for r in rows:
+        LOGGER.print("%s", "  ".join(r[c].ljust(cwidth[c]) for c in columns), always=True)
+
+    LOGGER.print(always=True)
+    total = sum(e["size"] for e in entries)
+    max_size = cmd.download_cache_max_size
+    if max_size is None or max_size < 0:
+        LOGGER.print("%s package(s) using %s", len(entries), _format_size(total), always=True)
+    else:
+        LOGGER.print("%s package(s) using %s of %s", len(entries), _format_size(total),
+                     _format_size(max_size * 1024 * 1024), always=True)
+    LOGGER.verbose("Cached packages are stored in %s", cache.directory)
+
+
+def prune_packages(cmd, cache):
+    max_size = cmd.download_cache_max_size if cmd.max_size is None else cmd.max_size
+    if max_size is None or max_size < 0:
+        LOGGER.info("The download cache has no maximum size, so nothing was removed.")
+        return
+    removed = cache.evict(max_size * 1024 * 1024)
+    if removed:
+        LOGGER.info("Removed %s package(s), freeing %s.", len(removed),
+                    _format_size(sum(e["size"] for e in removed)))
+    else:
+        LOGGER.info("No packages needed to be removed.")
+
+
+def clear_packages(cmd, cache):
+    if not cmd.ask_yn("Remove all cached packages?"):
+        return
+    LOGGER.info("Removing cached packages from %s", cache.directory)
+    cache.clear()
+
+
+ACTIONS = {
+    "list": list_packages,
+    "prune": prune_packages,
+    "clear": clear_packages,
+}
+
+
+def execute(cmd):
+    LOGGER.debug("BEGIN cache_command.execute: %r", cmd.args)
+
+    if len(cmd.args) > 1:
+        raise ArgumentError("Expected at most one action: " + ", ".join(ACTIONS))
+    action = cmd.args[0] if cmd.args else "list"
+    try:
+        action = ACTIONS[action.lower()]
+    except LookupError:
+        raise ArgumentError(f"Unknown action '{action}'. Expected one of: " +
+                            ", ".join(ACTIONS)) from None
+
+    try:
+        action(cmd, get_download_cache(cmd))
+    finally:
+        LOGGER.debug("END cache_command.execute")
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+
+from .fsutils import ensure_tree, rmtree
+from .logging import LOGGER
+from .pathutils import Path
+from .urlutils import sanitise_url
+
+
+# Directory under 'download_dir' for downloaded packages
+DOWNLOAD_CACHE_DIR_NAME = "__download_cache__"
+
+# Hash algorithms used to name cached packages, most preferred first. Any
+# other algorithm is used in sorted order if none of these are provided.
+KEY_HASHES = ("sha256", "sha512", "sha384", "sha1", "md5")
+
+
+def _is_hex(s):
+    return bool(s) and all(c in "0123456789abcdef" for c in s)
+
+
+def get_package_key(install):
+    """Returns the name that the package for 'install' is cached under.
+
+    The declared hash is used if there is one, so that the same package is
+    only stored once, no matter where it was found. Otherwise, a hash of the
+    URL is used.
+    """
+    hashes = {k.casefold(): v.casefold() for k, v in install.get("hash", {}).items()
+              if isinstance(v, str)}
+    for alg in (*KEY_HASHES, *sorted(hashes)):
+        if _is_hex(hashes.get(alg)) and alg.replace("_", "").isalnum():
+            return f"{alg}-{hashes[alg]}"
+    from hashlib import sha256
+    return "url-" + sha256(sanitise_url(install["url"]).encode("utf-8")).hexdigest()
+
+
+def get_package_suffix(install):
+    # Preserve nupkg extensions so we can directly reference Nuget packages
+    if install["url"].casefold().endswith(".nupkg".casefold()):
+        return ".nupkg"
+    return ".zip"
+
+
+class DownloadCache:
+    """Keeps downloaded packages for reuse, named by their contents.
+
+    An index file records the install, size and last access time of each
+    package, so that the least recently used ones can be removed when the
+    cache grows too large. The files in the directory are authoritative, and
+    any that are missing from the index use their modification time.
+    """
+    INDEX_NAME = "__index__.json"
+    SUFFIXES = (".zip", ".nupkg")
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        # Downloads may be recorded from multiple threads
+        self._lock = threading.Lock()
+
+    def get_path(self, install):
+        return self.directory / (get_package_key(install) + get_package_suffix(install))
+
+    def adopt(self, file, install):
+        """Moves a package that was saved outside of the cache into it.
+
+        Packages are assumed to match 'install', and will be validated before
+        they are used.
+        """
+        dest = self.get_path(install)
+        if dest.is_file() or not file.is_file():
+            return
+        LOGGER.debug("Moving %s into the download cache as %s", file, dest.name)
+        try:
+            ensure_tree(dest)
+            os.replace(file, dest)
+        except OSError:
+            LOGGER.debug("Failed to move %s", file, exc_info=True)
+
+    def _read_index(self):
+        import json
+        try:
+            with open(self.directory / self.INDEX_NAME, "rb") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict):
+            return {}
+        return {k: v for k, v in index.items() if isinstance(v, dict)}
+
+    def _write_index(self, index):
+        import json
+        file = self.directory / self.INDEX_NAME
+        tmp_file = file.with_name(f"{file.name}.{os.getpid()}.tmp")
+        try:
+            ensure_tree(file)
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_file, file)
+        except OSError:
+            LOGGER.debug("Failed to write %s", file, exc_info=True)
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+
+    def record(self, install, package):
+        """Records that 'package' has been used for 'install'."""
+        try:
+            size = os.stat(package).st_size
+        except OSError:
+            LOGGER.debug("Failed to record %s", package, exc_info=True)
+            return
+        with self._lock:
+            index = self._read_index()
+            index[Path(package).name] = {
+                "id": install.get("id"),
+                "url": sanitise_url(install["url"]),
+                "size": size,
+                "last_access": time.time(),
+            }
+            self._write_index(index)
+
+    def entries(self):
+        """Returns a list of cached packages, most recently used first.
+
+        Each entry is a dict containing the 'path', 'size' and 'last_access'
+        time of the package, and the 'id' and 'url' it was recorded for.
+        """
+        index = self._read_index()
+        entries = []
+        for p in self.directory.iterdir():
+            if not p.name.casefold().endswith(self.SUFFIXES) or not p.is_file():
+                continue
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append({
+                "id": None,
+                "url": None,
+                "last_access": st.st_mtime,
+                **index.get(p.name, {}),
+                "path": p,
+                "size": st.st_size,
+            })
+        entries.sort(key=lambda e: e["last_access"], reverse=True)
+        return entries
+
+    def evict(self, max_size):
+        """Removes the least recently used packages until the cache is no
+        larger than 'max_size' bytes. Returns the entries that were removed.
+        """
+        removed = []
+        with self._lock:
+            entries = self.entries()
+            total = sum(e["size"] for e in entries)
+            for e in reversed(entries):
+                if total <= max_size:
+                    break
+                LOGGER.verbose("Removing %s (%s) from the download cache",
+                               e["path"].name, e["id"] or e["url"])
+                try:
+                    e["path"].unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    # Most likely in use by another install
+                    LOGGER.debug("Failed to remove %s", e["path"], exc_info=True)
+                    continue
+                total -= e["size"]
+                removed.append(e)
+            # Forget packages that have been removed by any means
+            index = self._read_index()
+            live = {k: v for k, v in index.items() if (self.directory / k).is_file()}
+            if live != index:
+                self._write_index(live)
+        return removed
+
+    def clear(self):
+        """Removes every cached package, including incomplete downloads."""
+        with self._lock:
+            rmtree(self.directory, after_5s_warning=(
+                "Removing cached downloads is taking some time. " +
+                "Please continue to wait, or press Ctrl+C to abort."
+            ))
+
+
+def get_download_cache(cmd):
+    return DownloadCache(Path(cmd.download_dir) / DOWNLOAD_CACHE_DIR_NAME)
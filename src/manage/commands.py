@@ -3,12 +3,11 @@ import sys
 
 from . import __version__
 from .config import (
+    CONFIG_SCHEMA,
+    DEFAULT_TAG,
+    ConfigInputs,
     load_config,
-    config_append,
-    config_bool,
-    config_dict_merge,
     config_split,
-    config_split_append,
 )
 from .exceptions import ArgumentError
 from .pathutils import Path
@@ -23,7 +22,6 @@ LOGGER = logging.LOGGER
 # or check out the docs for administrative controls:
 #    https://docs.python.org/using/windows
 DEFAULT_SOURCE_URL = "https://www.python.org/ftp/python/index-windows.json"
-DEFAULT_TAG = "3"
 
 
 HELP_URL = "https://docs.python.org/using/windows"
@@ -124,7 +122,8 @@ CLI_SCHEMA = {
     }
 }
 
-Supported values from configuration files are defined in CONFIG_SCHEMA as a
+Supported values from configuration files are defined in CONFIG_SCHEMA (in
+manage.config, so that launches can load configuration without this module) as a
 recursive dict (to match JSON structure). The schema values are tuples of the
 value type, an optional merge function, and zero or more additional options.
 
@@ -196,6 +195,7 @@ CLI_SCHEMA = {
         "refresh": ("refresh", True),
         "by-id": ("by_id", True),
         "dry-run": ("dry_run", True),
+        "jobs": ("jobs", _NEXT, int),
         "enable-shortcut-kinds": ("enable_shortcut_kinds", _NEXT, config_split),
         "disable-shortcut-kinds": ("disable_shortcut_kinds", _NEXT, config_split),
         "help": ("show_help", True), # nested to avoid conflict with command
@@ -216,129 +216,29 @@ CLI_SCHEMA = {
         "help": ("show_help", True), # nested to avoid conflict with command
     },
 
+    "cache": {
+        "max-size": ("max_size", _NEXT, int),
+        "help": ("show_help", True), # nested to avoid conflict with command
+    },
+
     "**first_run": {
         "explicit": ("explicit", True),
     },
 }
 
 
-CONFIG_SCHEMA = {
-    # Not meant for users to specify, but to track which files were loaded.
-    # The base_config, user_config and additional_config options are for
-    # configuration.
-    "_config_files": (str, config_append, "path"),
-
-    "log_level": (int, min),
-    "confirm": (config_bool, None, "env"),
-    "install_dir": (str, None, "env", "path"),
-    "global_dir": (str, None, "env", "path"),
-    "download_dir": (str, None, "env", "path"),
-    "bundled_dir": (str, None, "env", "path"),
-    "logs_dir": (str, None, "env", "path"),
-
-    "default_tag": (str, None, "env"),
-    "default_platform": (str, None, "env"),
-    "automatic_install": (config_bool, None, "env"),
-    "include_unmanaged": (config_bool, None, "env"),
-    "shebang_can_run_anything": (config_bool, None, "env"),
-    "shebang_can_run_anything_silently": (config_bool, None, "env"),
-    # Mapping from shebang template to '-V:Company/Tag' argument or an
-    # executable path. The latter requires 'shebang_can_run_anything'.
-    "shebang_templates": (dict, config_dict_merge),
-    # Typically configured to '%VIRTUAL_ENV%' to pick up the active environment
-    "virtual_env": (str, None, "env", "path"),
-
-    "list": {
-        "format": (str, None, "env"),
-        "unmanaged": (config_bool, None, "env"),
-    },
-
-    "install": {
-        "source": (str, None, "env", "path", "uri"),
-        "fallback_source": (str, None, "env", "path", "uri"),
-        "enable_shortcut_kinds": (str, config_split_append),
-        "disable_shortcut_kinds": (str, config_split_append),
-        "default_install_tag": (str, None),
-        "preserve_site_on_upgrade": (config_bool, None),
-        "enable_entrypoints": (config_bool, None),
-        "hard_link_entrypoints": (config_bool, None),
-    },
-
-    "first_run": {
-        "enabled": (config_bool, None, "env"),
-        "explicit": (config_bool, None),
-        "check_app_alias": (config_bool, None, "env"),
-        "check_long_paths": (config_bool, None, "env"),
-        "check_py_on_path": (config_bool, None, "env"),
-        "check_any_install": (config_bool, None, "env"),
-        "check_latest_install": (config_bool, None, "env"),
-        "check_global_dir": (config_bool, None, "env"),
-    },
-
-    # These configuration settings are intended for administrative override only
-    # For example, if you are managing deployments that will use your own index
-    # and/or your own builds.
-
-    # Registry key containing configuration overrides. Each value specified
-    # under this key will be applied to the configuration both before and after
-    # all other configuration files (but not command-line options).
-    # Default: HKEY_LOCAL_MACHINE\Software\Policies\Python\PyManager
-    "registry_override_key": (str, None),
-
-    # Specify a new base config file. This would normally be set in the registry
-    # and will override earlier settings (including those in the registry).
-    # The intent is to allow a registry override for just this one value to
-    # reference a JSON file containing other admin overrides.
-    "base_config": (str, None, "env", "path"),
-
-    # Specify a user config file. This will normally use an environment variable
-    # to locate the file under %UserProfile%.
-    # Default: %AppData%\Python\PyManager.json
-    "user_config": (str, None, "env", "path"),
-
-    # Specify an additional config file. This would normally be a complete
-    # environment variable to allow users to set this as they launch.
-    # Default: %PYTHON_MANAGER_CONFIG%
-    "additional_config": (str, None, "env", "path"),
-
-    # Registry key to write PEP 514 entries into
-    # Default: HKEY_CURRENT_USER\Software\Python
-    "pep514_root": (str, None),
-
-    # Directory to create Start shortcuts (Start Menu\Programs is assumed)
-    # Default: Python
-    "start_folder": (str, None),
-
-    # Overrides for launcher executables. Platform-specific versions will be
-    # chosen automatically by inserting the last hypenated part of the tag
-    # before the suffix, falling back on the default platform or '-64' and
-    # eventually the unmodified version. See install_command._write_alias().
-    # Default: .\launcher.exe and .\launcherw.exe
-    "launcher_exe": (str, None, "path"),
-    "launcherw_exe": (str, None, "path"),
-
-    # Should be a mapping from 'source' to additional settings
-    # Currently, we support these settings for each source:
-    # requires_signature: bool
-    # - If true, download and validate "{source_url}.cat" before using the feed.
-    # required_root_subject: str
-    # - The root CA of the .cat must have exactly this subject
-    # required_publisher_subject: str
-    # - The leaf certificate of the .cat must have exactly this subject
-    # required_publisher_eku: str
-    # - The leaf certificate of the .cat must contain this EKU as a verified attribute
-    "source_settings": (dict, config_dict_merge),
-
-    # Show new update welcome messages (always hidden with '-q')
-    # Default: False
-    "welcome_on_update": (config_bool, None),
-}
-
 
 # Will be filled in by BaseCommand.__init_subclass__
 COMMANDS = {}
 
 
+def _convert_arg(name, value, convert):
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise ArgumentError(f"Invalid value for --{name}: '{value}'") from None
+
+
 class BaseCommand:
     log_level = logging.INFO
     config_file = None
@@ -367,10 +267,13 @@ class BaseCommand:
 
     pep514_root = None
     start_folder = None
+    launch_table = None
     launcher_exe = None
     launcherw_exe = None
 
     source_settings = {}
+    index_cache_max_age = 300
+    download_cache_max_size = 2048
 
     show_help = False
 
@@ -392,7 +295,7 @@ class BaseCommand:
             if set_next:
                 key, value, *opts = cmd_args[set_next]
                 if value is _NEXT and opts:
-                    a = opts[0](a)
+                    a = _convert_arg(set_next, a, opts[0])
                 setattr(self, key, a)
                 _set_args.add(key)
                 set_next = None
@@ -416,7 +319,7 @@ class BaseCommand:
                 if value is _NEXT:
                     if sep:
                         if opts:
-                            v = opts[0](v)
+                            v = _convert_arg(set_next, v, opts[0])
                         setattr(self, key, v)
                         _set_args.add(key)
                         set_next = None
@@ -439,8 +342,10 @@ class BaseCommand:
             LOGGER.reduce_level(self.log_level)
 
         self.root = Path(root or self.root or sys.prefix)
+        self.config_inputs = ConfigInputs()
         try:
-            config = load_config(self.root, self.config_file, CONFIG_SCHEMA)
+            config = load_config(self.root, self.config_file, CONFIG_SCHEMA,
+                                 inputs=self.config_inputs, use_snapshot=True)
         except Exception:
             LOGGER.warn("Failed to read configuration file from %s", self.config_file)
             raise
@@ -463,6 +368,9 @@ class BaseCommand:
         self.download_dir = self.root / "pkgs"
         self.logs_dir = None
 
+        from .launchtable import get_launch_table_file
+        self.launch_table = get_launch_table_file()
+
         arg_names = frozenset(k for k, v in CONFIG_SCHEMA.items()
             if hasattr(type(self), k) and not isinstance(v, dict))
         for k, v in config.items():
@@ -651,44 +559,12 @@ class BaseCommand:
         return self._ask(fmt, *args, yn_text="y/N", expect_char="n")
 
     def get_installs(self, *, include_unmanaged=False, set_default=True):
-        from .installs import get_installs, get_matching_install_tags
-        installs = get_installs(
-            self.install_dir,
-            include_unmanaged=include_unmanaged and self.include_unmanaged,
-            virtual_env=self.virtual_env,
-        )
-        if set_default and not any(i.get("default") for i in installs):
-            LOGGER.debug("Calculating default install")
-            matching = get_matching_install_tags(
-                installs,
-                self.default_tag,
-                default_platform=self.default_platform,
-                single_tag=True,
-            )
-            if matching:
-                if matching[0][0] not in installs:
-                    raise RuntimeError("get_matching_install_tags returned value from wrong list")
-                LOGGER.debug("Default install will be %s", matching[0][0]["id"])
-                matching[0][0]["default"] = True
-        return installs
+        from .launch import get_installs
+        return get_installs(self, include_unmanaged=include_unmanaged, set_default=set_default)
 
     def get_install_to_run(self, tag=None, script=None, *, windowed=False):
-        if script and not tag:
-            from .scriptutils import find_install_from_script
-            try:
-                return find_install_from_script(self, script, windowed=windowed)
-            except LookupError:
-                pass
-        from .installs import get_install_to_run
-        return get_install_to_run(
-            self.install_dir,
-            self.default_tag,
-            tag,
-            windowed=windowed,
-            include_unmanaged=self.include_unmanaged,
-            virtual_env=self.virtual_env,
-            default_platform=self.default_platform,
-        )
+        from .launch import get_install_to_run
+        return get_install_to_run(self, tag, script, windowed=windowed)
 
 
 class ListCommand(BaseCommand):
@@ -800,6 +676,8 @@ Downloads new Python runtimes and sets up shortcuts and other registration.
     -f, --force      Re-download and overwrite existing install
     -u, --update     Overwrite existing install if a newer version is available.
     --dry-run        Choose runtime but do not install
+    --jobs=!B!<N>!W!       Download up to N runtimes at once while installing others
+                     (!B!install.jobs=...!W!)
     --refresh        Update shortcuts and aliases for all installed versions.
     --configure      Re-run the system configuration helper.
     --by-id          Require TAG to exactly match the install ID. (For advanced use.)
@@ -819,6 +697,9 @@ Downloads new Python runtimes and sets up shortcuts and other registration.
 
 !B!EXAMPLE:!W! Prepare an offline index with multiple versions
 > py install --download=.\pkgs 3.12 3.12-arm64 3.13 3.13-arm64
+
+!B!EXAMPLE:!W! Install several versions, downloading up to three at once
+> py install --jobs=3 3.12 3.13 3.14
 """
 
     source = None
@@ -840,6 +721,7 @@ Downloads new Python runtimes and sets up shortcuts and other registration.
     preserve_site_on_upgrade = True
     enable_entrypoints = True
     hard_link_entrypoints = True
+    jobs = 1
 
     def __init__(self, args, root=None):
         super().__init__(args, root)
@@ -862,6 +744,8 @@ Downloads new Python runtimes and sets up shortcuts and other registration.
             self.target = Path(self.target).absolute()
         if self.download:
             self.download = Path(self.download).absolute()
+        if self.jobs < 1:
+            raise ArgumentError(f"Expected --jobs (or install.jobs) to be at least 1, not {self.jobs}")
 
     def execute(self):
         self.show_welcome()
@@ -936,6 +820,41 @@ Removes one or more runtimes from your machine.
         execute(self)
 
 
+class CacheCommand(BaseCommand):
+    CMD = "cache"
+    HELP_LINE = ("Show or remove the runtime packages that are kept after " +
+                 "installing.")
+    USAGE_LINE = "cache !B![list|prune|clear]!W!"
+    HELP_TEXT = r"""!G!Cache command!W!
+Shows or removes downloaded runtime packages. Packages are kept so that runtimes
+can be repaired or reinstalled without downloading them again.
+
+> py cache !B![list]!W!
+> py cache prune !B![options]!W!
+> py cache clear
+
+!G!Options:!W!
+    list             List cached packages, most recently used first
+    prune            Remove the least recently used packages until the cache is
+                     no larger than !B!download_cache_max_size!W! (in MB)
+    clear            Remove all cached packages
+    --max-size=!B!<MB>!W!  Override the maximum size used by !B!prune!W!
+
+!B!EXAMPLE:!W! Show cached packages
+> py cache
+
+!B!EXAMPLE:!W! Reduce the cache to at most 500 MB
+> py cache prune --max-size=500
+"""
+
+    max_size = None
+    keep_log = False
+
+    def execute(self):
+        from .cache_command import execute
+        execute(self)
+
+
 #class RunCommand(BaseCommand):
 #    CMD = "run"
 #    HELP_LINE = "Launch a script in a dedicated environment"
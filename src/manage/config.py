@@ -9,6 +9,7 @@ from .pathutils import Path
 
 
 DEFAULT_CONFIG_NAME = "pymanager.json"
+CONFIG_SNAPSHOT_NAME = "__config_snapshot__.json"
 
 
 def config_append(x, y):
@@ -40,29 +41,357 @@ def config_bool(v):
     return bool(v)
 
 
+DEFAULT_TAG = "3"
+
+
+# See the comments at the top of manage.commands for a description of the schema
+CONFIG_SCHEMA = {
+    # Not meant for users to specify, but to track which files were loaded.
+    # The base_config, user_config and additional_config options are for
+    # configuration.
+    "_config_files": (str, config_append, "path"),
+
+    "log_level": (int, min),
+    "confirm": (config_bool, None, "env"),
+    "install_dir": (str, None, "env", "path"),
+    "global_dir": (str, None, "env", "path"),
+    "download_dir": (str, None, "env", "path"),
+    "bundled_dir": (str, None, "env", "path"),
+    "logs_dir": (str, None, "env", "path"),
+
+    "default_tag": (str, None, "env"),
+    "default_platform": (str, None, "env"),
+    "automatic_install": (config_bool, None, "env"),
+    "include_unmanaged": (config_bool, None, "env"),
+    "shebang_can_run_anything": (config_bool, None, "env"),
+    "shebang_can_run_anything_silently": (config_bool, None, "env"),
+    # Mapping from shebang template to '-V:Company/Tag' argument or an
+    # executable path. The latter requires 'shebang_can_run_anything'.
+    "shebang_templates": (dict, config_dict_merge),
+    # Typically configured to '%VIRTUAL_ENV%' to pick up the active environment
+    "virtual_env": (str, None, "env", "path"),
+
+    "list": {
+        "format": (str, None, "env"),
+        "unmanaged": (config_bool, None, "env"),
+    },
+
+    "install": {
+        "source": (str, None, "env", "path", "uri"),
+        "fallback_source": (str, None, "env", "path", "uri"),
+        "enable_shortcut_kinds": (str, config_split_append),
+        "disable_shortcut_kinds": (str, config_split_append),
+        "default_install_tag": (str, None),
+        "preserve_site_on_upgrade": (config_bool, None),
+        "enable_entrypoints": (config_bool, None),
+        "hard_link_entrypoints": (config_bool, None),
+        # Number of runtimes to download at once when installing several.
+        # Default: 1
+        "jobs": (int, None),
+    },
+
+    "first_run": {
+        "enabled": (config_bool, None, "env"),
+        "explicit": (config_bool, None),
+        "check_app_alias": (config_bool, None, "env"),
+        "check_long_paths": (config_bool, None, "env"),
+        "check_py_on_path": (config_bool, None, "env"),
+        "check_any_install": (config_bool, None, "env"),
+        "check_latest_install": (config_bool, None, "env"),
+        "check_global_dir": (config_bool, None, "env"),
+    },
+
+    # These configuration settings are intended for administrative override only
+    # For example, if you are managing deployments that will use your own index
+    # and/or your own builds.
+
+    # Registry key containing configuration overrides. Each value specified
+    # under this key will be applied to the configuration both before and after
+    # all other configuration files (but not command-line options).
+    # Default: HKEY_LOCAL_MACHINE\Software\Policies\Python\PyManager
+    "registry_override_key": (str, None),
+
+    # Specify a new base config file. This would normally be set in the registry
+    # and will override earlier settings (including those in the registry).
+    # The intent is to allow a registry override for just this one value to
+    # reference a JSON file containing other admin overrides.
+    "base_config": (str, None, "env", "path"),
+
+    # Specify a user config file. This will normally use an environment variable
+    # to locate the file under %UserProfile%.
+    # Default: %AppData%\Python\PyManager.json
+    "user_config": (str, None, "env", "path"),
+
+    # Specify an additional config file. This would normally be a complete
+    # environment variable to allow users to set this as they launch.
+    # Default: %PYTHON_MANAGER_CONFIG%
+    "additional_config": (str, None, "env", "path"),
+
+    # Registry key to write PEP 514 entries into
+    # Default: HKEY_CURRENT_USER\Software\Python
+    "pep514_root": (str, None),
+
+    # Directory to create Start shortcuts (Start Menu\Programs is assumed)
+    # Default: Python
+    "start_folder": (str, None),
+
+    # Overrides for launcher executables. Platform-specific versions will be
+    # chosen automatically by inserting the last hypenated part of the tag
+    # before the suffix, falling back on the default platform or '-64' and
+    # eventually the unmodified version. See install_command._write_alias().
+    # Default: .\launcher.exe and .\launcherw.exe
+    "launcher_exe": (str, None, "path"),
+    "launcherw_exe": (str, None, "path"),
+
+    # Should be a mapping from 'source' to additional settings
+    # Currently, we support these settings for each source:
+    # requires_signature: bool
+    # - If true, download and validate "{source_url}.cat" before using the feed.
+    # required_root_subject: str
+    # - The root CA of the .cat must have exactly this subject
+    # required_publisher_subject: str
+    # - The leaf certificate of the .cat must have exactly this subject
+    # required_publisher_eku: str
+    # - The leaf certificate of the .cat must contain this EKU as a verified attribute
+    "source_settings": (dict, config_dict_merge),
+
+    # Number of seconds that index files and their signatures may be reused
+    # from 'download_dir' before checking whether they have changed. Use 0 to
+    # always check, or -1 to not keep them at all.
+    # Default: 300
+    "index_cache_max_age": (int, None),
+
+    # Maximum size in megabytes of the packages kept in 'download_dir' after
+    # installing. The least recently used are removed first. Use 0 to not keep
+    # any packages, or -1 for no limit.
+    # Default: 2048
+    "download_cache_max_size": (int, None),
+
+    # Show new update welcome messages (always hidden with '-q')
+    # Default: False
+    "welcome_on_update": (config_bool, None),
+}
+
+
 def _is_valid_url(u):
     from .urlutils import is_valid_url
     return is_valid_url(u)
 
 
-def load_global_config(cfg, schema):
+def _stat_key(file):
+    try:
+        st = os.stat(file)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def get_registry_key_timestamp(key_path):
+    hive_name, _, key_name = key_path.replace("/", "\\").partition("\\")
+    try:
+        with winreg.OpenKey(getattr(winreg, hive_name), key_name) as key:
+            return winreg.QueryInfoKey(key)[2]
+    except (AttributeError, OSError):
+        return None
+
+
+class ConfigInputs:
+    """Records the files, registry keys and environment variables that were
+    read while loading configuration, so that anything derived from the
+    configuration can later be checked for staleness without reloading it.
+    """
+    def __init__(self, files=None, env=None, keys=None, cwd=None):
+        self.files = dict(files or {})
+        self.env = dict(env or {})
+        self.keys = dict(keys or {})
+        self.cwd = cwd
+
+    def add_file(self, file):
+        self.files[str(file)] = _stat_key(file)
+
+    def add_key(self, key_path):
+        self.keys[key_path] = get_registry_key_timestamp(key_path)
+
+    def add_cwd(self):
+        # Relative paths from environment variables depend on the working dir
+        self.cwd = os.getcwd()
+
+    def update(self, other):
+        self.files.update(other.files)
+        self.env.update(other.env)
+        self.keys.update(other.keys)
+        self.cwd = other.cwd or self.cwd
+
+    def get(self, name, default=None):
+        # Used in place of os.environ while loading configuration
+        v = os.environ.get(name)
+        self.env[name] = v
+        return default if v is None else v
+
+    def to_json(self):
+        return {"files": self.files, "env": self.env, "keys": self.keys, "cwd": self.cwd}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["files"], data["env"], data["keys"], data.get("cwd"))
+
+    def is_current(self):
+        if self.cwd is not None and os.getcwd() != self.cwd:
+            LOGGER.debug("Configuration input (working directory) has changed")
+            return False
+        for k, v in self.env.items():
+            if os.environ.get(k) != v:
+                LOGGER.debug("Configuration input %%%s%% has changed", k)
+                return False
+        for k, v in self.files.items():
+            if _stat_key(k) != v:
+                LOGGER.debug("Configuration input %s has changed", k)
+                return False
+        for k, v in self.keys.items():
+            if get_registry_key_timestamp(k) != v:
+                LOGGER.debug("Configuration input %s has changed", k)
+                return False
+        return True
+
+
+# Set by load_config while loading to record what was read
+_INPUTS = None
+
+
+def _get_global_config_file():
     try:
         from _native import package_get_root
     except ImportError:
-        file = Path(sys.executable).parent / DEFAULT_CONFIG_NAME
-    else:
-        file = Path(package_get_root()) / DEFAULT_CONFIG_NAME
+        return Path(sys.executable).parent / DEFAULT_CONFIG_NAME
+    return Path(package_get_root()) / DEFAULT_CONFIG_NAME
+
+
+def load_global_config(cfg, schema):
+    file = _get_global_config_file()
     try:
         load_one_config(cfg, file, schema=schema)
     except FileNotFoundError:
         pass
 
 
-def load_config(root, override_file, schema):
+def get_config_snapshot_file():
+    # The snapshot has to be found before configuration is loaded, so it
+    # cannot follow any configured directory.
+    appdata = os.getenv("LocalAppData")
+    if not appdata:
+        return None
+    return Path(appdata) / "Python" / CONFIG_SNAPSHOT_NAME
+
+
+def _restore_paths(cfg, schema):
+    # Reverses the conversion of paths to strings when saving the snapshot
+    for k, v in cfg.items():
+        try:
+            subschema = schema[k]
+        except LookupError:
+            continue
+        if isinstance(subschema, dict):
+            if isinstance(v, dict):
+                _restore_paths(v, subschema)
+            continue
+        _, _, *opts = subschema
+        if "path" not in opts or "uri" in opts:
+            continue
+        if isinstance(v, str):
+            cfg[k] = Path(v)
+        elif isinstance(v, list):
+            cfg[k] = [Path(p) if isinstance(p, str) else p for p in v]
+
+
+def _snapshot_key(root, override_file):
+    from . import __version__
+    return {
+        "version": __version__,
+        "root": str(root),
+        "override_file": str(override_file) if override_file else None,
+        "global_file": str(_get_global_config_file()),
+    }
+
+
+def _read_config_snapshot(snapshot_file, root, override_file, schema):
+    try:
+        with open(snapshot_file, "rb") as f:
+            snapshot = json.load(f)
+        if snapshot["schema"] != 1 or snapshot["key"] != _snapshot_key(root, override_file):
+            return None
+        inputs = ConfigInputs.from_json(snapshot["inputs"])
+        if not inputs.is_current():
+            return None
+        cfg = snapshot["config"]
+        _restore_paths(cfg, schema)
+        return cfg, inputs
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, LookupError, TypeError, AttributeError):
+        LOGGER.debug("Failed to read configuration snapshot", exc_info=True)
+        return None
+
+
+def _write_config_snapshot(snapshot_file, root, override_file, cfg, inputs):
+    tmp_file = snapshot_file.with_name(f"{snapshot_file.name}.{os.getpid()}.tmp")
+    try:
+        snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_text(json.dumps({
+            "schema": 1,
+            "key": _snapshot_key(root, override_file),
+            "inputs": inputs.to_json(),
+            "config": cfg,
+        }, default=str))
+        os.replace(tmp_file, snapshot_file)
+    except (OSError, TypeError, ValueError):
+        LOGGER.debug("Failed to write configuration snapshot", exc_info=True)
+        try:
+            tmp_file.unlink()
+        except OSError:
+            pass
+
+
+def load_config(root, override_file, schema, *, inputs=None, use_snapshot=False):
+    """Loads and merges all configuration files.
+
+    When 'use_snapshot' is True, the merged configuration is saved alongside
+    the inputs it was read from, and reused as long as none of those inputs
+    have changed. 'inputs' is updated with what was read in either case.
+    """
+    global _INPUTS
+    snapshot_file = get_config_snapshot_file() if use_snapshot else None
+    if snapshot_file:
+        if inputs is None:
+            inputs = ConfigInputs()
+        snapshot = _read_config_snapshot(snapshot_file, root, override_file, schema)
+        if snapshot:
+            LOGGER.debug("Using configuration snapshot from %s", snapshot_file)
+            cfg, snapshot_inputs = snapshot
+            inputs.update(snapshot_inputs)
+            return cfg
+    if inputs is None:
+        return _load_config(root, override_file, schema)
+    _INPUTS = inputs
+    try:
+        # The global config file is loaded through an overridable function,
+        # so record it here in case it does not come via load_one_config.
+        inputs.add_file(_get_global_config_file())
+        cfg = _load_config(root, override_file, schema)
+    finally:
+        _INPUTS = None
+    if snapshot_file:
+        _write_config_snapshot(snapshot_file, root, override_file, cfg, inputs)
+    return cfg
+
+
+def _load_config(root, override_file, schema):
     cfg = {}
 
     load_global_config(cfg, schema=schema)
 
+    if _INPUTS is not None and cfg.get("registry_override_key"):
+        _INPUTS.add_key(cfg["registry_override_key"])
+
     try:
         reg_cfg = load_registry_config(cfg["registry_override_key"], schema=schema)
         merge_config(cfg, reg_cfg, schema=schema, source="registry", overwrite=True)
@@ -96,6 +425,8 @@ def load_config(root, override_file, schema):
 
 
 def load_one_config(cfg, file, schema, *, overwrite=False):
+    if _INPUTS is not None:
+        _INPUTS.add_file(file)
     try:
         with open(file, "r", encoding="utf-8-sig") as f:
             LOGGER.verbose("Loading configuration from %s", file)
@@ -185,7 +516,7 @@ def resolve_config(cfg, source, relative_to, key_so_far="", schema=None, error_u
         if "env" in opts and isinstance(v, str):
             try:
                 orig_v = v
-                v = _expand_vars(v, os.environ)
+                v = _expand_vars(v, os.environ if _INPUTS is None else _INPUTS)
                 from_env = orig_v != v
             except TypeError:
                 pass
@@ -202,7 +533,10 @@ def resolve_config(cfg, source, relative_to, key_so_far="", schema=None, error_u
             if not from_env:
                 v = relative_to / v
             else:
-                v = type(relative_to)(v).absolute()
+                v2 = type(relative_to)(v)
+                v = v2.absolute()
+                if _INPUTS is not None and v != v2:
+                    _INPUTS.add_cwd()
         if v and "uri" in opts:
             if hasattr(v, "as_uri"):
                 v = v.as_uri()
@@ -245,3 +245,15 @@ def atomic_unlink(paths):
         while handles:
             p, h = handles.pop()
             file_unlock_for_delete(h)
+
+
+def link_or_copy(src, dest):
+    "Hard-links 'dest' to 'src', or copies it if that is not possible."
+    unlink(dest)
+    try:
+        os.link(src, dest)
+        return
+    except OSError:
+        LOGGER.debug("Failed to link %s to %s. Copying instead.", src, dest, exc_info=True)
+    import shutil
+    shutil.copyfile(src, dest)
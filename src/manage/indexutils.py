@@ -1,11 +1,25 @@
 from .exceptions import InvalidFeedError
 from .logging import LOGGER
-from .tagutils import tag_or_range, install_matches_any
+from .tagutils import CompanyTag, TagIndex, tag_or_range, install_matches_any
 from .verutils import Version
 
 SCHEMA = {
     "next": str,
 
+    # Other feeds to read instead of following 'next'. Clients only download
+    # the shards that may contain the tags they are looking for, and read
+    # them in this order.
+    "shards": [
+        {
+            # URL of the shard, relative to this feed
+            "url": str,
+            # Every 'tag' and 'install-for' value in the shard, including the
+            # company name for non-PythonCore entries. If omitted, the shard
+            # is always read.
+            "install-for": [str],
+        },
+    ],
+
     # If true, download and validate "{source_url}.cat" before using the feed.
     "requires_signature": bool,
     # The root CA of the .cat must have exactly this subject
@@ -111,20 +125,22 @@ def _validate_one_dict_match(d, expect):
     return True
     
 
+def _validate_one_of(e, expects, ctxt):
+    for expect in expects:
+        if _validate_one_dict_match(e, expect):
+            return _validate_one(e, expect, ctxt)
+    raise InvalidFeedError("No matching 'version' or 'schema' at {}".format(
+        ".".join(ctxt)
+    ))
+
+
 def _validate_one_or_list(d, expects, ctxt):
     if not isinstance(d, list):
         d = [d]
     ctxt.append("[]")
     for i, e in enumerate(d):
         ctxt[-1] = f"[{i}]"
-        for expect in expects:
-            if _validate_one_dict_match(e, expect):
-                yield _validate_one(e, expect, ctxt)
-                break
-        else:
-            raise InvalidFeedError("No matching 'version' or 'schema' at {}".format(
-                ".".join(ctxt)
-            ))
+        yield _validate_one_of(e, expects, ctxt)
     del ctxt[-1]
 
 
@@ -195,23 +211,172 @@ def _patch(source_url, v):
     return _SCHEMA_PATCHES.get(v.get("schema"), lambda _, v: v)(source_url, v)
 
 
+# Fields of an entry that are read when it is created, and the IndexEntry
+# attributes they are stored in.
+_INDEX_ENTRY_FIELDS = {
+    "id": "id",
+    "sort-version": "sort_version",
+    "company": "company",
+    "tag": "tag",
+    "install-for": "install_for",
+}
+
+
+def _validate_entry(source_url, v, n):
+    try:
+        v = _validate_one_of(v, SCHEMA["versions"], ["versions", f"[{n}]"])
+    except InvalidFeedError as ex:
+        LOGGER.debug("ERROR:", exc_info=True)
+        raise InvalidFeedError(feed_url=source_url) from ex
+    return _patch(source_url, v)
+
+
+def _convert_field(v, expect):
+    # Converts a field the same way as _validate_one, but avoids the copy
+    # when it already has the expected type.
+    if v is None or type(v) is expect:
+        return v
+    if expect is list and type(v) is list and all(type(t) is str for t in v):
+        return v
+    return _validate_one(v, [str] if expect is list else expect)
+
+
+class IndexEntry:
+    """A single entry in an Index.
+
+    Only the fields needed to sort and match entries are read when it is
+    created. The rest of the entry is validated and patched by materialize()
+    when it is first needed, after which the original data is released.
+    """
+    __slots__ = ("id", "sort_version", "company", "tag", "install_for",
+                 "_source_url", "_n", "_raw", "_full")
+
+    def __init__(self, source_url, n, raw, *, validated=None):
+        self._source_url = source_url
+        self._n = n
+        self._raw = raw
+        self._full = validated
+        if validated is not None:
+            self._read_fields(validated)
+            return
+        try:
+            self._read_fields(raw, _convert_field)
+        except Exception:
+            # Fully validate the entry to report the error. Should this
+            # somehow succeed, we use the validated fields instead.
+            self._read_fields(self.materialize())
+
+    def _read_fields(self, d, convert=lambda v, expect: v):
+        get = d.get
+        self.id = convert(get("id"), str)
+        self.sort_version = convert(d["sort-version"], Version)
+        self.company = convert(get("company"), str)
+        self.tag = convert(get("tag"), str)
+        self.install_for = convert(get("install-for"), list)
+
+    def materialize(self):
+        """Returns the full entry as a validated dict."""
+        if self._full is None:
+            self._full = _validate_entry(self._source_url, self._raw, self._n)
+            self._raw = None
+        return self._full
+
+    def __getitem__(self, key):
+        try:
+            attr = _INDEX_ENTRY_FIELDS[key]
+        except KeyError:
+            return self.materialize()[key]
+        v = getattr(self, attr)
+        if v is None:
+            raise KeyError(key)
+        return v
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
 class Index:
-    def __init__(self, source_url, d):
+    """A parsed feed of available installs.
+
+    Entries are kept as IndexEntry records, which are validated and patched
+    as they are first accessed, so that finding a match near the start of a
+    large feed does not need to check the rest. Pass strict=True to validate
+    every entry immediately, which tools that process the whole feed should
+    prefer.
+    """
+    def __init__(self, source_url, d, *, strict=False):
+        self.source_url = source_url
         try:
-            validated = _validate_one(d, SCHEMA)
+            if strict:
+                validated = _validate_one(d, SCHEMA)
+                versions = validated["versions"]
+            else:
+                if not isinstance(d, dict):
+                    raise _schema_error(d, SCHEMA, [])
+                versions = d["versions"]
+                if not isinstance(versions, list):
+                    raise _schema_error(versions, list, ["versions"])
+                validated = _validate_one({k: v for k, v in d.items() if k != "versions"}, SCHEMA)
         except InvalidFeedError as ex:
             LOGGER.debug("ERROR:", exc_info=True)
             raise InvalidFeedError(feed_url=source_url) from ex
-        self.source_url = source_url
         self.next_url = validated.get("next")
-        versions = [_patch(source_url, v) for v in validated["versions"]]
-        self.versions = sorted(versions, key=lambda v: v["sort-version"], reverse=True)
+        # Lookup tables are built on first use by _get_tables()
+        self._tables = None
+        if strict:
+            entries = [IndexEntry(source_url, n, None, validated=_patch(source_url, v))
+                       for n, v in enumerate(versions)]
+        else:
+            # Entries only read the fields used for sorting and matching now.
+            # Those where that fails are fully validated to raise the error.
+            entries = [IndexEntry(source_url, n, v) for n, v in enumerate(versions)]
+        entries.sort(key=lambda e: e.sort_version.sortkey, reverse=True)
+        self._entries = entries
+
+    def _get_tables(self):
+        # Returns (ids, tags, unindexed). 'ids' maps casefolded IDs to entry
+        # positions, and 'tags' is a TagIndex of each entry's tag and
+        # 'install-for' tags. 'unindexed' lists entries that are missing
+        # these fields, which are always checked.
+        if self._tables is not None:
+            return self._tables
+        ids = {}
+        tags = TagIndex()
+        unindexed = []
+        for n, e in enumerate(self._entries):
+            if e.id is None or e.company is None or e.tag is None:
+                unindexed.append(n)
+                continue
+            ids.setdefault(e.id.casefold(), []).append(n)
+            tags.add(CompanyTag(e.company, e.tag), n)
+            for t in e.install_for or ():
+                tags.add(CompanyTag(e.company, t), n)
+        self._tables = ids, tags, unindexed
+        return self._tables
+
+    def _candidates(self, filters):
+        # Returns the entries that may match any of 'filters'
+        if not filters or not all(filters):
+            return self._entries
+        _, tags, unindexed = self._get_tables()
+        found = set(unindexed)
+        for f in filters:
+            found.update(n for _, n in tags.candidates(f))
+        return [self._entries[n] for n in sorted(found)]
+
+    @property
+    def versions(self):
+        """All entries in the feed, ordered from newest to oldest."""
+        return [e.materialize() for e in self._entries]
 
     def __repr__(self):
         return "<Index({!r}, next={!r}, versions=[...{} entries])>".format(
             self.source_url,
             self.next_url,
-            len(self.versions),
+            len(self._entries),
         )
 
     def find_all(self, tags, *, seen_ids=None, loose_company=False, with_prerelease=False):
@@ -221,25 +386,65 @@ class Index:
                 filters.append(tag_or_range(tag))
             except ValueError as ex:
                 LOGGER.warn("%s", ex)
-        for i in self.versions:
+        for e in self._candidates(filters):
+            if not with_prerelease and e.sort_version.is_prerelease:
+                continue
             if seen_ids is not None:
-                if i["id"].casefold() in seen_ids:
+                if e["id"].casefold() in seen_ids:
                     continue
-            if with_prerelease or not i["sort-version"].is_prerelease:
-                if not filters or install_matches_any(i, filters, loose_company=loose_company):
-                    if seen_ids is not None:
-                        seen_ids.add(i["id"].casefold())
-                    yield i
+            if not filters or install_matches_any(e, filters, loose_company=loose_company):
+                i = e.materialize()
+                if seen_ids is not None:
+                    seen_ids.add(i["id"].casefold())
+                yield i
+
+    def find_by_id(self, install_id, *, with_prerelease=True):
+        """Returns the first entry with 'install_id', or None."""
+        ids, _, unindexed = self._get_tables()
+        install_id = install_id.casefold()
+        for n in sorted([*ids.get(install_id, ()), *unindexed]):
+            e = self._entries[n]
+            if not with_prerelease and e.sort_version.is_prerelease:
+                continue
+            if e["id"].casefold() == install_id:
+                return e.materialize()
+        return None
 
     def find_to_install(self, tag, *, loose_company=False, prefer_prerelease=False):
         tag_list = [tag] if tag else []
         LOGGER.debug("Finding %s to install", tag_list)
-        for i in self.find_all(tag_list, loose_company=loose_company, with_prerelease=prefer_prerelease):
-            return {**i, "source": self.source_url}
+        filters = []
+        for t in tag_list:
+            try:
+                filters.append(tag_or_range(t))
+            except ValueError as ex:
+                LOGGER.warn("%s", ex)
+
+        # Matching is attempted with strict company names (unless
+        # 'loose_company'), then loose company names, then (unless
+        # 'prefer_prerelease') loose names including prereleases. The first
+        # match from the earliest attempt is selected, which we find in one
+        # pass by ranking each candidate.
+        attempts = []
         if not loose_company:
-            return self.find_to_install(tag, loose_company=True, prefer_prerelease=prefer_prerelease)
+            attempts.append((False, prefer_prerelease))
+        attempts.append((True, prefer_prerelease))
         if not prefer_prerelease:
-            for i in self.find_all(tag_list, loose_company=loose_company, with_prerelease=True):
-                return {**i, "source": self.source_url}
+            attempts.append((True, True))
+
+        best = best_rank = None
+        for e in self._candidates(filters):
+            for rank, (loose, with_prerelease) in enumerate(attempts):
+                if best_rank is not None and rank >= best_rank:
+                    break
+                if not with_prerelease and e.sort_version.is_prerelease:
+                    continue
+                if not filters or install_matches_any(e, filters, loose_company=loose):
+                    best, best_rank = e, rank
+                    break
+            if best_rank == 0:
+                break
+        if best is not None:
+            return {**best.materialize(), "source": self.source_url}
         LOGGER.debug("No install found for %s", tag_list)
         raise LookupError(tag)
@@ -8,9 +8,11 @@ from .exceptions import (
     FilesInUseError,
     NoInstallFoundError,
 )
-from .fsutils import ensure_tree, rmtree, unlink
+from .fsutils import ensure_tree, link_or_copy, rmtree, unlink
 from .indexutils import Index
-from .logging import CONSOLE_MAX_WIDTH, LOGGER, ProgressPrinter, VERBOSE
+from .installs import update_install_cache
+from .launchtable import update_launch_table
+from .logging import CONSOLE_MAX_WIDTH, LOGGER, MultiProgressPrinter, ProgressPrinter, VERBOSE
 from .pathutils import Path, PurePath
 from .tagutils import install_matches_any, tag_or_range
 from .urlutils import (
@@ -24,14 +26,18 @@ from .urlutils import (
 def _multihash(file, hashes):
     import hashlib
     LOGGER.debug("Calculating hashes: %s", ", ".join(hashes))
-    hashers = [(hashlib.new(k), k, v) for k, v in hashes.items()]
+    hashers = [(hashlib.new(k), k) for k in hashes]
 
     for chunk in iter(lambda: file.read(1024 * 1024), b""):
-        for h in hashers:
-            h[0].update(chunk)
+        for h, _ in hashers:
+            h.update(chunk)
 
-    for h, alg, expect in hashers:
-        actual = h.hexdigest().casefold()
+    _check_digests(hashes, {alg: h.hexdigest() for h, alg in hashers})
+
+
+def _check_digests(hashes, digests):
+    for alg, expect in hashes.items():
+        actual = digests[alg].casefold()
         expect = expect.casefold()
         if expect and actual != expect:
             raise HashMismatchError(f"Hash mismatch: {alg}:{actual} (expected {expect})")
@@ -62,11 +68,9 @@ def select_package(index_downloader, tag, platform=None, *, urlopen=_urlopen, by
     for index in index_downloader:
         try:
             if by_id:
-                for v in index.versions:
-                    if not allow_pre and v["sort-version"].is_prerelease:
-                        continue
-                    if v["id"].casefold() == tag.casefold():
-                        return v
+                v = index.find_by_id(tag, with_prerelease=allow_pre)
+                if v:
+                    return v
                 raise LookupError("Could not find a runtime matching '{}' at '{}'".format(
                     tag, sanitise_url(index.source_url)
                 ))
@@ -96,7 +100,8 @@ def select_package(index_downloader, tag, platform=None, *, urlopen=_urlopen, by
     raise RuntimeError("End of select_package reached")
 
 
-def download_package(cmd, install, dest, cache, *, on_progress=None, urlopen=_urlopen, urlretrieve=_urlretrieve):
+def download_package(cmd, install, dest, cache, *, on_progress=None, bundled_name=None,
+                     cancel=None, urlopen=_urlopen, urlretrieve=_urlretrieve):
     LOGGER.debug("Starting download package %s to %s", sanitise_url(install["url"]), dest)
 
     if not cmd.force and dest.is_file():
@@ -110,7 +115,8 @@ def download_package(cmd, install, dest, cache, *, on_progress=None, urlopen=_ur
             return dest
 
     if cmd.bundled_dir:
-        bundled = cmd.bundled_dir / dest.name
+        # Bundled packages are named like offline indexes, not the cache
+        bundled = cmd.bundled_dir / (bundled_name or dest.name)
         if bundled.is_file():
             try:
                 validate_package(install, bundled, delete=False)
@@ -137,23 +143,34 @@ def download_package(cmd, install, dest, cache, *, on_progress=None, urlopen=_ur
         return None
 
     ensure_tree(dest)
-    urlretrieve(
+    digests = urlretrieve(
         install["url"],
         dest,
         on_progress=on_progress,
         on_auth_request=_find_creds,
         on_cancel=lambda: cmd.ask_yn("Abort download?"),
+        hashes=list(install.get("hash", ())),
+        cancel_event=cancel,
     )
     LOGGER.debug("Downloaded to %s", dest)
+    validate_package(install, dest, digests=digests)
     return dest
 
 
-def validate_package(install, dest, *, delete=True):
+def validate_package(install, dest, *, delete=True, digests=None):
+    """Checks the hashes listed in 'install' against 'dest'.
+
+    If 'digests' contains every hash, it was calculated while downloading and
+    the file is not read again.
+    """
     if "hash" in install:
         LOGGER.debug("Starting hash validation of %s", dest)
         try:
-            with open(dest, "rb") as f:
-                _multihash(f, install["hash"])
+            if digests and all(k in digests for k in install["hash"]):
+                _check_digests(install["hash"], digests)
+            else:
+                with open(dest, "rb") as f:
+                    _multihash(f, install["hash"])
         except HashMismatchError as ex:
             if not delete:
                 raise
@@ -394,8 +411,13 @@ def _find_one(cmd, source, tag, *, installed=None, by_id=False, allow_pre=True):
         LOGGER.verbose("Searching for default Python version")
 
     download_cache = cmd.scratch.setdefault("install_command.download_cache", {})
-    downloader = IndexDownloader(cmd, source, Index, {}, download_cache)
-    install = select_package(downloader, tag, cmd.default_platform, by_id=by_id, allow_pre=allow_pre)
+    # Sharded feeds only need the shards that may contain our tag
+    shard_tags = None
+    if tag and not by_id:
+        shard_tags = [tag, tag + cmd.default_platform] if cmd.default_platform else [tag]
+    with IndexDownloader(cmd, source, Index, {}, download_cache, prefetch=True,
+                         tags=shard_tags) as downloader:
+        install = select_package(downloader, tag, cmd.default_platform, by_id=by_id, allow_pre=allow_pre)
 
     # Ensure the requested source URL is in the install
     if install and source:
@@ -438,20 +460,60 @@ def _find_one(cmd, source, tag, *, installed=None, by_id=False, allow_pre=True):
     return None
 
 
-def _download_one(cmd, source, install, download_dir, *, must_copy=False):
-    package = download_dir / f"{install['id']}-{install['sort-version']}.zip"
-    # Preserve nupkg extensions so we can directly reference Nuget packages
-    if install["url"].casefold().endswith(".nupkg".casefold()):
-        package = package.with_suffix(".nupkg")
+def _progress(task, operation):
+    if task is not None:
+        return task.begin(operation)
+    return ProgressPrinter(operation, maxwidth=CONSOLE_MAX_WIDTH)
+
+
+def _get_download_cache(cmd):
+    # Shared for the whole command, so that concurrent downloads are recorded
+    # under the same lock.
+    try:
+        return cmd.scratch["install_command.package_cache"]
+    except LookupError:
+        from .cacheutils import get_download_cache
+        return cmd.scratch.setdefault("install_command.package_cache", get_download_cache(cmd))
+
+
+def _prune_download_cache(cmd):
+    max_size = getattr(cmd, "download_cache_max_size", None)
+    if max_size is None or max_size < 0:
+        return
+    try:
+        removed = _get_download_cache(cmd).evict(max_size * 1024 * 1024)
+    except OSError:
+        LOGGER.verbose("Failed to remove old downloads.")
+        LOGGER.debug("ERROR:", exc_info=True)
+        return
+    if removed:
+        LOGGER.verbose("Removed %s unused package(s) from the download cache.", len(removed))
+
+
+def _download_one(cmd, source, install, download_dir, *, must_copy=False, progress=None,
+                  cancel=None):
+    from .cacheutils import get_package_suffix
+    name = f"{install['id']}-{install['sort-version']}{get_package_suffix(install)}"
+
+    # Packages are stored by their hash, so the same file is only downloaded
+    # once, even if it is listed under different IDs or sources.
+    cache = _get_download_cache(cmd)
+    package = cache.get_path(install)
+    # Earlier versions saved packages as '<ID>-<version>.zip' in download_dir
+    cache.adopt(cmd.download_dir / name, install)
 
     download_cache = cmd.scratch.setdefault("install_command.download_cache", {})
-    with ProgressPrinter("Downloading", maxwidth=CONSOLE_MAX_WIDTH) as on_progress:
-        package = download_package(cmd, install, package, download_cache, on_progress=on_progress)
-    validate_package(install, package)
-    if must_copy and package.parent != download_dir:
-        import shutil
-        dst = download_dir / package.name
-        shutil.copyfile(package, dst)
+    with _progress(progress, "Downloading") as on_progress:
+        # Validates the package, whether it is downloaded, cached or bundled
+        package = download_package(cmd, install, package, download_cache,
+                                   on_progress=on_progress, bundled_name=name,
+                                   cancel=cancel)
+    if package == cache.get_path(install):
+        cache.record(install, package)
+    if must_copy:
+        dst = download_dir / name
+        LOGGER.debug("Linking %s to %s", package, dst)
+        link_or_copy(package, dst)
         return dst
     return package
 
@@ -552,7 +614,7 @@ def _restore_site(cmd, state):
             LOGGER.verbose("TRACEBACK", exc_info=True)
 
 
-def _install_one(cmd, source, install, *, target=None):
+def _install_one(cmd, source, install, *, target=None, package=None, progress=None):
     if cmd.repair:
         LOGGER.info("Repairing %s.", install['display-name'])
     elif cmd.update:
@@ -565,7 +627,8 @@ def _install_one(cmd, source, install, *, target=None):
         LOGGER.info("Skipping rest of install due to --dry-run")
         return
 
-    package = _download_one(cmd, source, install, cmd.download_dir)
+    if package is None:
+        package = _download_one(cmd, source, install, cmd.download_dir)
 
     dest = target or (cmd.install_dir / install["id"])
     metadata_dest = dest / "__install__.json"
@@ -577,7 +640,7 @@ def _install_one(cmd, source, install, *, target=None):
         if not cmd.repair:
             _remove_existing(dest)
 
-        with ProgressPrinter("Extracting", maxwidth=CONSOLE_MAX_WIDTH) as on_progress:
+        with _progress(progress, "Extracting") as on_progress:
             extract_package(package, dest, on_progress=on_progress, repair=cmd.repair)
 
         if target:
@@ -593,6 +656,8 @@ def _install_one(cmd, source, install, *, target=None):
             with open(metadata_dest, "w", encoding="utf-8") as f:
                 json.dump(install, f, default=str)
 
+            update_install_cache(cmd.install_dir)
+
     finally:
         # May be letting an exception bubble out here, so we'll handle and log
         # here rather than letting any new ones leave.
@@ -612,6 +677,95 @@ def _install_one(cmd, source, install, *, target=None):
     LOGGER.verbose("Install complete")
 
 
+def _install_all(cmd, items, *, download=None):
+    """Installs each (source, install) pair in 'items', or downloads them into
+    the 'download' directory if provided.
+
+    With 'cmd.jobs' greater than one, up to that many packages are downloaded
+    at once while earlier packages are extracted in order. Every runtime is
+    attempted even if others fail, and the outcome of each is reported.
+
+    Returns a list of (install, package) for each runtime that succeeded, and
+    the first exception raised by any that failed (or None).
+    """
+    unique = []
+    for source, install in items:
+        if any(_same_install(install, i) for _, i in unique):
+            LOGGER.debug("Skipping duplicate request for %s", install["id"])
+            continue
+        unique.append((source, install))
+
+    done = []
+    failed = []
+    jobs = cmd.jobs or 1
+    if jobs <= 1 or len(unique) <= 1 or cmd.dry_run:
+        for source, install in unique:
+            try:
+                if download:
+                    LOGGER.info("Downloading %s", install["display-name"])
+                    package = _download_one(cmd, source, install, download, must_copy=True)
+                else:
+                    package = _install_one(cmd, source, install)
+            except Exception as ex:
+                LOGGER.debug("Failed to process %s", install["id"], exc_info=True)
+                failed.append((install, ex))
+            else:
+                done.append((install, package))
+        return _report_outcome(cmd, done, failed, download)
+
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    LOGGER.verbose("Processing %s runtimes with up to %s concurrent downloads",
+                   len(unique), jobs)
+    # Downloads cannot be interrupted directly in worker threads
+    cancel = threading.Event()
+    with MultiProgressPrinter(maxwidth=CONSOLE_MAX_WIDTH) as progress:
+        pool = ThreadPoolExecutor(max_workers=jobs)
+        try:
+            pending = []
+            for source, install in unique:
+                task = progress.add(install["display-name"])
+                pending.append((source, install, task, pool.submit(
+                    _download_one, cmd, source, install, download or cmd.download_dir,
+                    must_copy=bool(download), progress=task, cancel=cancel,
+                )))
+            # Extract in the requested order while later downloads continue
+            for source, install, task, future in pending:
+                try:
+                    package = future.result()
+                    if not download:
+                        _install_one(cmd, source, install, package=package, progress=task)
+                except Exception as ex:
+                    LOGGER.debug("Failed to process %s", install["id"], exc_info=True)
+                    failed.append((install, ex))
+                else:
+                    done.append((install, package))
+        except BaseException:
+            # Stop any downloads in progress, but don't wait for them
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+    return _report_outcome(cmd, done, failed, download)
+
+
+def _report_outcome(cmd, done, failed, download):
+    if download:
+        action = "download"
+    elif cmd.repair:
+        action = "repair"
+    elif cmd.update:
+        action = "update to"
+    else:
+        action = "install"
+    if not cmd.dry_run:
+        for install, _ in done:
+            LOGGER.info("Completed %s %s.", action, install["display-name"])
+    for install, ex in failed:
+        LOGGER.error("Failed to %s %s: %s", action, install["display-name"], ex)
+    return done, (failed[0][1] if failed else None)
+
+
 def _remove_existing(install_dir):
     try:
         rmtree(
@@ -735,6 +889,7 @@ def execute(cmd):
         else:
             LOGGER.info("Refreshing install registrations.")
             update_all_shortcuts(cmd)
+            update_launch_table(cmd)
             print_cli_shortcuts(cmd)
             LOGGER.debug("END install_command.execute")
         return
@@ -837,17 +992,20 @@ def execute(cmd):
             # Do not check for existing installs
             installed = []
 
+        # Set when some runtimes could not be installed while others were.
+        # The others are still registered before the error is reported.
+        failed_exc = None
         try:
             if not cmd.tags:
                 if cmd.repair:
                     LOGGER.verbose("No tags provided, repairing all installs:")
-                    for install in installed:
-                        # Only try to redownload from the same source
-                        _install_one(cmd, install.get('source'), install)
+                    # Only try to redownload from the same source
+                    _, failed_exc = _install_all(cmd, [(i.get('source'), i) for i in installed])
                     # Fallthrough is safe - cmd.tags is empty
                 elif cmd.update:
                     LOGGER.verbose("No tags provided, updating all installs:")
                     from .verutils import Version
+                    updates = []
                     for install in installed:
                         first_exc = None
                         update = None
@@ -871,13 +1029,14 @@ def execute(cmd):
                             # Reachable if all sources are blank
                             raise RuntimeError("All install sources failed, nothing can be updated.")
                         if update and update["sort-version"] > install["sort-version"]:
-                            _install_one(cmd, source, update)
+                            updates.append((source, update))
                         else:
                             LOGGER.verbose(
                                 "No new version available for %s\\%s '%s'.",
                                 install["company"], install["tag"],
                                 install["display-name"],
                             )
+                    _, failed_exc = _install_all(cmd, updates)
                     # Fallthrough is safe - cmd.tags is empty
                 else:
                     raise ArgumentError("Specify at least one tag to install, or 'default' for "
@@ -909,18 +1068,18 @@ def execute(cmd):
                     raise first_exc
                 # Reachable if all sources are blank
                 raise RuntimeError("All install sources failed, nothing can be installed.")
-            for install in installs:
+            if installs:
+                done, failed_exc = _install_all(
+                    cmd, [(source, i) for i in installs], download=cmd.download
+                )
                 if cmd.download:
-                    LOGGER.info("Downloading %s", install["display-name"])
-                    package = _download_one(cmd, source, install, cmd.download, must_copy=True)
-                    install_idx = {
-                        **install,
-                        "url": package.name,
-                    }
-                    install_idx.pop("source", None)
-                    download_index["versions"].append(install_idx)
-                else:
-                    _install_one(cmd, source, install)
+                    for install, package in done:
+                        install_idx = {
+                            **install,
+                            "url": package.name,
+                        }
+                        install_idx.pop("source", None)
+                        download_index["versions"].append(install_idx)
         except ArgumentError:
             raise
         except NoInstallFoundError as ex:
@@ -942,9 +1101,16 @@ def execute(cmd):
                 LOGGER.info("Skipping shortcut refresh due to --dry-run")
             else:
                 update_all_shortcuts(cmd)
+                update_launch_table(cmd)
                 if not cmd.automatic:
                     print_cli_shortcuts(cmd)
 
+        if not cmd.dry_run:
+            _prune_download_cache(cmd)
+
+        if failed_exc:
+            return _fatal_install_error(cmd, failed_exc)
+
     finally:
         if cmd.automatic:
             LOGGER.info("To see all available commands, run '!G!py help!W!'")
@@ -1,9 +1,10 @@
 import json
+import os
 
 from .exceptions import NoInstallFoundError, NoInstallsError
 from .logging import DEBUG, LOGGER
 from .pathutils import Path
-from .tagutils import CompanyTag, tag_or_range, companies_match, split_platform
+from .tagutils import CompanyTag, TagIndex, tag_or_range, companies_match, split_platform
 from .verutils import Version
 
 
@@ -17,11 +18,35 @@ def _make_sort_key(install):
     )
 
 
-def _get_installs(install_dir):
+# Consolidated list of parsed and sorted installs, so that launches do not
+# need to open and parse every __install__.json.
+_INSTALL_CACHE_NAME = "__install_cache__.json"
+
+
+def _is_reserved_name(name):
+    # Our own files in the install directory (such as the install cache and
+    # launch table) all start with double underscores, and are never installs.
+    return name.startswith("__")
+
+
+def _stat_key(st):
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _scan_installs(install_dir):
+    # Returns (entries, installs, clean). 'entries' maps each directory name
+    # to the stat key of its __install__.json, or None if it has none.
+    # 'clean' is False if anything was skipped due to an error.
+    entries = {}
+    installs = []
+    clean = True
     for d in Path(install_dir).iterdir():
+        if _is_reserved_name(d.name):
+            continue
         p = d / "__install__.json"
         try:
             with p.open() as f:
+                st = os.fstat(f.fileno())
                 j = json.load(f)
         except ValueError:
             LOGGER.warn(
@@ -30,8 +55,10 @@ def _get_installs(install_dir):
                 d
             )
             LOGGER.debug("ERROR", exc_info=True)
+            clean = False
             continue
         except FileNotFoundError:
+            entries[d.name] = None
             continue
 
         if j.get("schema", 0) == 1:
@@ -40,18 +67,123 @@ def _get_installs(install_dir):
                 j["display-name"] = j["displayName"]
             except LookupError:
                 pass
-            yield {
-                **j,
-                "prefix": p.parent,
-                "executable": p.parent / j["executable"],
-            }
+            entries[d.name] = _stat_key(st)
+            installs.append((d.name, j))
         else:
             LOGGER.warn(
                 "Unrecognized schema %s in %s. You may need to update.",
                 j.get("schema", "None"),
                 p,
             )
+            clean = False
             continue
+    return entries, installs, clean
+
+
+def _install_cache_is_current(install_dir, entries):
+    with os.scandir(install_dir) as it:
+        names = {e.name for e in it if not _is_reserved_name(e.name)}
+    if names != set(entries):
+        LOGGER.debug("Install cache is stale: directories have changed")
+        return False
+    for name, expect in entries.items():
+        try:
+            actual = _stat_key(os.stat(os.path.join(install_dir, name, "__install__.json")))
+        except FileNotFoundError:
+            actual = None
+        if actual != expect:
+            LOGGER.debug("Install cache is stale: %s has changed", name)
+            return False
+    return True
+
+
+def _read_install_cache(install_dir):
+    try:
+        with open(os.path.join(install_dir, _INSTALL_CACHE_NAME), "rb") as f:
+            cache = json.load(f)
+        if cache["schema"] != 1 or not _install_cache_is_current(install_dir, cache["entries"]):
+            return None
+        return cache
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, LookupError, TypeError):
+        LOGGER.debug("Failed to read install cache", exc_info=True)
+        return None
+
+
+def get_install_cache_state(install_dir):
+    """Returns a JSON-compatible value identifying the current set of installs,
+    or None if the install cache is not current.
+
+    Pass the value to is_install_cache_state_current() to check whether any
+    installs have changed since.
+    """
+    cache = _read_install_cache(install_dir)
+    return cache["entries"] if cache else None
+
+
+def is_install_cache_state_current(install_dir, state):
+    try:
+        return _install_cache_is_current(install_dir, state)
+    except (OSError, AttributeError, TypeError):
+        return False
+
+
+def _write_install_cache(install_dir, entries, installs):
+    cache_file = os.path.join(install_dir, _INSTALL_CACHE_NAME)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "schema": 1,
+                "entries": entries,
+                "installs": [{"dir": d, "install": j} for d, j in installs],
+            }, f, default=str)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        LOGGER.debug("Failed to write install cache", exc_info=True)
+        try:
+            os.unlink(tmp_file)
+        except OSError:
+            pass
+
+
+def _rebuild_install_cache(install_dir):
+    entries, installs, clean = _scan_installs(install_dir)
+    installs.sort(key=lambda i: _make_sort_key(i[1]))
+    # Broken installs should keep warning until they are fixed, so we only
+    # save a cache when everything was read successfully.
+    if clean:
+        _write_install_cache(install_dir, entries, installs)
+    return installs
+
+
+def update_install_cache(install_dir):
+    """Rebuilds the cached install list after installs have been modified.
+
+    Failures are ignored, as the cache will be validated and rebuilt on the
+    next read anyway.
+    """
+    try:
+        _rebuild_install_cache(install_dir)
+    except (OSError, ValueError):
+        LOGGER.debug("Failed to update install cache", exc_info=True)
+
+
+def _get_installs(install_dir):
+    cache = _read_install_cache(install_dir)
+    if cache is None:
+        installs = _rebuild_install_cache(install_dir)
+    else:
+        LOGGER.debug("Using cached install list")
+        installs = [(i["dir"], i["install"]) for i in cache["installs"]]
+    for d, j in installs:
+        prefix = Path(install_dir) / d
+        yield {
+            **j,
+            "prefix": prefix,
+            "executable": prefix / j["executable"],
+        }
 
 
 def _get_unmanaged_installs():
@@ -59,6 +191,11 @@ def _get_unmanaged_installs():
     return get_unmanaged_installs()
 
 
+def _get_unmanaged_run_for_tags():
+    from .pep514utils import get_unmanaged_run_for_tags
+    return get_unmanaged_run_for_tags()
+
+
 def _get_venv_install(virtual_env):
     if not virtual_env:
         raise LookupError
@@ -93,6 +230,29 @@ def _get_venv_install(virtual_env):
     }
 
 
+def _read_unmanaged_installs():
+    LOGGER.debug("Reading unmanaged installs")
+    try:
+        um_installs = _get_unmanaged_installs()
+    except Exception as ex:
+        LOGGER.warn("Failed to read unmanaged installs: %s", ex)
+        LOGGER.debug("TRACEBACK:", exc_info=True)
+        return []
+    LOGGER.debug("Found %s %s", len(um_installs),
+                 "install" if len(um_installs) == 1 else "installs")
+    return um_installs
+
+
+def _insert_venv_install(installs, virtual_env):
+    if virtual_env:
+        LOGGER.debug("Checking for virtual environment at %s", virtual_env)
+        try:
+            installs.insert(0, _get_venv_install(virtual_env))
+            LOGGER.debug("Found 1 install")
+        except LookupError:
+            LOGGER.debug("No virtual environment found")
+
+
 def get_installs(
     install_dir,
     include_unmanaged=True,
@@ -104,27 +264,10 @@ def get_installs(
                  "install" if len(installs) == 1 else "installs")
 
     if include_unmanaged:
-        LOGGER.debug("Reading unmanaged installs")
-        try:
-            um_installs = _get_unmanaged_installs()
-        except Exception as ex:
-            LOGGER.warn("Failed to read unmanaged installs: %s", ex)
-            LOGGER.debug("TRACEBACK:", exc_info=True)
-        else:
-            LOGGER.debug("Found %s %s", len(um_installs),
-                         "install" if len(um_installs) == 1 else "installs")
-            installs.extend(um_installs)
+        installs.extend(_read_unmanaged_installs())
 
     installs.sort(key=_make_sort_key)
-
-    if virtual_env:
-        LOGGER.debug("Checking for virtual environment at %s", virtual_env)
-        try:
-            installs.insert(0, _get_venv_install(virtual_env))
-            LOGGER.debug("Found 1 install")
-        except LookupError:
-            LOGGER.debug("No virtual environment found")
-
+    _insert_venv_install(installs, virtual_env)
     return installs
 
 
@@ -209,6 +352,29 @@ def _patch_install_to_run(i, run_for):
     }
 
 
+class InstallTagIndex:
+    """The 'run-for' tags of a list of installs, parsed and indexed once.
+
+    May be passed in place of the list of installs to
+    get_matching_install_tags() and select_install_to_run() when matching
+    many tags against the same installs. The list must not be modified while
+    the index is in use.
+    """
+
+    def __init__(self, installs):
+        self.installs = installs
+        self.tags = TagIndex()
+        for n, i in enumerate(installs):
+            for t in i.get("run-for", ()):
+                self.tags.add(CompanyTag(i["company"], t["tag"]), (n, i, t))
+
+    def __len__(self):
+        return len(self.installs)
+
+    def __iter__(self):
+        return iter(self.installs)
+
+
 def get_matching_install_tags(
     installs,
     tag,
@@ -216,47 +382,61 @@ def get_matching_install_tags(
     default_platform=None,
     single_tag=False,
 ):
+    return _get_matching_install_tags(
+        installs,
+        tag,
+        windowed,
+        default_platform,
+        single_tag,
+    )[0]
+
+
+def _get_matching_install_tags(installs, tag, windowed, default_platform, single_tag):
+    # Returns (best, conclusive). 'conclusive' is True when appending more
+    # installs that are neither exact matches nor ahead of 'installs' in the
+    # sort order (that is, unmanaged installs) could not change best[0].
     exact_matches = []
     core_matches = []
     matches = []
     unmanaged_matches = []
     fallback_matches = []
 
-    # Installs are in the correct order, so we'll first collect all the matches.
-    # If no tag is provided, we still expand out the list by all of 'run-for'
+    if not isinstance(installs, InstallTagIndex):
+        installs = InstallTagIndex(installs)
+
+    # Candidates are in the correct order, so we'll first collect all the
+    # matches. If no tag is provided, we still expand out the list by all of
+    # 'run-for'
     if tag:
         if isinstance(tag, str):
             tag = tag_or_range(tag)
         LOGGER.debug("Filtering installs by tag = %s", tag)
-    for i in installs:
-        matched_any = False
-        for t in i.get("run-for", ()):
-            ct = CompanyTag(i["company"], t["tag"])
-            if tag and ct == tag:
-                exact_matches.append((i, t))
-                matched_any = True
-            elif not tag or tag.satisfied_by(ct):
-                if (
-                    isinstance(tag, CompanyTag)
-                    and not companies_match(tag.company, i["company"])
-                ):
-                    fallback_matches.append((i, t))
-                    matched_any = True
-                elif i.get("unmanaged"):
-                    unmanaged_matches.append((i, t))
-                    matched_any = True
-                elif ct.is_core:
-                    core_matches.append((i, t))
-                    matched_any = True
-                else:
-                    matches.append((i, t))
-                    matched_any = True
-            if single_tag and matched_any:
-                break
-        if LOGGER.would_log_to_console(DEBUG):
-            # Don't bother listing all installs unless the user has asked
-            # for console output.
-            if matched_any:
+    matched = set()
+    for ct, (n, i, t) in installs.tags.candidates(tag or None):
+        if single_tag and n in matched:
+            continue
+        if tag and ct == tag:
+            exact_matches.append((i, t))
+        elif not tag or tag.satisfied_by(ct):
+            if (
+                isinstance(tag, CompanyTag)
+                and not companies_match(tag.company, i["company"])
+            ):
+                fallback_matches.append((i, t))
+            elif i.get("unmanaged"):
+                unmanaged_matches.append((i, t))
+            elif ct.is_core:
+                core_matches.append((i, t))
+            else:
+                matches.append((i, t))
+        else:
+            continue
+        matched.add(n)
+    if LOGGER.would_log_to_console(DEBUG):
+        # Don't bother listing all installs unless the user has asked
+        # for console output.
+        for n, i in enumerate(installs.installs):
+            if n in matched:
                 LOGGER.debug("Filter included %s", i["id"])
             else:
                 LOGGER.debug("Filter did not include %s", i["id"])
@@ -277,13 +457,16 @@ def get_matching_install_tags(
         if fallback_matches:
             LOGGER.debug("- %s additional installs by tag alone", len(fallback_matches))
 
+    conclusive = bool(best)
     if not best and fallback_matches:
         best = fallback_matches
 
     # Filter for 'windowed' matches. If none, keep them all
     if windowed is not None:
         windowed = bool(windowed)
-        best = [(i, t) for i, t in best if windowed == bool(t.get("windowed"))] or best
+        best2 = [(i, t) for i, t in best if windowed == bool(t.get("windowed"))]
+        conclusive = conclusive and bool(best2)
+        best = best2 or best
         LOGGER.debug("windowed = %s matched %s %s", windowed,
                      len(best), "install" if len(best) == 1 else "installs")
 
@@ -298,6 +481,11 @@ def get_matching_install_tags(
                 or t["tag"].casefold().endswith(default_platform)]
         LOGGER.debug("default_platform '%s' matched %s %s", default_platform,
                      len(best), "install" if len(best) == 1 else "installs")
+        # Only a filtered list that includes a non-prerelease is certain to
+        # be kept when more installs are added.
+        conclusive = conclusive and not all(
+            Version(i["sort-version"]).is_prerelease for i, t in best
+        )
         if (
             not best or
             (not all_pre and all(Version(i["sort-version"]).is_prerelease for i, t in best))
@@ -305,7 +493,7 @@ def get_matching_install_tags(
             LOGGER.debug("Reusing unfiltered list")
             best = best2
 
-    return best
+    return best, conclusive
 
 
 def get_install_to_run(
@@ -318,30 +506,111 @@ def get_install_to_run(
     default_platform=None,
 ):
     """Returns the first install matching 'tag'.
+
+    Unmanaged installs are only read when the managed installs cannot decide
+    the result on their own.
     """
     installs = get_installs(
         install_dir,
-        include_unmanaged=include_unmanaged,
+        include_unmanaged=False,
         virtual_env=virtual_env,
     )
+    if include_unmanaged:
+        i = _select_managed_install_to_run(
+            installs,
+            default_tag,
+            tag,
+            windowed=windowed,
+            default_platform=default_platform,
+        )
+        if i:
+            return i
+        um_installs = _read_unmanaged_installs()
+        if um_installs:
+            venv = installs[:1] if installs and installs[0].get("id") == "__active-virtual-env" else []
+            installs = sorted([*installs[len(venv):], *um_installs], key=_make_sort_key)
+            installs[:0] = venv
+    return select_install_to_run(
+        installs,
+        default_tag,
+        tag,
+        windowed=windowed,
+        default_platform=default_platform,
+    )
 
-    if not installs:
-        raise NoInstallsError
 
+def _resolve_tag(installs, default_tag, tag):
+    # Returns (installs, tag, used_default)
     if not tag or tag.casefold() == "default".casefold():
         # We know we want default, so try filtering first. If any are explicitly
         # tagged (e.g. active venv), they will be the only candidates.
         # Otherwise, we'll do a regular search as if 'default_tag' was provided.
         default_installs = [i for i in installs if i.get("default")]
         if default_installs:
-            installs = default_installs
-            tag = None
-        else:
-            tag = tag_or_range(default_tag)
-        used_default = True
-    else:
-        tag = tag_or_range(tag)
-        used_default = False
+            return default_installs, None, True
+        return installs, tag_or_range(default_tag), True
+    return installs, tag_or_range(tag), False
+
+
+def _could_match_unmanaged_exactly(tag):
+    if not tag or not isinstance(tag, CompanyTag):
+        return False
+    try:
+        candidates = _get_unmanaged_run_for_tags()
+    except Exception:
+        LOGGER.debug("Failed to list unmanaged tags", exc_info=True)
+        return True
+    return any(CompanyTag(c, t) == tag for c, t in candidates)
+
+
+def _select_managed_install_to_run(
+    installs,
+    default_tag,
+    tag,
+    windowed=False,
+    default_platform=None,
+):
+    # Returns the same install as select_install_to_run() would if unmanaged
+    # installs were included, or None if they need to be read to find out.
+    if not installs:
+        return None
+    installs, tag, used_default = _resolve_tag(installs, default_tag, tag)
+    if used_default and tag is None:
+        # Unmanaged installs are never marked as default, so the result only
+        # depends on the default installs we already have.
+        return select_install_to_run(installs, default_tag, None,
+                                     windowed=windowed, default_platform=default_platform)
+    # Unmanaged installs are otherwise only preferred over managed ones when
+    # they match the tag exactly, which we can check without reading them.
+    if _could_match_unmanaged_exactly(tag):
+        LOGGER.debug("Tag %s may exactly match an unmanaged install", tag)
+        return None
+    best, conclusive = _get_matching_install_tags(
+        installs,
+        tag,
+        windowed,
+        default_platform,
+        False,
+    )
+    if not conclusive:
+        return None
+    LOGGER.debug("Selected from managed installs without reading unmanaged installs")
+    return _patch_install_to_run(*best[0])
+
+
+def select_install_to_run(
+    installs,
+    default_tag,
+    tag,
+    windowed=False,
+    default_platform=None,
+):
+    """Returns the first install from 'installs' matching 'tag'.
+    """
+    if not installs:
+        raise NoInstallsError
+
+    installs, tag, used_default = _resolve_tag(installs, default_tag, tag)
 
     best = get_matching_install_tags(
         installs,
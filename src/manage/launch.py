@@ -0,0 +1,113 @@
+"""Selects the runtime for a launch without loading the full command set.
+
+The launcher only needs the handful of configuration options that affect which
+runtime is chosen, so this module avoids importing manage.commands (with its
+help text, argument handling and command classes). Anything that may need to
+install a runtime still goes through manage.commands.
+"""
+
+import sys
+
+from .config import CONFIG_SCHEMA, DEFAULT_TAG, ConfigInputs, load_config
+from .logging import LOGGER, INFO
+from .pathutils import Path
+
+
+class LaunchConfig:
+    """The subset of command configuration used to select a runtime.
+
+    Attributes match those on manage.commands.BaseCommand, so this object may
+    be passed to functions that expect a command.
+    """
+    log_level = INFO
+    default_tag = DEFAULT_TAG
+    default_platform = None
+    automatic_install = True
+    include_unmanaged = True
+    virtual_env = None
+    shebang_can_run_anything = True
+    shebang_can_run_anything_silently = False
+    shebang_templates = {}
+
+    root = None
+    install_dir = None
+
+    def __init__(self, root):
+        LOGGER.reduce_level(self.log_level)
+        self.root = Path(root or sys.prefix)
+        self.config_inputs = ConfigInputs()
+        config = load_config(self.root, None, CONFIG_SCHEMA,
+                             inputs=self.config_inputs, use_snapshot=True)
+        self.config = config
+        self.log_level = LOGGER.reduce_level(config.get("log_level"))
+
+        self.root = config.get("root") or self.root
+        self.install_dir = self.root / "pkgs"
+
+        arg_names = frozenset(k for k, v in CONFIG_SCHEMA.items()
+            if hasattr(type(self), k) and not isinstance(v, dict))
+        for k, v in config.items():
+            if k in arg_names:
+                setattr(self, k, v)
+
+        if not self.default_platform:
+            from _native import get_processor_architecture
+            self.default_platform = get_processor_architecture()
+            LOGGER.debug("Default to current CPU architecture: %s", self.default_platform)
+
+    def get_installs(self, *, include_unmanaged=False, set_default=True):
+        return get_installs(self, include_unmanaged=include_unmanaged, set_default=set_default)
+
+    def get_install_to_run(self, tag=None, script=None, *, windowed=False):
+        return get_install_to_run(self, tag, script, windowed=windowed)
+
+
+def load_launch_config(root):
+    return LaunchConfig(root)
+
+
+def get_installs(cmd, *, include_unmanaged=False, set_default=True):
+    """Returns the installs available to 'cmd', optionally marking the one
+    selected by its 'default_tag' as the default.
+    """
+    from .installs import get_installs, get_matching_install_tags
+    installs = get_installs(
+        cmd.install_dir,
+        include_unmanaged=include_unmanaged and cmd.include_unmanaged,
+        virtual_env=cmd.virtual_env,
+    )
+    if set_default and not any(i.get("default") for i in installs):
+        LOGGER.debug("Calculating default install")
+        matching = get_matching_install_tags(
+            installs,
+            cmd.default_tag,
+            default_platform=cmd.default_platform,
+            single_tag=True,
+        )
+        if matching:
+            if matching[0][0] not in installs:
+                raise RuntimeError("get_matching_install_tags returned value from wrong list")
+            LOGGER.debug("Default install will be %s", matching[0][0]["id"])
+            matching[0][0]["default"] = True
+    return installs
+
+
+def get_install_to_run(cmd, tag=None, script=None, *, windowed=False):
+    """Returns the install that 'cmd' would launch for 'tag' or 'script'.
+    """
+    if script and not tag:
+        from .scriptutils import find_install_from_script
+        try:
+            return find_install_from_script(cmd, script, windowed=windowed)
+        except LookupError:
+            pass
+    from .installs import get_install_to_run
+    return get_install_to_run(
+        cmd.install_dir,
+        cmd.default_tag,
+        tag,
+        windowed=windowed,
+        include_unmanaged=cmd.include_unmanaged,
+        virtual_env=cmd.virtual_env,
+        default_platform=cmd.default_platform,
+    )
@@ -0,0 +1,205 @@
+"""Precomputed answers for the most common launch requests.
+
+The launch table maps the tag requested by the launcher (and whether it wants
+a windowed executable) to the executable and arguments that a full resolution
+would select, along with enough information to tell whether that answer is
+still current. It is rewritten after installs, uninstalls and refreshes, and
+any change to configuration, installs or the active environment makes it
+stale until the next rewrite.
+"""
+
+import json
+import os
+
+from .logging import LOGGER
+from .pathutils import Path
+
+
+LAUNCH_TABLE_NAME = "__launch_table__.json"
+
+
+def get_launch_table_file():
+    # The table has to be found before configuration is loaded, so it cannot
+    # follow the configured install_dir. This matches the default location.
+    appdata = os.getenv("LocalAppData")
+    if not appdata:
+        return None
+    return Path(appdata) / "Python" / LAUNCH_TABLE_NAME
+
+
+def _stat_key(file):
+    try:
+        st = os.stat(file)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _make_key(tag, windowed):
+    return f"{'w' if windowed else ''}:{tag or ''}"
+
+
+def _venv_state(virtual_env):
+    if not virtual_env:
+        return None
+    return _stat_key(Path(virtual_env) / "pyvenv.cfg")
+
+
+def _iter_tags(installs):
+    yield ""
+    seen = {""}
+    for i in installs:
+        if i.get("id") == "__active-virtual-env":
+            continue
+        for t in i.get("run-for", ()):
+            for tag in (t["tag"], f"{i['company']}\\{t['tag']}"):
+                if tag not in seen:
+                    seen.add(tag)
+                    yield tag
+
+
+def _calculate_entries(cfg, installs):
+    from .exceptions import NoInstallFoundError, NoInstallsError
+    from .installs import InstallTagIndex, select_install_to_run
+    from .scriptutils import quote_args
+
+    # Every tag is matched against the same installs, so only parse them once
+    installs = InstallTagIndex(installs)
+    entries = {}
+    for tag in _iter_tags(installs):
+        for windowed in (False, True):
+            try:
+                i = select_install_to_run(
+                    installs,
+                    cfg.default_tag,
+                    tag,
+                    windowed=windowed,
+                    default_platform=cfg.default_platform,
+                )
+            except (NoInstallFoundError, NoInstallsError, ValueError):
+                # Leave these to the full resolution, which reports errors and
+                # handles automatic installs.
+                continue
+            entries[_make_key(tag, windowed)] = [
+                str(i["executable"]),
+                quote_args(i.get("executable_args", ())),
+            ]
+    return entries
+
+
+def calculate_launch_table(root):
+    """Calculates the launch table for 'root' using the same configuration as
+    launches would. Returns None if the current state cannot be recorded.
+    """
+    from . import __version__
+    from .installs import get_installs, get_install_cache_state
+    from .launch import load_launch_config
+
+    cfg = load_launch_config(root)
+    installs = get_installs(
+        cfg.install_dir,
+        include_unmanaged=cfg.include_unmanaged,
+        virtual_env=cfg.virtual_env,
+    )
+    install_state = get_install_cache_state(cfg.install_dir)
+    if install_state is None:
+        LOGGER.debug("Not writing launch table because installs could not be cached")
+        return None
+    if cfg.include_unmanaged:
+        from .pep514utils import get_unmanaged_state
+        unmanaged_state = get_unmanaged_state()
+    else:
+        unmanaged_state = None
+
+    return {
+        "schema": 1,
+        "version": __version__,
+        "root": str(cfg.root),
+        "config": cfg.config_inputs.to_json(),
+        "install_dir": str(cfg.install_dir),
+        "installs": install_state,
+        "unmanaged": unmanaged_state,
+        "virtual_env": str(cfg.virtual_env) if cfg.virtual_env else None,
+        "venv": _venv_state(cfg.virtual_env),
+        "entries": _calculate_entries(cfg, installs),
+    }
+
+
+def update_launch_table(cmd):
+    """Rewrites the launch table after installs have been modified.
+
+    Commands without a 'launch_table' file are ignored. Failures are logged
+    but never raised, as launches will fall back to full resolution.
+    """
+    file = getattr(cmd, "launch_table", None)
+    if not file:
+        return
+    try:
+        table = calculate_launch_table(cmd.root)
+    except Exception:
+        LOGGER.debug("Failed to calculate launch table", exc_info=True)
+        table = None
+    tmp_file = file.with_name(f"{file.name}.{os.getpid()}.tmp")
+    try:
+        if table is None:
+            file.unlink()
+            return
+        LOGGER.debug("Writing launch table to %s", file)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_text(json.dumps(table, default=str))
+        os.replace(tmp_file, file)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        LOGGER.debug("Failed to write launch table", exc_info=True)
+        try:
+            tmp_file.unlink()
+        except OSError:
+            pass
+
+
+def _is_current(table):
+    from . import __version__
+    from .config import ConfigInputs
+    from .installs import is_install_cache_state_current
+
+    if table["version"] != __version__:
+        LOGGER.debug("Launch table is stale: written by version %s", table["version"])
+        return False
+    if not ConfigInputs.from_json(table["config"]).is_current():
+        return False
+    if _venv_state(table["virtual_env"]) != table["venv"]:
+        LOGGER.debug("Launch table is stale: virtual environment has changed")
+        return False
+    if not is_install_cache_state_current(table["install_dir"], table["installs"]):
+        return False
+    if table["unmanaged"] is not None:
+        from .pep514utils import get_unmanaged_state
+        if get_unmanaged_state() != table["unmanaged"]:
+            LOGGER.debug("Launch table is stale: unmanaged installs have changed")
+            return False
+    return True
+
+
+def find_in_launch_table(root, tag, windowed, file=None):
+    """Returns (executable, args) from the launch table, or None if the
+    request is not in the table or the table is not current.
+    """
+    file = file or get_launch_table_file()
+    if not file:
+        return None
+    try:
+        with open(file, "rb") as f:
+            table = json.load(f)
+        if table["schema"] != 1 or table["root"] != str(Path(root)):
+            return None
+        entry = table["entries"].get(_make_key(tag, windowed))
+        if not entry or not _is_current(table):
+            return None
+        exe, args = entry
+        return exe, args
+    except FileNotFoundError:
+        return None
+    except Exception:
+        LOGGER.debug("Failed to read launch table", exc_info=True)
+        return None
@@ -301,7 +301,7 @@ def execute(cmd):
             expect = ", ".join(sorted(formatters))
             raise ArgumentError(f"'{cmd.format}' is not a valid format; expected one of: {expect}") from None
 
-    from .tagutils import tag_or_range, install_matches_any
+    from .tagutils import tag_or_range, installs_matching_any
     tags = []
     plat = None
     for arg in cmd.args:
@@ -330,17 +330,17 @@ def execute(cmd):
             cmd.fallback_source,
         ]:
             if source:
-                downloader = IndexDownloader(cmd, source, Index)
-                downloader.quiet = True
-                try:
-                    installs = _get_installs_from_index(
-                        downloader,
-                        tags,
-                    )
-                    break
-                except OSError as ex:
-                    if first_exc is None:
-                        first_exc = ex
+                with IndexDownloader(cmd, source, Index, prefetch=True, tags=tags) as downloader:
+                    downloader.quiet = True
+                    try:
+                        installs = _get_installs_from_index(
+                            downloader,
+                            tags,
+                        )
+                        break
+                    except OSError as ex:
+                        if first_exc is None:
+                            first_exc = ex
         if first_exc:
             raise SystemExit(1) from first_exc
         if cmd.one:
@@ -364,7 +364,7 @@ def execute(cmd):
             LOGGER.debug("Filtering to following items")
             for t in tags:
                 LOGGER.debug("* %r", t)
-            installs = [i for i in installs if install_matches_any(i, tags, loose_company=True)]
+            installs = installs_matching_any(installs, tags, loose_company=True)
 
         if not cmd.unmanaged:
             # Just in case any leak through (e.g. active venv)
@@ -121,6 +121,8 @@ class Logger:
         self.print_console_colour = supports_colour(self.print_console)
         self.file = None
         self._list = None
+        # Set to a MultiProgressPrinter while it is redrawing lines in place
+        self._live_progress = None
 
     def set_level(self, level):
         self.level = level
@@ -156,8 +158,16 @@ class Logger:
             self._list.append((msg, args))
         if not ((level >= self.level) or self.file is not None):
             return
-        
-        msg = msg % args
+        live = self._live_progress if level >= self.level else None
+        if live is not None:
+            live.pause()
+        try:
+            self._log(level, msg % args, exc_info)
+        finally:
+            if live is not None:
+                live.resume()
+
+    def _log(self, level, msg, exc_info):
         if level >= self.level:
             try:
                 cm = CONSOLE_PREFIX[level].replace("{}", msg)
@@ -220,11 +230,18 @@ class Logger:
             msg = str(args[0])
         else:
             msg = ""
-        if wrap:
-            for s in wrap_and_indent(msg, codes_subbed=True):
-                print(s, **kwargs, file=self.print_console)
-        else:
-            print(msg, **kwargs, file=self.print_console)
+        live = self._live_progress
+        if live is not None:
+            live.pause()
+        try:
+            if wrap:
+                for s in wrap_and_indent(msg, codes_subbed=True):
+                    print(s, **kwargs, file=self.print_console)
+            else:
+                print(msg, **kwargs, file=self.print_console)
+        finally:
+            if live is not None:
+                live.resume()
 
     def print_raw(self, *msg, **kwargs):
         kwargs["always"] = True
@@ -295,3 +312,127 @@ class ProgressPrinter:
                 LOGGER.print(".", flush=True)
             self._complete = True
             self._need_newline = False
+
+
+def _can_encode(stream, s):
+    try:
+        s.encode(getattr(stream, "encoding", None) or "ascii")
+    except (LookupError, UnicodeEncodeError):
+        return False
+    return True
+
+
+class _ProgressTask:
+    __slots__ = ("printer", "label", "operation", "progress", "ok", "_shown")
+
+    def __init__(self, printer, label):
+        self.printer = printer
+        self.label = label
+        self.operation = None
+        self.progress = 0
+        self.ok = None
+        self._shown = None
+
+    def begin(self, operation):
+        self.operation = operation
+        self.progress = 0
+        self.ok = None
+        self.printer._update(self)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.progress = 100
+        self.ok = exc_type is None
+        self.printer._update(self)
+
+    def __call__(self, progress):
+        # Pauses (None) do not need to be shown, as other output is written
+        # above the progress lines.
+        if progress is None or self.ok is not None:
+            return
+        self.progress = progress
+        self.printer._update(self)
+
+
+class MultiProgressPrinter:
+    """Shows the progress of several concurrent operations.
+
+    When the console supports it, each task has its own line that is updated
+    in place, and other output is written above them. Otherwise, a line is
+    printed as each operation completes.
+
+    Use 'add()' to create a task for each item, and then use
+    'task.begin(operation)' in place of a ProgressPrinter.
+    """
+    def __init__(self, maxwidth=..., logger=None):
+        import threading
+        if maxwidth is ...:
+            maxwidth = CONSOLE_MAX_WIDTH
+        self.maxwidth = maxwidth
+        self.logger = logger or LOGGER
+        self.stream = self.logger.print_console
+        self._live = self.logger.print_console_colour and self.logger.would_print()
+        if _can_encode(self.stream, "✅❌"):
+            self._marks = {True: "✅", False: "❌"}
+        else:
+            self._marks = {True: ".", False: "x"}
+        self._lock = threading.RLock()
+        self._tasks = []
+        self._drawn = 0
+
+    def __enter__(self):
+        if self._live:
+            self.logger._live_progress = self
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            if self.logger._live_progress is self:
+                self.logger._live_progress = None
+
+    def add(self, label):
+        task = _ProgressTask(self, label)
+        with self._lock:
+            self._tasks.append(task)
+        return task
+
+    def _format(self, task):
+        prefix = "{}: {}: ".format(task.label, task.operation or "Waiting")
+        width = max(0, self.maxwidth - 3 - len(prefix))
+        dots = "." * min(width, task.progress * width // 100)
+        return prefix + dots + self._marks.get(task.ok, "")
+
+    def _update(self, task):
+        shown = task.operation, task.progress * self.maxwidth // 100, task.ok
+        with self._lock:
+            if task._shown == shown:
+                return
+            task._shown = shown
+            if self._live:
+                self.pause()
+                self.resume()
+            elif task.ok is not None:
+                print(self._format(task), file=self.stream, flush=True)
+
+    def pause(self):
+        """Removes the progress lines, so that other output may be written.
+        Must be followed by 'resume()'.
+        """
+        self._lock.acquire()
+        if self._drawn:
+            # Move to the start of the first line and clear to the end
+            self.stream.write("\033[{}F\033[J".format(self._drawn))
+            self._drawn = 0
+
+    def resume(self):
+        try:
+            for task in self._tasks:
+                print(self._format(task), file=self.stream)
+            self._drawn = len(self._tasks)
+            self.stream.flush()
+        finally:
+            self._lock.release()
@@ -1,3 +1,4 @@
+import json
 import os
 import time
 import winreg
@@ -48,6 +49,29 @@ def _iter_keys(key):
             return
 
 
+class WinregBackend:
+    """Read-only registry access for discovering unmanaged installs.
+
+    Alternative backends (such as an in-memory registry for tests) must
+    provide the same methods. Keys returned from 'open' must be usable as
+    context managers, and be falsey if the key does not exist.
+    """
+    def open(self, key, subkey, x86_only=None):
+        return _reg_open(key, subkey, x86_only=x86_only)
+
+    def iter_keys(self, key):
+        return _iter_keys(key)
+
+    def query_value(self, key, name):
+        return winreg.QueryValueEx(key, name)
+
+    def last_write_time(self, key):
+        return winreg.QueryInfoKey(key)[2]
+
+
+WINREG = WinregBackend()
+
+
 def _iter_values(key):
     if not key:
         return
@@ -282,11 +306,11 @@ def cleanup_registry(root_name, keep, warn_for=[]):
                 _delete_key(root, company_name)
 
 
-def _read_str(key, value_name):
+def _read_str(key, value_name, backend=WINREG):
     if not key:
         return None
     try:
-        v, vt = winreg.QueryValueEx(key, value_name)
+        v, vt = backend.query_value(key, value_name)
     except OSError:
         return None
     if vt == winreg.REG_SZ:
@@ -296,16 +320,16 @@ def _read_str(key, value_name):
     return None
 
 
-def _read_one_unmanaged_install(company_name, tag_name, is_core, tag):
-    with _reg_open(tag, "InstallPath") as dirs:
-        prefix = _read_str(dirs, None)
-        exe = _read_str(dirs, "ExecutablePath")
-        exe_arg = _read_str(dirs, "ExecutableArguments")
-        exew = _read_str(dirs, "WindowedExecutablePath")
-        exew_arg = _read_str(dirs, "WindowedExecutableArguments")
+def _read_one_unmanaged_install(company_name, tag_name, is_core, tag, backend=WINREG):
+    with backend.open(tag, "InstallPath") as dirs:
+        prefix = _read_str(dirs, None, backend)
+        exe = _read_str(dirs, "ExecutablePath", backend)
+        exe_arg = _read_str(dirs, "ExecutableArguments", backend)
+        exew = _read_str(dirs, "WindowedExecutablePath", backend)
+        exew_arg = _read_str(dirs, "WindowedExecutableArguments", backend)
 
-    display = _read_str(tag, "DisplayName")
-    ver = _read_str(tag, "Version")
+    display = _read_str(tag, "DisplayName", backend)
+    ver = _read_str(tag, "Version", backend)
     
     if not prefix or (not exe and not is_core):
         raise ValueError("Registration is incomplete")
@@ -363,26 +387,41 @@ def _read_one_unmanaged_install(company_name, tag_name, is_core, tag):
     return i
 
 
-def _get_unmanaged_installs(root):
+def _is_tag_managed_readonly(company, tag_name, backend):
+    # Equivalent to _is_tag_managed() when not creating
+    with backend.open(company, tag_name) as tag:
+        if not tag:
+            return True
+        try:
+            return bool(backend.query_value(tag, "ManagedByPyManager")[0])
+        except FileNotFoundError:
+            return False
+
+
+def _get_unmanaged_installs(root, backend=WINREG):
     if not root:
         return
-    for company_name in _iter_keys(root):
+    for company_name in backend.iter_keys(root):
         is_core = company_name.casefold() == "PythonCore".casefold()
-        with _reg_open(root, company_name) as company:
-            for tag_name in _iter_keys(company):
-                if _is_tag_managed(company, tag_name):
+        with backend.open(root, company_name) as company:
+            for tag_name in backend.iter_keys(company):
+                if _is_tag_managed_readonly(company, tag_name, backend):
                     continue
-                with _reg_open(company, tag_name) as tag:
+                with backend.open(company, tag_name) as tag:
                     try:
-                        yield _read_one_unmanaged_install(company_name, tag_name, is_core, tag)
+                        yield _read_one_unmanaged_install(company_name, tag_name, is_core, tag, backend)
                     except Exception:
                         LOGGER.debug("Failed to read %s\\%s registration",
                                      company_name, tag_name, exc_info=True)
 
 
+def _get_store_root():
+    return Path(os.getenv("LocalAppData")) / "Microsoft/WindowsApps"
+
+
 def _get_store_installs():
     SUPPORTED_PFNS = tuple(s.casefold() for s in ("_qbz5n2kfra8p0", "_3847v3x7pw1km", "_hd69rhyc2wevp"))
-    root = Path(os.getenv("LocalAppData")) / "Microsoft/WindowsApps"
+    root = _get_store_root()
     for prefix in root.glob("PythonSoftwareFoundation.Python.3.*"):
         if prefix.name.casefold().endswith(SUPPORTED_PFNS):
             tag = "3." + prefix.name.rpartition(".")[-1].partition("_")[0]
@@ -407,15 +446,150 @@ def _get_store_installs():
             }
 
 
-def get_unmanaged_installs(sort_key=None):
+# (name, hive, x86_only) for each location searched for unmanaged installs
+_UNMANAGED_ROOTS = (
+    ("HKCU", winreg.HKEY_CURRENT_USER, None),
+    ("HKLM-64", winreg.HKEY_LOCAL_MACHINE, False),
+    ("HKLM-32", winreg.HKEY_LOCAL_MACHINE, True),
+)
+
+
+UNMANAGED_CACHE_NAME = "__unmanaged_cache__.json"
+
+
+def get_unmanaged_cache_file():
+    appdata = os.getenv("LocalAppData")
+    if not appdata:
+        return None
+    return Path(appdata) / "Python" / UNMANAGED_CACHE_NAME
+
+
+def get_unmanaged_state(backend=WINREG):
+    """Returns a JSON-compatible value that changes when unmanaged installs are
+    added or removed.
+
+    This uses the last write times of the PEP 514 root and company keys, and
+    the modification time of the Store app directory. Changes to the values of
+    an existing registration are not detected.
+    """
+    state = {}
+    for name, hive, x86_only in _UNMANAGED_ROOTS:
+        with backend.open(hive, "SOFTWARE\\Python", x86_only=x86_only) as root:
+            if not root:
+                state[name] = None
+                continue
+            companies = {}
+            for company_name in backend.iter_keys(root):
+                with backend.open(root, company_name) as company:
+                    companies[company_name] = backend.last_write_time(company) if company else None
+            state[name] = [backend.last_write_time(root), companies]
+    try:
+        state["Store"] = _get_store_root().lstat().st_mtime_ns
+    except (OSError, TypeError):
+        state["Store"] = None
+    return state
+
+
+def _read_unmanaged_cache(cache_file, state):
+    try:
+        with open(cache_file, "rb") as f:
+            cache = json.load(f)
+        if cache["schema"] != 1 or cache["state"] != state:
+            LOGGER.debug("Unmanaged install cache is stale")
+            return None
+        installs = cache["installs"]
+        for i in installs:
+            i["prefix"] = Path(i["prefix"])
+            i["executable"] = Path(i["executable"])
+        return installs
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, LookupError, TypeError):
+        LOGGER.debug("Failed to read unmanaged install cache", exc_info=True)
+        return None
+
+
+def _write_unmanaged_cache(cache_file, state, installs):
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_text(json.dumps({
+            "schema": 1,
+            "state": state,
+            "installs": installs,
+        }, default=str))
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        LOGGER.debug("Failed to write unmanaged install cache", exc_info=True)
+        try:
+            tmp_file.unlink()
+        except OSError:
+            pass
+
+
+def _find_unmanaged_installs(backend):
     installs = []
-    with _reg_open(winreg.HKEY_CURRENT_USER, "SOFTWARE\\Python") as root:
-        installs.extend(_get_unmanaged_installs(root))
-    with _reg_open(winreg.HKEY_LOCAL_MACHINE, "SOFTWARE\\Python", x86_only=False) as root:
-        installs.extend(_get_unmanaged_installs(root))
-    with _reg_open(winreg.HKEY_LOCAL_MACHINE, "SOFTWARE\\Python", x86_only=True) as root:
-        installs.extend(_get_unmanaged_installs(root))
+    for _, hive, x86_only in _UNMANAGED_ROOTS:
+        with backend.open(hive, "SOFTWARE\\Python", x86_only=x86_only) as root:
+            installs.extend(_get_unmanaged_installs(root, backend))
     installs.extend(_get_store_installs())
+    return installs
+
+
+def _get_store_run_for_tags():
+    try:
+        names = [p.name for p in _get_store_root().glob("PythonSoftwareFoundation.Python.3.*")]
+    except (OSError, TypeError):
+        return
+    for name in names:
+        tag = "3." + name.rpartition(".")[-1].partition("_")[0]
+        yield "PythonCore", tag
+        yield "PythonCore", f"{tag}-64"
+        yield "PythonCore", "3"
+
+
+def get_unmanaged_run_for_tags(backend=WINREG):
+    """Returns (company, tag) pairs that unmanaged installs may list in their
+    'run-for' tags, without reading each registration.
+
+    The result may include tags for registrations that turn out to be managed
+    or incomplete, but will include every tag that get_unmanaged_installs()
+    could return.
+    """
+    tags = set()
+    for _, hive, x86_only in _UNMANAGED_ROOTS:
+        with backend.open(hive, "SOFTWARE\\Python", x86_only=x86_only) as root:
+            if not root:
+                continue
+            for company_name in backend.iter_keys(root):
+                with backend.open(root, company_name) as company:
+                    for tag_name in backend.iter_keys(company):
+                        tags.add((company_name, tag_name))
+                        # Matches the short tag from _read_one_unmanaged_install
+                        if "." in tag_name:
+                            tags.add((company_name, tag_name.partition(".")[0]))
+    tags.update(_get_store_run_for_tags())
+    return tags
+
+
+def get_unmanaged_installs(sort_key=None, *, backend=WINREG, cache_file=None):
+    """Returns installs registered in the registry or from the Store.
+
+    Results are cached in 'cache_file' (by default, alongside the default
+    install directory) and reused until get_unmanaged_state() changes.
+    """
+    if cache_file is None:
+        cache_file = get_unmanaged_cache_file()
+    installs = None
+    if cache_file:
+        state = get_unmanaged_state(backend)
+        installs = _read_unmanaged_cache(cache_file, state)
+        if installs is not None:
+            LOGGER.debug("Using cached unmanaged installs")
+    if installs is None:
+        installs = _find_unmanaged_installs(backend)
+        if cache_file:
+            _write_unmanaged_cache(cache_file, state, installs)
     if not sort_key:
         return installs
     return sorted(installs, key=sort_key)
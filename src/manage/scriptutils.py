@@ -62,10 +62,13 @@ def _find_shebang_command(cmd, full_cmd, *, windowed=None):
     # Internal logic error, but non-fatal, if it has no value
     assert windowed is not None
 
+    # The default is calculated once for all of the lookups below
+    installs = cmd.get_installs()
+
     # Ensure we use the default install for a default name. Otherwise, a
     # "higher" runtime may claim it via an alias, which is not the intent.
     if is_default:
-        for i in cmd.get_installs():
+        for i in installs:
             if i.get("default"):
                 exe = i["executable"]
                 if is_wdefault or windowed:
@@ -74,7 +77,7 @@ def _find_shebang_command(cmd, full_cmd, *, windowed=None):
                         exe = target[0]["target"]
                 return {**i, "executable": i["prefix"] / exe}
 
-    for i in cmd.get_installs():
+    for i in installs:
         for a in i.get("alias", ()):
             if sh_cmd.match(a["name"]):
                 exe = a["target"]
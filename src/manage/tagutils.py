@@ -1,4 +1,6 @@
-from .verutils import Version
+from functools import lru_cache
+
+from .verutils import PARSE_CACHE_SIZE, Version
 
 
 # These suffixes on a tag get special treatment when it comes to ordering
@@ -7,6 +9,8 @@ SUPPORTED_PLATFORM_SUFFIXES = ("-64", "-32", "-arm64")
 
 
 class _CompanyKey:
+    __slots__ = ("company", "_company", "is_core", "allow_prefix")
+
     CORE_COMPANY_NAMES = frozenset(map(str.casefold, ["CPython", "PythonCore", ""]))
 
     def __init__(self, company, allow_prefix=True):
@@ -52,11 +56,17 @@ class _CompanyKey:
         return not (self < other)
 
 
+# Company keys are never modified after creation, so may be shared
+_company_key = lru_cache(maxsize=PARSE_CACHE_SIZE)(_CompanyKey)
+
+
 def companies_match(c1, c2):
-    return _CompanyKey(c1) == _CompanyKey(c2)
+    return _company_key(c1) == _company_key(c2)
 
 
 class _AscendingText:
+    __slots__ = ("s",)
+
     def __init__(self, s):
         self.s = s.casefold()
 
@@ -102,6 +112,8 @@ class _AscendingText:
 
 
 class _DescendingVersion(Version):
+    __slots__ = ()
+
     def __gt__(self, other):
         if other is None:
             return True
@@ -150,7 +162,9 @@ def _platform_gt(x, y):
         return False
 
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def _sort_tag(tag):
+    # The returned key is shared between callers, and must not be modified
     import re
     key = []
 
@@ -167,19 +181,29 @@ def _sort_tag(tag):
     return tuple(key)
 
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_company_tag(company_or_tag, tag, loose_company):
+    # Returns (company key, tag, platform, sort key) for CompanyTag
+    if tag is None:
+        company_or_tag, _, tag = (company_or_tag or "").replace("/", "\\").rpartition("\\")
+    company = _company_key(company_or_tag, allow_prefix=loose_company)
+    tag, platform = split_platform(tag)
+    return company, tag, platform, _sort_tag(tag)
+
+
 class CompanyTag:
+    __slots__ = ("_company", "tag", "platform", "_sortkey")
+
     def __init__(self, company_or_tag, tag=None, *, loose_company=True):
         if isinstance(company_or_tag, str):
-            if tag is not None:
-                company = company_or_tag
-            else:
-                company, _, tag = (company_or_tag or "").replace("/", "\\").rpartition("\\")
-            self._company = _CompanyKey(company, allow_prefix=loose_company)
+            self._company, self.tag, self.platform, self._sortkey = _parse_company_tag(
+                company_or_tag, tag, loose_company
+            )
         else:
             assert isinstance(company_or_tag, _CompanyKey)
             self._company = company_or_tag
-        self.tag, self.platform = split_platform(tag)
-        self._sortkey = _sort_tag(self.tag)
+            self.tag, self.platform = split_platform(tag)
+            self._sortkey = _sort_tag(self.tag)
 
     @property
     def company(self):
@@ -362,49 +386,216 @@ class TagRange:
         def __repr__(self):
             return f"{self.OP}{self.tag}"
 
+        def _index_bounds(self, start, stop):
+            # 'start' is the lowest version key that shares the leading
+            # version of our tag, and 'stop' is the lowest key after those.
+            # Returns the (inclusive) lowest and (exclusive) highest keys that
+            # may satisfy this range, or None for no limit.
+            return None, None
+
     class RangeEqual(Range):
         OP = "="
         def __call__(self, other):
             return other.matches_bound(self.tag)
 
+        def _index_bounds(self, start, stop):
+            return start, stop
+
     class RangeEqualEqual(Range):
         # Same as =, but provided for people who type it out of habit
         OP = "=="
         def __call__(self, other):
             return other.matches_bound(self.tag)
 
+        def _index_bounds(self, start, stop):
+            return start, stop
+
     class RangeRoughlyEqual(Range):
         # Same as =, but provided for people who type it out of habit
         OP = "~="
         def __call__(self, other):
             return other.matches_bound(self.tag)
 
+        def _index_bounds(self, start, stop):
+            return start, stop
+
     class RangeGreaterEqual(Range):
         OP = ">="
         def __call__(self, other):
             return other.matches_bound(self.tag) or other.above_lower_bound(self.tag)
 
+        def _index_bounds(self, start, stop):
+            return start, None
+
     class RangeGreater(Range):
         OP = ">"
         def __call__(self, other):
             return other.above_lower_bound(self.tag)
 
+        def _index_bounds(self, start, stop):
+            return stop, None
+
     class RangeLessEqual(Range):
         OP = "<="
         def __call__(self, other):
             return other.matches_bound(self.tag) or other.below_upper_bound(self.tag)
 
+        def _index_bounds(self, start, stop):
+            return None, stop
+
     class RangeLess(Range):
         OP = "<"
         def __call__(self, other):
             return other.below_upper_bound(self.tag)
 
+        def _index_bounds(self, start, stop):
+            return None, start
+
     class RangeExclude(Range):
         OP = "!="
         def __call__(self, other):
             return not other.matches_bound(self.tag)
 
 
+class _TagIndexCompany:
+    __slots__ = ("key", "node", "others", "keys", "ordered", "_unsorted")
+
+    def __init__(self, key):
+        self.key = key
+        # Trie of the fields of each tag's leading version
+        self.node = ({}, [])
+        # Entries that cannot be found by their leading version
+        self.others = []
+        # Entries sorted by their leading version's key, with the keys in a
+        # separate list for bisecting. Sorted on demand by sort().
+        self.keys = []
+        self.ordered = []
+        self._unsorted = False
+
+    def add(self, v, entry):
+        node = self.node
+        for n in _version_fields(v):
+            node = node[0].setdefault(n, ({}, []))
+        node[1].append(entry)
+        self.keys.append(v.sortkey[:Version.MAX_FIELDS])
+        self.ordered.append(entry)
+        self._unsorted = True
+
+    def sort(self):
+        if self._unsorted:
+            order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+            self.keys = [self.keys[i] for i in order]
+            self.ordered = [self.ordered[i] for i in order]
+            self._unsorted = False
+
+
+class TagIndex:
+    """Indexes CompanyTags by company and by their leading version, so that
+    matching a tag or range only considers the tags that could satisfy it.
+
+    candidates() returns the (tag, value) pairs that may satisfy a tag or
+    range, in the order they were added. Callers must still check each tag,
+    as the index only excludes tags that cannot match.
+    """
+
+    def __init__(self):
+        self._entries = []
+        # Maps company key to _TagIndexCompany
+        self._companies = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, tag, value):
+        entry = (len(self._entries), tag, value)
+        self._entries.append(entry)
+        try:
+            company = self._companies[tag._company._company]
+        except KeyError:
+            company = self._companies[tag._company._company] = _TagIndexCompany(tag._company)
+        v = tag._sortkey[0] if tag._sortkey else None
+        if not isinstance(v, Version) or v.prefix_match or v.prerelease_match:
+            # Wildcard and '-dev' versions may match tags that do not share
+            # their prefix, so are always checked.
+            company.others.append(entry)
+            return
+        company.add(v, entry)
+
+    def _iter_companies(self, tags):
+        for company in self._companies.values():
+            if all(company.key.startswith(t._company) for t in tags):
+                yield company
+
+    @staticmethod
+    def _version_bounds(tag_range):
+        # Returns the (inclusive) lowest and (exclusive) highest version keys
+        # that may satisfy every range in 'tag_range'. Either may be None.
+        lowest = highest = None
+        for r in tag_range.ranges:
+            v = r.tag._sortkey[0] if r.tag._sortkey else None
+            if not isinstance(v, Version) or v.prefix_match or v.prerelease_match:
+                continue
+            n = v.sortkey[-3]
+            if n > Version.MAX_FIELDS:
+                continue
+            # Ranges compare the first 'n' fields, and fields are never
+            # negative, so padding with zeros gives the lowest matching key
+            padding = (0,) * (Version.MAX_FIELDS - n)
+            start = v.sortkey[:n] + padding
+            stop = v.sortkey[:n - 1] + (v.sortkey[n - 1] + 1,) + padding
+            lo, hi = r._index_bounds(start, stop)
+            if lo is not None and (lowest is None or lo > lowest):
+                lowest = lo
+            if hi is not None and (highest is None or hi < highest):
+                highest = hi
+        return lowest, highest
+
+    def candidates(self, tag):
+        if tag is None:
+            return [(t, v) for _, t, v in self._entries]
+        found = []
+        if isinstance(tag, TagRange):
+            from bisect import bisect_left
+            # Every range except '!=' requires the company to match
+            tags = [r.tag for r in tag.ranges if not isinstance(r, TagRange.RangeExclude)]
+            lowest, highest = self._version_bounds(tag)
+            for company in self._iter_companies(tags):
+                found.extend(company.others)
+                company.sort()
+                start = bisect_left(company.keys, lowest) if lowest is not None else 0
+                stop = bisect_left(company.keys, highest) if highest is not None else None
+                found.extend(company.ordered[start:stop])
+        else:
+            v = tag._sortkey[0] if tag._sortkey else None
+            for company in self._iter_companies([tag]):
+                found.extend(company.others)
+                node = company.node
+                if v is None:
+                    _collect(node, found)
+                elif isinstance(v, Version):
+                    for n in _version_fields(v):
+                        node = node[0].get(n)
+                        if node is None:
+                            break
+                    else:
+                        _collect(node, found)
+                # Tags starting with text can only match the other entries
+        found.sort(key=lambda e: e[0])
+        return [(t, v) for _, t, v in found]
+
+
+def _version_fields(v):
+    return v.sortkey[:min(v.sortkey[-3], Version.MAX_FIELDS)]
+
+
+def _collect(node, found):
+    stack = [node]
+    while stack:
+        children, entries = stack.pop()
+        found.extend(entries)
+        stack.extend(children.values())
+
+
 def tag_or_range(tag):
     if not isinstance(tag, str):
         return tag
@@ -440,3 +631,27 @@ def install_matches_any(install, tags_or_ranges, *, loose_company=False):
             if any(f.satisfied_by(t) for t in install_tags):
                 return True
     return False
+
+
+def installs_matching_any(installs, tags_or_ranges, *, loose_company=False):
+    """Returns the installs that match any of 'tags_or_ranges', in their
+    original order.
+
+    This is equivalent to filtering with install_matches_any(), but uses a
+    TagIndex so that each install is not checked against every filter.
+    """
+    if not tags_or_ranges:
+        return list(installs)
+    if not all(tags_or_ranges):
+        # Empty filters match the default install, which is not indexed
+        return [i for i in installs if install_matches_any(i, tags_or_ranges, loose_company=loose_company)]
+    index = TagIndex()
+    for n, i in enumerate(installs):
+        index.add(CompanyTag(i["company"], i["tag"]), n)
+        for t in i.get("install-for", ()):
+            index.add(CompanyTag(i["company"], t), n)
+    found = set()
+    for f in tags_or_ranges:
+        found.update(n for _, n in index.candidates(f))
+    return [installs[n] for n in sorted(found)
+            if install_matches_any(installs[n], tags_or_ranges, loose_company=loose_company)]
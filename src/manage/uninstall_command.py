@@ -1,7 +1,8 @@
 from .exceptions import ArgumentError, FilesInUseError
 from .fsutils import rmtree, unlink
-from .installs import get_matching_install_tags
+from .installs import get_matching_install_tags, update_install_cache
 from .install_command import SHORTCUT_HANDLERS, update_all_shortcuts
+from .launchtable import update_launch_table
 from .logging import LOGGER
 from .pathutils import Path, PurePath
 from .tagutils import tag_or_range
@@ -141,6 +142,7 @@ def execute(cmd):
                 ))
 
         update_all_shortcuts(cmd)
+        update_launch_table(cmd)
         LOGGER.debug("END uninstall_command.execute")
         return
 
@@ -255,6 +257,8 @@ def execute(cmd):
             LOGGER.debug("TRACEBACK:", exc_info=True)
 
     if to_uninstall:
+        update_install_cache(cmd.install_dir)
         update_all_shortcuts(cmd)
+        update_launch_table(cmd)
 
     LOGGER.debug("END uninstall_command.execute")
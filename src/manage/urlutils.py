@@ -58,6 +58,14 @@ ENABLE_WINHTTP = os.getenv("PYMANAGER_ENABLE_WINHTTP_DOWNLOAD", "1").lower()[:1]
 ENABLE_URLLIB = os.getenv("PYMANAGER_ENABLE_URLLIB_DOWNLOAD", "1").lower()[:1] in "1yt"
 ENABLE_POWERSHELL = os.getenv("PYMANAGER_ENABLE_POWERSHELL_DOWNLOAD", "1").lower()[:1] in "1yt"
 
+# Number of connections used by the urllib backend to download large files,
+# and the smallest range that is worth downloading separately.
+DOWNLOAD_SEGMENTS = int(os.getenv("PYMANAGER_DOWNLOAD_SEGMENTS", "4"))
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+
+# Seconds to wait for a cancelled index prefetch to stop
+PREFETCH_CANCEL_TIMEOUT = 1.0
+
 SUPPORTED_SCHEMES = "http".casefold(), "https".casefold(), "file".casefold()
 
 PROXY_MODE_AUTO = 0
@@ -138,6 +146,11 @@ class NoInternetError(Exception):
     pass
 
 
+class NotModifiedError(Exception):
+    # Raised when a conditional request finds the cached response is current
+    pass
+
+
 class _Request:
     def __init__(self, url, method="GET", headers={}, outfile=None):
         self.url = url
@@ -148,6 +161,15 @@ class _Request:
         self.password = None
         self.outfile = Path(outfile) if outfile else None
         self.proxy_settings = _proxy_settings_from_env()
+        self.response_headers = None
+        self.compressed = False
+        self.segments = DOWNLOAD_SEGMENTS
+        self.min_segment_size = MIN_SEGMENT_SIZE
+        # Hash algorithms to calculate while downloading, and their results
+        self.hashes = ()
+        self.digests = None
+        # Set from another thread to stop the download as if interrupted
+        self.cancel_event = None
         self._on_progress = None
         self._on_auth_request = None
         self._on_cancel = None
@@ -169,10 +191,19 @@ class _Request:
         return None
 
     def on_cancel(self):
+        if self.is_cancelled():
+            return True
         if self._on_cancel:
             return self._on_cancel()
         return False
 
+    def is_cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            raise KeyboardInterrupt
+
 
 def _bits_urlretrieve(request):
     from _native import (coinitialize, bits_connect, bits_begin, bits_cancel,
@@ -239,6 +270,7 @@ def _bits_urlretrieve(request):
             if progress > last_progress:
                 request.on_progress(progress)
             last_progress = progress
+            request.check_cancelled()
             time.sleep(0.1)
     except KeyboardInterrupt:
         request.on_progress(None)
@@ -282,6 +314,9 @@ def _winhttp_urlopen(request):
         if (ex.winerror or 0) & 0xFFFFFFFF == 0x80190194:
             # Returned HTTP status 404 (0x194)
             raise FileNotFoundError() from ex
+        if (ex.winerror or 0) & 0xFFFFFFFF == 0x80190130:
+            # Returned HTTP status 304 (0x130)
+            raise NotModifiedError() from ex
         raise
     if data[:3] == b"\xEF\xBB\xBF":
         data = data[3:]
@@ -289,7 +324,12 @@ def _winhttp_urlopen(request):
 
 def _winhttp_urlretrieve(request):
     assert request.outfile
-    request.outfile.write_bytes(_winhttp_urlopen(request))
+    data = _winhttp_urlopen(request)
+    request.outfile.write_bytes(data)
+    if request.hashes:
+        hasher = _Hasher(request.hashes)
+        hasher.update(data)
+        request.digests = hasher.hexdigests()
 
 
 def _basic_auth_header(username, password):
@@ -299,67 +339,432 @@ def _basic_auth_header(username, password):
     return "Basic " + token.decode("ascii")
 
 
+def _get_content_decoders():
+    # Returns the Content-Encoding values we can decode, and their decoders.
+    # zstd is only available in Python 3.14 and later.
+    import gzip
+    decoders = {}
+    try:
+        from compression import zstd
+    except ImportError:
+        pass
+    else:
+        decoders["zstd"] = zstd.decompress
+    decoders["gzip"] = decoders["x-gzip"] = gzip.decompress
+    return decoders
+
+
+def _decode_content(data, encoding, decoders):
+    encodings = [e.strip().lower() for e in (encoding or "").split(",")]
+    # Encodings are listed in the order they were applied
+    for e in reversed(encodings):
+        if e in ("", "identity"):
+            continue
+        try:
+            decode = decoders[e]
+        except LookupError:
+            raise OSError(f"Unsupported Content-Encoding: {encoding}") from None
+        data = decode(data)
+    return data
+
+
 def _urllib_urlopen(request):
     import urllib.error
     from urllib.request import Request, urlopen
 
     LOGGER.debug("urlopen: %s", request)
     req = Request(request.url, method=request.method, headers=request.headers)
+    decoders = None
+    if request.compressed:
+        decoders = _get_content_decoders()
+        req.add_header("Accept-Encoding", ", ".join(d for d in decoders if d != "x-gzip"))
     try:
         request.on_progress(0)
         try:
-            r = urlopen(req)
-        except urllib.error.HTTPError as ex:
-            if ex.status == 401:
-                auth = request.on_auth_request()
-                if not auth:
-                    raise
-                req.headers["Authorization"] = _basic_auth_header(*auth)
+            try:
                 r = urlopen(req)
-            elif ex.status == 404:
-                raise FileNotFoundError from ex
-            else:
-                raise
+            except urllib.error.HTTPError as ex:
+                if ex.status == 401:
+                    auth = request.on_auth_request()
+                    if not auth:
+                        raise
+                    req.headers["Authorization"] = _basic_auth_header(*auth)
+                    r = urlopen(req)
+                elif ex.status == 404:
+                    raise FileNotFoundError from ex
+                else:
+                    raise
+        except urllib.error.HTTPError as ex:
+            if ex.status == 304:
+                _read_response_headers(request, ex.headers)
+                raise NotModifiedError from ex
+            raise
         with r:
-            data = r.read()
+            _read_response_headers(request, r.headers)
+            chunks = []
+            for chunk in iter(lambda: r.read(request.chunksize), b""):
+                request.check_cancelled()
+                chunks.append(chunk)
+            data = b"".join(chunks)
+            if decoders:
+                data = _decode_content(data, r.headers.get("Content-Encoding"), decoders)
         request.on_progress(100)
         return data
     finally:
         LOGGER.debug("urlopen: complete")
 
 
-def _urllib_urlretrieve(request):
+def _read_response_headers(request, headers):
+    if request.response_headers is not None and headers:
+        request.response_headers.update((k.lower(), v) for k, v in headers.items())
+
+
+def _urllib_open(request, req):
     import urllib.error
-    from urllib.request import Request, urlopen
+    from urllib.request import urlopen
+    try:
+        return urlopen(req)
+    except urllib.error.HTTPError as ex:
+        if ex.status != 401:
+            raise
+        auth = request.on_auth_request()
+        if not auth:
+            raise
+        req.headers["Authorization"] = _basic_auth_header(*auth)
+        return urlopen(req)
+
+
+def _plan_segments(request, r, total):
+    # Returns a list of (first, last) byte offsets to download concurrently.
+    # A single segment is returned when the response should be read as one
+    # stream, and None if the length is unknown.
+    if total <= 0:
+        return None
+    if request.segments <= 1 or r.headers.get("Accept-Ranges", "").lower() != "bytes":
+        return [(0, total - 1)]
+    count = min(request.segments, total // max(1, request.min_segment_size))
+    if count <= 1:
+        return [(0, total - 1)]
+    size = -(-total // count)
+    return [(start, min(start + size, total) - 1) for start in range(0, total, size)]
+
+
+def _get_validator(headers):
+    # Returns a validator suitable for If-Range, which cannot use weak ETags
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+class _RangeNotSatisfiedError(OSError):
+    pass
+
+
+class _SegmentCancelled(Exception):
+    pass
+
+
+class _Hasher:
+    """Calculates digests of data as it is written to a file.
+
+    'offset' is the number of bytes that have been hashed, which allows data
+    written out of order to be read back once everything before it exists.
+    """
+    def __init__(self, algorithms):
+        import hashlib
+        self._hashers = {k: hashlib.new(k) for k in algorithms}
+        self.offset = 0
+
+    def update(self, data):
+        for h in self._hashers.values():
+            h.update(data)
+        self.offset += len(data)
+
+    def update_from_file(self, f, end=None):
+        # 'f' must be unbuffered if the file is still being written, or
+        # data read ahead of 'end' may be reused after it has changed.
+        f.seek(self.offset)
+        while end is None or self.offset < end:
+            size = 1024 * 1024 if end is None else min(1024 * 1024, end - self.offset)
+            data = f.read(size)
+            if not data:
+                break
+            self.update(data)
+
+    def hexdigests(self):
+        return {k: h.hexdigest() for k, h in self._hashers.items()}
+
+
+class _PartialDownload:
+    """Tracks a download into a '.partial' file next to the output file.
+
+    A sidecar '.partial.json' file records the URL, the server's validator and
+    how much of each segment has been written, so that a later attempt can
+    resume it. Downloads without a validator or length are not resumable, but
+    are still written to the '.partial' file until they are complete.
+    """
+    SAVE_INTERVAL = 1.0
+
+    def __init__(self, request):
+        self.url = sanitise_url(request.url)
+        self.file = request.outfile.with_name(request.outfile.name + ".partial")
+        self.state_file = self.file.with_name(self.file.name + ".json")
+        self.validator = None
+        self.total = 0
+        # List of [first, last, written] for each segment
+        self.segments = []
+        self._last_save = 0
+
+    def load(self):
+        import json
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state["url"] != self.url or not state["validator"]:
+                return False
+            total = int(state["total"])
+            segments = [[int(first), int(last), int(n)] for first, last, n in state["segments"]]
+            if os.stat(self.file).st_size != total:
+                return False
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, LookupError, TypeError):
+            LOGGER.debug("Ignoring invalid partial download state", exc_info=True)
+            return False
+        self.validator = state["validator"]
+        self.total = total
+        self.segments = segments
+        return True
+
+    def start(self, total, validator, segments):
+        self.total = total
+        self.validator = validator
+        self.segments = [[first, last, 0] for first, last in segments]
+        with open(self.file, "wb") as f:
+            if total:
+                f.truncate(total)
+        self.save(force=True)
+
+    def remaining(self):
+        return [(i, first + n, last) for i, (first, last, n) in enumerate(self.segments)
+                if first + n <= last]
+
+    def written(self):
+        return sum(n for _, _, n in self.segments)
+
+    def contiguous(self):
+        # Returns how much of the file is complete from the start
+        end = 0
+        for first, last, n in self.segments:
+            end = first + n
+            if end <= last:
+                break
+        return end
+
+    def save(self, force=False):
+        import json
+        if not self.validator or not self.total:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_save < self.SAVE_INTERVAL:
+            return
+        self._last_save = now
+        tmp = self.state_file.with_name(self.state_file.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "url": self.url,
+                    "validator": self.validator,
+                    "total": self.total,
+                    "segments": self.segments,
+                }, f)
+            os.replace(tmp, self.state_file)
+        except OSError:
+            LOGGER.debug("Failed to save partial download state", exc_info=True)
+
+    def discard(self):
+        for f in (self.state_file, self.file):
+            try:
+                unlink(f)
+            except OSError:
+                LOGGER.debug("Failed to remove %s", f, exc_info=True)
+
+    def complete(self, outfile):
+        os.replace(self.file, outfile)
+        try:
+            unlink(self.state_file)
+        except OSError:
+            LOGGER.debug("Failed to remove %s", self.state_file, exc_info=True)
+
+
+def _urllib_download_segments(request, headers, first_response, partial):
+    import threading
+    from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+    from urllib.request import Request
+
+    remaining = partial.remaining()
+    LOGGER.debug("Downloading %s bytes in %s segments", partial.total, len(remaining))
+    cancel = threading.Event()
+
+    def open_range(first, last):
+        seg_headers = {**headers, "Range": f"bytes={first}-{last}"}
+        if partial.validator:
+            seg_headers["If-Range"] = partial.validator
+        r = _urllib_open(request, Request(request.url, headers=seg_headers))
+        content_range = r.headers.get("Content-Range", "")
+        if r.status != 206 or not content_range.startswith(f"bytes {first}-{last}/"):
+            r.close()
+            raise _RangeNotSatisfiedError(
+                f"Server did not return the requested range: {content_range or r.status}"
+            )
+        return r
+
+    def fetch(i, first, last, r):
+        if r is None:
+            r = open_range(first, last)
+        segment = partial.segments[i]
+        # Unbuffered, so the recorded progress never exceeds what was written
+        with r, open(partial.file, "r+b", buffering=0) as f:
+            f.seek(first)
+            while first <= last:
+                if cancel.is_set():
+                    raise _SegmentCancelled()
+                chunk = r.read(min(request.chunksize, last - first + 1))
+                if not chunk:
+                    raise OSError(f"Connection closed with {last - first + 1} bytes remaining")
+                f.write(chunk)
+                first += len(chunk)
+                segment[2] += len(chunk)
+
+    # Data is hashed in order as soon as everything before it has been
+    # written, so it is normally still cached in memory when it is read back.
+    # Unbuffered, so that nothing beyond what has been written is read ahead.
+    hasher = _Hasher(request.hashes) if request.hashes else None
+    hash_file = open(partial.file, "rb", buffering=0) if hasher else None
+
+    with ThreadPoolExecutor(max_workers=len(remaining)) as pool:
+        # The first segment is read from the response we already have
+        pending = {pool.submit(fetch, i, first, last, first_response if n == 0 else None)
+                   for n, (i, first, last) in enumerate(remaining)}
+        last_progress = 0
+        try:
+            while pending:
+                if hasher:
+                    hasher.update_from_file(hash_file, partial.contiguous())
+                try:
+                    request.check_cancelled()
+                    done, pending = wait(pending, timeout=0.1, return_when=FIRST_EXCEPTION)
+                except KeyboardInterrupt:
+                    request.on_progress(None)
+                    if request.on_cancel():
+                        raise
+                    last_progress = -1
+                    continue
+                for f in done:
+                    f.result()
+                progress = (partial.written() * 100) // partial.total
+                if progress > last_progress:
+                    request.on_progress(progress)
+                    last_progress = progress
+                partial.save()
+            if hasher:
+                hasher.update_from_file(hash_file, partial.total)
+                return hasher.hexdigests()
+            return None
+        except BaseException:
+            cancel.set()
+            raise
+        finally:
+            pool.shutdown()
+            partial.save(force=True)
+            if hash_file:
+                hash_file.close()
+
+
+def _urllib_download_stream(request, r, partial):
+    # Used when the length is not known, so the download cannot be resumed
+    hasher = _Hasher(request.hashes) if request.hashes else None
+    with open(partial.file, "wb") as f:
+        for chunk in iter(lambda: r.read(request.chunksize), b""):
+            request.check_cancelled()
+            f.write(chunk)
+            if hasher:
+                hasher.update(chunk)
+    return hasher.hexdigests() if hasher else None
+
+
+def _urllib_urlretrieve(request):
+    from urllib.request import Request
 
     outfile = request.outfile
     LOGGER.debug("urlretrieve: %s -> %s", request, outfile)
     ensure_tree(outfile)
     unlink(outfile)
+    partial = _PartialDownload(request)
     req = Request(request.url, method=request.method, headers=request.headers)
+    resuming = request.method == "GET" and partial.load() and partial.remaining()
+    if resuming:
+        _, first, last = partial.remaining()[0]
+        req.add_header("Range", f"bytes={first}-{last}")
+        req.add_header("If-Range", partial.validator)
     try:
         request.on_progress(0)
+        r = _urllib_open(request, req)
         try:
-            r = urlopen(req)
-        except urllib.error.HTTPError as ex:
-            if ex.status == 401:
-                req.auth = request.on_auth_request()
-                if not req.auth:
-                    raise
-                r = urlopen(req)
-            else:
-                raise
-        with r:
-            progress = 0
+            if resuming:
+                content_range = r.headers.get("Content-Range", "")
+                if r.status == 206 and content_range == f"bytes {first}-{last}/{partial.total}":
+                    LOGGER.verbose("Resuming download from %s of %s bytes",
+                                   partial.written(), partial.total)
+                else:
+                    LOGGER.verbose("Restarting download because the file has changed")
+                    resuming = False
+                    if r.status != 200:
+                        r.close()
+                        req.remove_header("Range")
+                        req.remove_header("If-range")
+                        r = _urllib_open(request, req)
+            if not resuming:
+                try:
+                    total = int(r.headers.get("Content-Length", 0))
+                except ValueError:
+                    total = 0
+                segments = None
+                if request.method == "GET":
+                    segments = _plan_segments(request, r, total)
+                if not segments:
+                    digests = _urllib_download_stream(request, r, partial)
+                    partial.complete(outfile)
+                    request.digests = digests
+                    request.on_progress(100)
+                    return
+                validator = None
+                if r.headers.get("Content-Encoding", "identity").lower() == "identity":
+                    validator = _get_validator(r.headers)
+                if not validator:
+                    # Without a validator, segments may come from different
+                    # versions of the file, so only use one stream.
+                    segments = [(0, total - 1)]
+                partial.start(total, validator, segments)
+            headers = {k: v for k, v in req.header_items()
+                       if k.lower() not in ("range", "if-range")}
             try:
-                total = int(r.headers.get("Content-Length", 0))
-            except ValueError:
-                total = 1
-            with open(outfile, "wb") as f:
-                for chunk in iter(lambda: r.read(request.chunksize), b""):
-                    f.write(chunk)
-                    progress += len(chunk)
-                    request.on_progress((progress * 100) // total)
+                digests = _urllib_download_segments(request, headers, r, partial)
+            except _RangeNotSatisfiedError:
+                if len(partial.segments) <= 1:
+                    raise
+                LOGGER.debug("Segmented download failed. Retrying as a single stream.",
+                             exc_info=True)
+                request.on_progress(None)
+                r.close()
+                r = _urllib_open(request, Request(request.url, headers=headers))
+                partial.start(partial.total, _get_validator(r.headers), [(0, partial.total - 1)])
+                digests = _urllib_download_segments(request, headers, r, partial)
+        finally:
+            r.close()
+        partial.complete(outfile)
+        request.digests = digests
         request.on_progress(100)
     finally:
         LOGGER.debug("urlretrieve: complete")
@@ -478,6 +883,7 @@ $r = Invoke-WebRequest -Uri $url -UseBasicParsing `
                     LOGGER.debug("PowerShell Output: %s", out)
                     return
                 except subprocess.TimeoutExpired:
+                    request.check_cancelled()
                     if not request.outfile.exists():
                         # Suppress the original exception to avoid leaking the command
                         raise subprocess.TimeoutExpired(powershell, int(time.time() - start)) from None
@@ -488,7 +894,20 @@ $r = Invoke-WebRequest -Uri $url -UseBasicParsing `
                 raise
 
 
-def urlopen(url, method="GET", headers={}, on_progress=None, on_auth_request=None):
+def urlopen(url, method="GET", headers={}, on_progress=None, on_auth_request=None,
+            response_headers=None, compressed=False, cancel_event=None):
+    """Returns the contents of 'url'.
+
+    If 'response_headers' is a dict, it is updated with the (lowercased)
+    response headers when the backend can provide them. Requests with
+    conditional headers raise NotModifiedError for a 304 response.
+
+    If 'compressed' is true, backends that support it may request a gzip or
+    zstd encoded response. The returned contents are always decoded.
+
+    If 'cancel_event' is a threading.Event, setting it from another thread
+    raises KeyboardInterrupt in this one, where the backend allows.
+    """
     scheme, sep, path = url.partition("://")
     if not sep:
         scheme = "file"
@@ -503,6 +922,9 @@ def urlopen(url, method="GET", headers={}, on_progress=None, on_auth_request=Non
     request = _Request(url, method=method, headers=headers)
     request._on_progress = on_progress
     request._on_auth_request = on_auth_request
+    request.response_headers = response_headers
+    request.compressed = compressed
+    request.cancel_event = cancel_event
 
     first_error = None
 
@@ -511,6 +933,8 @@ def urlopen(url, method="GET", headers={}, on_progress=None, on_auth_request=Non
             return _winhttp_urlopen(request)
         except ImportError:
             LOGGER.debug("WinHTTP module unavailable - using fallback")
+        except NotModifiedError:
+            raise
         except NoInternetError as ex:
             # No point going any further if WinHTTP has detected no internet
             # connection.
@@ -531,6 +955,8 @@ def urlopen(url, method="GET", headers={}, on_progress=None, on_auth_request=Non
             return _urllib_urlopen(request)
         except ImportError:
             LOGGER.debug("urllib download unavailable - using fallback")
+        except NotModifiedError:
+            raise
         except (AttributeError, TypeError, ValueError):
             # Blame the caller for these errors and let them bubble out
             raise
@@ -560,8 +986,32 @@ def urlopen(url, method="GET", headers={}, on_progress=None, on_auth_request=Non
     raise RuntimeError("Unable to download from the internet")
 
 
+def _get_digests(request):
+    # Backends that cannot hash while downloading leave 'digests' unset, so
+    # the completed file is hashed instead.
+    if not request.hashes:
+        return None
+    if request.digests is None:
+        hasher = _Hasher(request.hashes)
+        with open(request.outfile, "rb") as f:
+            hasher.update_from_file(f)
+        request.digests = hasher.hexdigests()
+    return request.digests
+
+
 def urlretrieve(url, outfile, method="GET", headers={}, chunksize=64 * 1024,
-                on_progress=None, on_auth_request=None, on_cancel=None):
+                on_progress=None, on_auth_request=None, on_cancel=None, hashes=None,
+                cancel_event=None):
+    """Downloads 'url' to 'outfile'.
+
+    If 'hashes' lists any hashlib algorithm names, the digests of the
+    downloaded file are calculated while it is written and returned as a dict
+    mapping each name to its hex digest. Otherwise, returns None.
+
+    If 'cancel_event' is a threading.Event, setting it from another thread
+    stops the download as if it had been interrupted, without calling
+    'on_cancel'. KeyboardInterrupt is raised in the downloading thread.
+    """
     scheme, sep, path = url.partition("://")
     if not sep:
         scheme = "file"
@@ -579,27 +1029,35 @@ def urlretrieve(url, outfile, method="GET", headers={}, chunksize=64 * 1024,
                 r.seek(0, os.SEEK_SET)
             else:
                 total = None
+            hasher = _Hasher(hashes) if hashes else None
             on_progress(0)
             with open(outfile, "wb") as f:
                 for chunk in iter(lambda: r.read(chunksize), b""):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise KeyboardInterrupt
                     f.write(chunk)
+                    if hasher:
+                        hasher.update(chunk)
                     if total:
                         on_progress((100 * f.tell()) // total)
             on_progress(100)
-        return
+        return hasher.hexdigests() if hasher else None
 
     request = _Request(url, method=method, headers=headers)
     request.outfile = Path(outfile)
     request.chunksize = chunksize
+    request.hashes = tuple(hashes or ())
     request._on_progress = on_progress
     request._on_auth_request = on_auth_request
     request._on_cancel = on_cancel
+    request.cancel_event = cancel_event
 
     first_error = None
 
     if ENABLE_BITS and method.upper() == "GET":
         try:
-            return _bits_urlretrieve(request)
+            _bits_urlretrieve(request)
+            return _get_digests(request)
         except ImportError:
             LOGGER.debug("BITS module unavailable - using fallback")
         except NoInternetError:
@@ -617,7 +1075,8 @@ def urlretrieve(url, outfile, method="GET", headers={}, chunksize=64 * 1024,
 
     if ENABLE_WINHTTP:
         try:
-            return _winhttp_urlretrieve(request)
+            _winhttp_urlretrieve(request)
+            return _get_digests(request)
         except ImportError:
             LOGGER.debug("WinHTTP module unavailable - using fallback")
         except NoInternetError as ex:
@@ -637,7 +1096,8 @@ def urlretrieve(url, outfile, method="GET", headers={}, chunksize=64 * 1024,
 
     if ENABLE_URLLIB:
         try:
-            return _urllib_urlretrieve(request)
+            _urllib_urlretrieve(request)
+            return _get_digests(request)
         except ImportError:
             LOGGER.debug("urllib module unavailable - using fallback")
         except (AttributeError, TypeError, ValueError):
@@ -654,7 +1114,8 @@ def urlretrieve(url, outfile, method="GET", headers={}, chunksize=64 * 1024,
 
     if ENABLE_POWERSHELL:
         try:
-            return _powershell_urlretrieve(request)
+            _powershell_urlretrieve(request)
+            return _get_digests(request)
         except FileNotFoundError:
             LOGGER.debug("PowerShell download unavailable - using fallback")
         except Exception as ex:
@@ -769,8 +1230,232 @@ def is_valid_url(url):
     return False
 
 
+# Directory under 'download_dir' for index files and their signatures
+INDEX_CACHE_DIR_NAME = "__index_cache__"
+
+
+def _cache_control_max_age(value):
+    # Returns the max-age allowed by a Cache-Control header, None if it does
+    # not specify one, or -1 if the response must not be stored.
+    max_age = None
+    for directive in (value or "").split(","):
+        name, _, arg = directive.strip().partition("=")
+        name = name.strip().casefold()
+        if name == "no-store":
+            return -1
+        if name == "no-cache":
+            max_age = 0
+        elif name == "max-age" and max_age != 0:
+            try:
+                max_age = int(arg.strip().strip('"'))
+            except ValueError:
+                max_age = 0
+    return max_age
+
+
+class IndexCache:
+    """Keeps downloaded index files and signatures between runs.
+
+    Each URL is stored in one file, with a line of JSON containing the
+    response validators before the content. The file's modification time is
+    the time it was last known to be current.
+    """
+    # Successful signature verifications are recorded here, so that unchanged
+    # files do not need to be checked again.
+    VERIFIED_NAME = "__verified__.json"
+    MAX_VERIFIED = 64
+
+    def __init__(self, directory, max_age):
+        self.directory = Path(directory)
+        self.max_age = max_age
+
+    def _file(self, url):
+        from hashlib import sha256
+        return self.directory / (sha256(url.encode("utf-8")).hexdigest() + ".cache")
+
+    def get(self, url):
+        """Returns (metadata, data) for 'url', or (None, None) if not cached.
+        """
+        import json
+        file = self._file(url)
+        try:
+            with open(file, "rb") as f:
+                meta = json.loads(f.readline())
+                data = f.read()
+            meta["fetched"] = os.stat(file).st_mtime
+        except (OSError, ValueError):
+            return None, None
+        if meta.get("url") != sanitise_url(url) or meta.get("size") != len(data):
+            LOGGER.debug("Ignoring mismatched cache file %s", file)
+            return None, None
+        return meta, data
+
+    def is_fresh(self, meta):
+        max_age = self.max_age
+        if meta.get("max_age") is not None:
+            max_age = min(max_age, meta["max_age"])
+        return 0 <= time.time() - meta["fetched"] < max_age
+
+    def validators(self, meta):
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def put(self, url, data, response_headers):
+        import json
+        file = self._file(url)
+        max_age = _cache_control_max_age(response_headers.get("cache-control"))
+        if max_age is not None and max_age < 0:
+            unlink(file)
+            return
+        tmp_file = file.with_name(f"{file.name}.{os.getpid()}.tmp")
+        try:
+            ensure_tree(file)
+            with open(tmp_file, "wb") as f:
+                f.write(json.dumps({
+                    "url": sanitise_url(url),
+                    "size": len(data),
+                    "etag": response_headers.get("etag"),
+                    "last_modified": response_headers.get("last-modified"),
+                    "max_age": max_age,
+                }).encode("utf-8"))
+                f.write(b"\n")
+                f.write(data)
+            os.replace(tmp_file, file)
+        except OSError:
+            LOGGER.debug("Failed to write %s", file, exc_info=True)
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+
+    def refresh(self, url):
+        """Records that the cached content for 'url' is still current."""
+        try:
+            os.utime(self._file(url))
+        except OSError:
+            LOGGER.debug("Failed to update %s", self._file(url), exc_info=True)
+
+    def _read_verified(self):
+        import json
+        try:
+            with open(self.directory / self.VERIFIED_NAME, "rb") as f:
+                keys = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return keys if isinstance(keys, list) else []
+
+    def is_verified(self, key):
+        """Returns True if 'key' was previously recorded by add_verified()."""
+        return key in self._read_verified()
+
+    def add_verified(self, key):
+        import json
+        keys = [key, *(k for k in self._read_verified() if k != key)]
+        file = self.directory / self.VERIFIED_NAME
+        tmp_file = file.with_name(f"{file.name}.{os.getpid()}.tmp")
+        try:
+            ensure_tree(file)
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(keys[:self.MAX_VERIFIED], f)
+            os.replace(tmp_file, file)
+        except OSError:
+            LOGGER.debug("Failed to write %s", file, exc_info=True)
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+
+
+def _verification_key(data, cat, params):
+    # Any change to the data, the signature or the required settings will
+    # change the key and so require verification.
+    import json
+    from hashlib import sha256
+    key = sha256()
+    key.update(sha256(data).digest())
+    key.update(sha256(cat).digest())
+    key.update(json.dumps([
+        params.get("required_root_subject"),
+        params.get("required_publisher_subject"),
+        params.get("required_publisher_eku"),
+    ]).encode("utf-8"))
+    return key.hexdigest()
+
+
+def _get_index_cache(cmd):
+    download_dir = getattr(cmd, "download_dir", None)
+    max_age = getattr(cmd, "index_cache_max_age", None)
+    if not download_dir or max_age is None or max_age < 0:
+        return None
+    return IndexCache(Path(download_dir) / INDEX_CACHE_DIR_NAME, max_age)
+
+
+class _IndexPrefetch:
+    # Downloads an index page (and its signature, if it will be needed) on a
+    # background thread. Cancelling discards the result, stops the download
+    # between chunks where the backend allows, and skips the disk cache.
+    def __init__(self, downloader, url):
+        import threading
+        self.url = url
+        self.data = None
+        self.parsed = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(downloader,), daemon=True)
+        self._thread.start()
+
+    def _run(self, downloader):
+        import json
+        url = self.url
+        try:
+            data = downloader._fetch(url, "application/json", compressed=True, cancel=self._cancel)
+            parsed = json.loads(data)
+            settings = downloader.cmd.source_settings.get(sanitise_url(url)) if downloader.cmd else None
+            params = settings or parsed
+            if (not self.cancelled and isinstance(params, dict)
+                and params.get("requires_signature")
+                and not downloader._cache.get(url + ".cat")):
+                cat = downloader._fetch(url + ".cat", "application/octet-stream",
+                                        cancel=self._cancel)
+                if not self.cancelled:
+                    downloader._cache[url + ".cat"] = cat
+            self.data, self.parsed = data, parsed
+        except KeyboardInterrupt:
+            LOGGER.debug("Cancelled prefetch of %s", sanitise_url(url))
+        except Exception:
+            # Errors are reported when the page is downloaded normally
+            LOGGER.debug("Failed to prefetch %s", sanitise_url(url), exc_info=True)
+
+    def result(self):
+        self._thread.join()
+        return self.data, self.parsed
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+
 class IndexDownloader:
-    def __init__(self, cmd, source, index_cls, auth=None, cache=None):
+    """Iterates over the pages of an index, following 'next' links.
+
+    When a page lists 'shards', those are read in order instead of following
+    'next'. If 'tags' is provided, only the shards that may contain an install
+    for one of them are read.
+
+    With prefetch=True, the page after the one being returned is downloaded
+    on a background thread. Call close() (or use as a context manager) when
+    stopping early to stop any download in progress.
+    """
+    def __init__(self, cmd, source, index_cls, auth=None, cache=None, *, prefetch=False, tags=None):
         self.cmd = cmd
         self.index_cls = index_cls
         self._url = source.rstrip("/")
@@ -778,12 +1463,86 @@ class IndexDownloader:
             self._url += "/index.json"
         self._auth = auth if auth is not None else {}
         self._cache = cache if cache is not None else {}
+        self._disk_cache = _get_index_cache(cmd)
         self._urlopen = urlopen
         self.quiet = False
+        self.prefetch = prefetch
+        self._prefetch = None
+        self.tags = tags
+        # The remaining shards to read, or None if we are following 'next'
+        self._shards = None
 
     def __iter__(self):
         return self
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._prefetch:
+            self._prefetch.cancel()
+            self._prefetch.join(PREFETCH_CANCEL_TIMEOUT)
+            self._prefetch = None
+
+    def _select_shards(self, url, shards):
+        from .tagutils import CompanyTag, tag_or_range
+        filters = None
+        if self.tags:
+            try:
+                filters = [tag_or_range(t) for t in self.tags]
+            except ValueError:
+                LOGGER.debug("Unable to parse %s; reading all shards", self.tags, exc_info=True)
+            else:
+                if not all(filters):
+                    filters = None
+        selected = []
+        for shard in shards:
+            try:
+                shard_url = urljoin(url, shard["url"], to_parent=True)
+                shard_tags = shard.get("install-for")
+                if filters is not None and shard_tags is not None:
+                    shard_tags = [CompanyTag(t) for t in shard_tags]
+                    if not any(f.satisfied_by(t) for f in filters for t in shard_tags):
+                        LOGGER.debug("Skipping shard %s", sanitise_url(shard_url))
+                        continue
+            except (AttributeError, LookupError, TypeError):
+                LOGGER.debug("Ignoring invalid shard %r", shard)
+                continue
+            selected.append(shard_url)
+        return selected
+
+    def _get_next_url(self, url, parsed):
+        # Returns the URL to read after 'url' and the shards that will remain.
+        shards = self._shards
+        if shards is None and isinstance(parsed, dict) and isinstance(parsed.get("shards"), list):
+            shards = self._select_shards(url, parsed["shards"])
+        if shards is not None:
+            return (shards[0], shards[1:]) if shards else (None, [])
+        if isinstance(parsed, dict) and parsed.get("next"):
+            return urljoin(url, parsed["next"], to_parent=True), None
+        return None, None
+
+    def _start_prefetch(self, url, parsed):
+        self.close()
+        if not self.prefetch:
+            return
+        next_url, _ = self._get_next_url(url, parsed)
+        if next_url and not self._cache.get(next_url):
+            LOGGER.debug("Prefetching: %s", next_url)
+            self._prefetch = _IndexPrefetch(self, next_url)
+
+    def _take_prefetch(self, url):
+        prefetch, self._prefetch = self._prefetch, None
+        if not prefetch:
+            return None, None
+        if prefetch.url != url:
+            prefetch.cancel()
+            return None, None
+        return prefetch.result()
+
     def on_auth(self, url):
         # TODO: Try looking for parent paths from URL
         try:
@@ -791,14 +1550,41 @@ class IndexDownloader:
         except LookupError:
             return None
 
+    def _fetch(self, url, accept, compressed=False, cancel=None):
+        headers = {"Accept": accept}
+        cache = self._disk_cache
+        if not cache or not url.casefold().startswith(("http://", "https://")):
+            return self._urlopen(url, "GET", headers, on_auth_request=self.on_auth,
+                                 compressed=compressed, cancel_event=cancel)
+
+        meta, data = cache.get(url)
+        if meta:
+            if cache.is_fresh(meta):
+                LOGGER.debug("Using cached copy of %s", sanitise_url(url))
+                return data
+            headers.update(cache.validators(meta))
+        response_headers = {}
+        try:
+            new_data = self._urlopen(url, "GET", headers, on_auth_request=self.on_auth,
+                                     response_headers=response_headers, compressed=compressed,
+                                     cancel_event=cancel)
+        except NotModifiedError:
+            if data is None:
+                raise
+            LOGGER.debug("Cached copy of %s has not been modified", sanitise_url(url))
+            if cancel is None or not cancel.is_set():
+                cache.refresh(url)
+            return data
+        if cancel is not None and cancel.is_set():
+            # Backends that cannot be interrupted finish the download, but a
+            # cancelled result is not worth keeping.
+            raise KeyboardInterrupt
+        cache.put(url, new_data, response_headers)
+        return new_data
+
     def urlopen_index(self, url):
         try:
-            return self._urlopen(
-                url,
-                "GET",
-                {"Accept": "application/json"},
-                on_auth_request=self.on_auth,
-            )
+            return self._fetch(url, "application/json", compressed=True)
         except FileNotFoundError: # includes 404
             (LOGGER.verbose if self.quiet else LOGGER.error)(
                 "Unable to find runtimes index at %s",
@@ -843,12 +1629,7 @@ class IndexDownloader:
             cat = None
         if not cat:
             try:
-                cat = self._urlopen(
-                    url + ".cat",
-                    "GET",
-                    {"Accept": "application/octet-stream"},
-                    on_auth_request=self.on_auth,
-                )
+                cat = self._fetch(url + ".cat", "application/octet-stream")
                 self._cache[url + ".cat"] = cat
             except OSError as ex:
                 LOGGER.error(
@@ -860,6 +1641,13 @@ class IndexDownloader:
                     return False
                 raise InvalidFeedError(feed_url=url) from ex
 
+        verified_key = None
+        if self._disk_cache:
+            verified_key = _verification_key(data, cat, params)
+            if self._disk_cache.is_verified(verified_key):
+                LOGGER.debug("Signature for %s was previously verified", sanitise_url(url))
+                return True
+
         from tempfile import mkdtemp
         from _native import verify_trust
         tmp_dir = Path(mkdtemp(prefix="pymanager-"))
@@ -875,6 +1663,8 @@ class IndexDownloader:
                 params.get("required_publisher_subject"),
                 params.get("required_publisher_eku"),
             )
+            if verified_key:
+                self._disk_cache.add_verified(verified_key)
             return True
         except OSError as ex:
             LOGGER.error(
@@ -905,21 +1695,36 @@ class IndexDownloader:
         except (LookupError, ValueError):
             data = None
             parsed = None
+        else:
+            self._start_prefetch(url, parsed)
 
         if not data:
             verified = None
-            try:
-                data = self.urlopen_index(url)
-            except RuntimeError as ex:
-                (LOGGER.verbose if self.quiet else LOGGER.error)(
-                    "An unexpected error occurred while downloading the index: %s",
-                    ex,
-                )
-                raise
+            data, parsed = self._take_prefetch(url)
+            if data:
+                LOGGER.debug("Fetched in the background")
+            else:
+                try:
+                    data = self.urlopen_index(url)
+                except RuntimeError as ex:
+                    (LOGGER.verbose if self.quiet else LOGGER.error)(
+                        "An unexpected error occurred while downloading the index: %s",
+                        ex,
+                    )
+                    raise
+                try:
+                    parsed = json.loads(data)
+                except ValueError:
+                    # Raised again below, after checking the signature
+                    parsed = None
+
+            # Start on the next page while we verify this one
+            self._start_prefetch(url, parsed)
 
             source_settings = self.cmd.source_settings.get(s_url) if self.cmd else None
             verified = self.verify(url, data, source_settings)
-            parsed = json.loads(data)
+            if parsed is None:
+                parsed = json.loads(data)
 
             # The parsed index may also have its own verification parameters
             if not source_settings and not verified:
@@ -940,9 +1745,5 @@ class IndexDownloader:
             self._cache[url] = data
 
         index = self.index_cls(self._url, parsed)
-
-        if parsed.get("next"):
-            self._url = urljoin(url, parsed["next"], to_parent=True)
-        else:
-            self._url = None
+        self._url, self._shards = self._get_next_url(url, parsed)
         return index
@@ -1,7 +1,17 @@
+from functools import lru_cache
+
 from .logging import LOGGER
 
 
+# The number of distinct strings to remember parsed results for. Versions are
+# parsed repeatedly (for example, while sorting), but there are rarely more
+# than a few hundred distinct ones in a single process.
+PARSE_CACHE_SIZE = 4096
+
+
 class Version:
+    __slots__ = ("s", "sortkey", "prefix_match", "prerelease_match")
+
     TEXT_MAP = {
         "*": 0,
         "dev": 1,
@@ -19,37 +29,13 @@ class Version:
     MAX_FIELDS = 8
 
     def __init__(self, s):
-        import re
         if isinstance(s, Version):
             s = s.s
-        if not Version._LEVELS:
-            Version._LEVELS = "|".join(re.escape(k) for k in self.TEXT_MAP if k)
-        m = re.match(
-            r"^(?P<numbers>\d+(\.\d+)*)([\.\-]?(?P<level>" + Version._LEVELS + r")[\.]?(?P<serial>\d*))?$",
-            s,
-            re.I,
-        )
-        if not m:
-            raise ValueError("Failed to parse version %s", s)
-        bits = [int(v) for v in m.group("numbers").split(".")]
-        try:
-            dev = self.TEXT_MAP[(m.group("level") or "").lower()]
-        except LookupError:
-            dev = 0
-            LOGGER.warn("Version %s has invalid development level specified which will be ignored", s)
         self.s = s
-        if len(bits) > self.MAX_FIELDS:
-            LOGGER.warn("Version %s is too long and will be truncated to %s for ordering purposes",
-                s, ".".join(map(str, bits[:self.MAX_FIELDS])))
-        self.sortkey = (
-            *bits[:self.MAX_FIELDS],
-            *([0] * (self.MAX_FIELDS - len(bits))),
-            len(bits),  # for sort stability
-            dev,
-            int(m.group("serial") or 0)
-        )
-        self.prefix_match = dev == self.TEXT_MAP["*"]
-        self.prerelease_match = dev == self.TEXT_MAP["dev"]
+        self.sortkey, self.prefix_match, self.prerelease_match, warnings = _parse(s)
+        # Warnings are returned from the cache, so they are shown every time
+        for msg, *args in warnings:
+            LOGGER.warn(msg, *args)
 
     def __str__(self):
         return self.s
@@ -136,3 +122,37 @@ class Version:
             except LookupError:
                 pass
         return v
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(s):
+    # Returns (sortkey, prefix_match, prerelease_match, warnings) for
+    # Version(s). Nothing is logged here, as the result is cached.
+    import re
+    if not Version._LEVELS:
+        Version._LEVELS = "|".join(re.escape(k) for k in Version.TEXT_MAP if k)
+    m = re.match(
+        r"^(?P<numbers>\d+(\.\d+)*)([\.\-]?(?P<level>" + Version._LEVELS + r")[\.]?(?P<serial>\d*))?$",
+        s,
+        re.I,
+    )
+    if not m:
+        raise ValueError("Failed to parse version %s", s)
+    bits = [int(v) for v in m.group("numbers").split(".")]
+    warnings = []
+    try:
+        dev = Version.TEXT_MAP[(m.group("level") or "").lower()]
+    except LookupError:
+        dev = 0
+        warnings.append(("Version %s has invalid development level specified which will be ignored", s))
+    if len(bits) > Version.MAX_FIELDS:
+        warnings.append(("Version %s is too long and will be truncated to %s for ordering purposes",
+            s, ".".join(map(str, bits[:Version.MAX_FIELDS]))))
+    sortkey = (
+        *bits[:Version.MAX_FIELDS],
+        *([0] * (Version.MAX_FIELDS - len(bits))),
+        len(bits),  # for sort stability
+        dev,
+        int(m.group("serial") or 0)
+    )
+    return sortkey, dev == Version.TEXT_MAP["*"], dev == Version.TEXT_MAP["dev"], tuple(warnings)
@@ -0,0 +1,172 @@
+"""Benchmarks for the code that runs on every launch.
+
+These are not collected with the regular tests. Run them explicitly with:
+
+    python -m pytest tests/benchmark_launch.py
+
+Each benchmark runs against synthetic environments with N managed installs,
+M PEP 514 registrations (in an in-memory registry) and K aliases per install.
+Sizes may be overridden with PYMANAGER_BENCHMARK_SIZES="N:M:K,N:M:K,...".
+
+Results are merged into the JSON file named by PYMANAGER_BENCHMARK_OUTPUT
+under "benchmark_launch" (or printed if it is not set), so that they can be
+compared across runs.
+"""
+
+import json
+import os
+import pytest
+import time
+import winreg
+
+import manage
+from manage import installs, launch, launchtable, pep514utils, scriptutils
+from manage import install_command as IC
+from manage.pathutils import Path
+
+
+def _get_sizes():
+    spec = os.getenv("PYMANAGER_BENCHMARK_SIZES")
+    if not spec:
+        return [(10, 10, 2), (100, 50, 4), (500, 200, 8)]
+    return [tuple(int(n) for n in s.split(":")) for s in spec.split(",")]
+
+
+SIZES = _get_sizes()
+REPEAT = int(os.getenv("PYMANAGER_BENCHMARK_REPEAT", "20"))
+RESULTS = []
+
+pytestmark = pytest.mark.usefixtures("benchmark_report")
+
+
+def measure(name, env, fn, *args, **kwargs):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    RESULTS.append({
+        "name": name,
+        "installs": env.n_installs,
+        "registrations": env.n_registrations,
+        "aliases": env.n_aliases,
+        # The first call includes building any caches
+        "first": times[0],
+        "min": min(times),
+        "median": sorted(times)[len(times) // 2],
+    })
+
+
+def _make_install(prefix, i, n_aliases):
+    company = "PythonCore" if i % 5 else f"Company{i % 3}"
+    tag = f"3.{i}" if i % 4 else f"3.{i}-32"
+    run_for = [
+        {"tag": tag, "target": "python.exe"},
+        {"tag": tag, "target": "pythonw.exe", "windowed": 1},
+        {"tag": "3", "target": "python.exe"},
+        {"tag": "3", "target": "pythonw.exe", "windowed": 1},
+    ]
+    alias = [
+        {"name": f"python{tag}-{k}.exe", "target": "python.exe"} if k % 2 else
+        {"name": f"pythonw{tag}-{k}.exe", "target": "pythonw.exe", "windowed": 1}
+        for k in range(n_aliases)
+    ]
+    prefix.mkdir(parents=True)
+    (prefix / "python.exe").write_bytes(b"")
+    (prefix / "pythonw.exe").write_bytes(b"")
+    (prefix / "__install__.json").write_text(json.dumps({
+        "schema": 1,
+        "id": f"{company}-{tag}",
+        "sort-version": f"3.{i}",
+        "company": company,
+        "tag": tag,
+        "display-name": f"Python {tag}",
+        "run-for": run_for,
+        "alias": alias,
+        "executable": "python.exe",
+    }), encoding="utf-8")
+
+
+class SyntheticEnv:
+    def __init__(self, root, registry, n_installs, n_registrations, n_aliases):
+        self.root = root
+        self.registry = registry
+        self.n_installs = n_installs
+        self.n_registrations = n_registrations
+        self.n_aliases = n_aliases
+        self.install_dir = root / "pkgs"
+        for i in range(n_installs):
+            _make_install(self.install_dir / f"install-{i}", i, n_aliases)
+        tags = {}
+        for j in range(n_registrations):
+            tags.setdefault(f"Vendor{j % 4}", {})[f"{j}.0"] = {
+                "InstallPath": {"": str(root / "unmanaged" / str(j)), "ExecutablePath": "python.exe"},
+            }
+        registry.setup(winreg.HKEY_CURRENT_USER, r"SOFTWARE\Python", **tags)
+
+    def get_unmanaged_installs(self):
+        return pep514utils.get_unmanaged_installs(backend=self.registry)
+
+    def get_unmanaged_run_for_tags(self):
+        return pep514utils.get_unmanaged_run_for_tags(self.registry)
+
+
+@pytest.fixture(params=SIZES, ids=lambda s: "{}-{}-{}".format(*s))
+def env(request, tmp_path, fake_registry, monkeypatch, quiet_log):
+    monkeypatch.setenv("LocalAppData", str(tmp_path / "appdata"))
+    e = SyntheticEnv(Path(tmp_path) / "root", fake_registry, *request.param)
+    monkeypatch.setattr(installs, "_get_unmanaged_installs", e.get_unmanaged_installs)
+    monkeypatch.setattr(installs, "_get_unmanaged_run_for_tags", e.get_unmanaged_run_for_tags)
+    return e
+
+
+def test_find_one(env):
+    root = str(env.root)
+    measure("find_one(default)", env, manage.find_one, root, "", "", 0, 0, 0)
+    measure("find_one(-V:3.1)", env, manage.find_one, root, "3.1", "", 0, 0, 0)
+
+
+def test_find_one_launch_table(env, monkeypatch):
+    class Cmd:
+        root = env.root
+        launch_table = env.root / "launch.json"
+    launchtable.update_launch_table(Cmd)
+    monkeypatch.setattr(launchtable, "get_launch_table_file", lambda: Cmd.launch_table)
+    measure("find_one(default, launch table)", env, manage.find_one, str(env.root), "", "", 0, 0, 0)
+
+
+def test_get_installs(env):
+    measure("get_installs(managed)", env, installs.get_installs, env.install_dir, include_unmanaged=False)
+    measure("get_installs(all)", env, installs.get_installs, env.install_dir)
+
+
+def test_get_matching_install_tags(env):
+    all_installs = installs.get_installs(env.install_dir)
+    for tag in ["3", "3.1", "Company1\\3.5", ">=3.5", "Vendor1\\1.0"]:
+        measure(f"get_matching_install_tags({tag})", env, installs.get_matching_install_tags,
+                all_installs, tag, windowed=False, default_platform="-64")
+
+
+def test_find_install_from_script(env, tmp_path):
+    cmd = launch.load_launch_config(env.root)
+    for shebang in ["/usr/bin/python", "/usr/bin/python3.1", "/usr/bin/env python3.1-1"]:
+        script = tmp_path / "script.py"
+        script.write_text(f"#! {shebang}\nprint('hello')\n", encoding="utf-8")
+        measure(f"find_install_from_script({shebang})", env,
+                scriptutils.find_install_from_script, cmd, script)
+
+
+def test_update_all_shortcuts(env, monkeypatch):
+    # Only aliases are updated, as the other shortcut kinds use the real
+    # registry and Start menu.
+    monkeypatch.setattr(IC, "SHORTCUT_HANDLERS", {})
+    launcher = env.root / "launcher.exe"
+    launcher.write_bytes(b"launcher")
+
+    cmd = launch.load_launch_config(env.root)
+    cmd.global_dir = env.root / "bin"
+    cmd.launcher_exe = cmd.launcherw_exe = launcher
+    cmd.scratch = {}
+    cmd.enable_entrypoints = False
+    cmd.enable_shortcut_kinds = cmd.disable_shortcut_kinds = None
+    measure("update_all_shortcuts", env, IC.update_all_shortcuts, cmd)
@@ -0,0 +1,138 @@
+"""Benchmarks for parsing and matching versions and tags in a large index.
+
+These are not collected with the regular tests. Run them explicitly with:
+
+    python -m pytest tests/benchmark_tags.py
+
+Each benchmark is run "cold" (with the version and tag parsing caches cleared
+before every call) and "warm". Index sizes may be overridden with
+PYMANAGER_BENCHMARK_INDEX_SIZES="N,N,...".
+
+Results are merged into the JSON file named by PYMANAGER_BENCHMARK_OUTPUT
+under "benchmark_tags" (or printed if it is not set), so that they can be
+compared across runs.
+"""
+
+import json
+import os
+import pytest
+import time
+
+from manage import tagutils, verutils
+from manage.indexutils import Index
+from manage.installs import _make_sort_key
+from manage.tagutils import install_matches_any, tag_or_range
+
+
+SIZES = [int(n) for n in os.getenv("PYMANAGER_BENCHMARK_INDEX_SIZES", "1000,10000").split(",")]
+REPEAT = int(os.getenv("PYMANAGER_BENCHMARK_REPEAT", "10"))
+RESULTS = []
+
+pytestmark = pytest.mark.usefixtures("benchmark_report")
+
+
+def clear_caches():
+    verutils._parse.cache_clear()
+    tagutils._sort_tag.cache_clear()
+    tagutils._company_key.cache_clear()
+    tagutils._parse_company_tag.cache_clear()
+
+
+def measure(name, size, fn, *args, **kwargs):
+    for mode in ("cold", "warm"):
+        times = []
+        for _ in range(REPEAT):
+            if mode == "cold":
+                clear_caches()
+            start = time.perf_counter()
+            fn(*args, **kwargs)
+            times.append(time.perf_counter() - start)
+        RESULTS.append({
+            "name": name,
+            "mode": mode,
+            "entries": size,
+            "min": min(times),
+            "median": sorted(times)[len(times) // 2],
+        })
+
+
+def make_index_data(n):
+    versions = []
+    for i in range(n):
+        company = "PythonCore" if i % 7 else f"Company{i % 5}"
+        ver = f"3.{i // 100}.{i % 100}"
+        if i % 3 == 0:
+            ver += f"a{i % 4 + 1}"
+        for plat in ("-64", "-32", "-arm64"):
+            tag = f"{ver}{plat}"
+            versions.append({
+                "schema": 1,
+                "id": f"{company}-{tag}",
+                "sort-version": ver,
+                "company": company,
+                "tag": tag,
+                "install-for": [tag, f"3.{i // 100}{plat}"],
+                "run-for": [
+                    {"tag": tag, "target": "python.exe"},
+                    {"tag": f"3.{i // 100}{plat}", "target": "python.exe"},
+                ],
+                "display-name": f"Python {tag}",
+                "executable": "python.exe",
+                "url": f"https://example.com/{company}-{tag}.zip",
+            })
+    return {"versions": versions}
+
+
+@pytest.fixture(params=SIZES, ids=str)
+def index_data(request, quiet_log):
+    return request.param, make_index_data(request.param)
+
+
+def test_index_load(index_data):
+    size, data = index_data
+    measure("Index()", size, lambda: Index("https://example.com/index.json", json.loads(json.dumps(data))))
+
+
+def test_index_memory(index_data):
+    import tracemalloc
+    size, data = index_data
+    raw = json.dumps(data)
+    for name, fn in [
+        ("Index()", lambda: Index("https://example.com/index.json", json.loads(raw))),
+        ("Index().find_all()", lambda: list(Index("https://example.com/index.json", json.loads(raw)).find_all([]))),
+    ]:
+        clear_caches()
+        tracemalloc.start()
+        try:
+            result = fn()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del result
+        RESULTS.append({
+            "name": f"{name} memory",
+            "entries": size,
+            "current": current,
+            "peak": peak,
+        })
+
+
+def test_index_find(index_data):
+    size, data = index_data
+    index = Index("https://example.com/index.json", data)
+    for tag in ["3", "3.5-32", "Company1\\3", ">=3.50,<3.60"]:
+        measure(f"Index.find_all({tag})", size, lambda: list(index.find_all([tag])))
+    # Versions 3.0, 3.1, ... each have 100 entries, so small indexes may not
+    # include 3.1
+    tag = f"3.{min(1, (size - 1) // 100)}-arm64"
+    measure(f"Index.find_to_install({tag})", size, index.find_to_install, tag)
+
+
+def test_sort_and_match(index_data):
+    size, data = index_data
+    installs = Index("https://example.com/index.json", data).versions
+    measure("sorted(_make_sort_key)", size, sorted, installs, key=_make_sort_key)
+    filters = [tag_or_range("3.5"), tag_or_range("<3.2")]
+    measure("install_matches_any", size, lambda: [
+        i for i in installs if install_matches_any(i, filters)
+    ])
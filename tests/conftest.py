@@ -60,6 +60,12 @@ def _mock_load_registry_config(key, schema):
 manage.config.load_global_config = _mock_load_global_config
 manage.config.load_registry_config = _mock_load_registry_config
 
+# Ensure we don't reuse or overwrite any real cached state
+
+import manage.launchtable
+manage.config.get_config_snapshot_file = lambda: None
+manage.launchtable.get_launch_table_file = lambda: None
+
 
 @pytest.fixture
 def quiet_log():
@@ -158,6 +164,46 @@ def localserver():
                 p.wait(5)
 
 
+@pytest.fixture(scope="module")
+def benchmark_report(request):
+    """Reports the RESULTS of a benchmark module once all of its tests have run.
+
+    Results are merged into the JSON file named by PYMANAGER_BENCHMARK_OUTPUT
+    under the module's name, so that multiple modules can share one file.
+    Otherwise, they are printed.
+    """
+    yield
+    import json
+    import platform
+    import time
+    module = request.module
+    name = module.__name__.rpartition(".")[2]
+    result = {
+        "version": manage.__version__,
+        "python": sys.version,
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "repeat": module.REPEAT,
+        "results": module.RESULTS,
+    }
+    output = os.getenv("PYMANAGER_BENCHMARK_OUTPUT")
+    if not output:
+        print(json.dumps({name: result}, indent=2))
+        return
+    try:
+        with open(output, "r", encoding="utf-8") as f:
+            merged = json.load(f)
+        # Discard anything that is not another module's results
+        merged = {k: v for k, v in merged.items() if isinstance(v, dict) and "results" in v}
+    except (OSError, ValueError, AttributeError):
+        merged = {}
+    merged[name] = result
+    tmp_output = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_output, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2)
+    os.replace(tmp_output, output)
+
+
 REG_TEST_ROOT = r"Software\Python\PyManagerTesting"
 
 
@@ -260,6 +306,96 @@ def registry():
         yield key
 
 
+class FakeRegistryKey:
+    def __init__(self, registry):
+        self.subkeys = {}
+        self.values = {}
+        self.last_write = registry.tick()
+
+    def __bool__(self):
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeRegistry:
+    """In-memory registry implementing the pep514utils.WinregBackend interface.
+
+    Each modification advances a clock that is used for last write times.
+    """
+    def __init__(self):
+        self.clock = 0
+        self.roots = {}
+        self.value_reads = 0
+
+    def tick(self):
+        self.clock += 1
+        return self.clock
+
+    def _root(self, hive, x86_only):
+        view = bool(x86_only) if hive == winreg.HKEY_LOCAL_MACHINE else None
+        try:
+            return self.roots[hive, view]
+        except KeyError:
+            root = self.roots[hive, view] = FakeRegistryKey(self)
+            return root
+
+    def _find(self, key, subkey, create=False):
+        for part in subkey.split("\\") if subkey else ():
+            sub = next((v for k, v in key.subkeys.items()
+                        if k.casefold() == part.casefold()), None)
+            if sub is None:
+                if not create:
+                    return None
+                sub = key.subkeys[part] = FakeRegistryKey(self)
+                key.last_write = self.clock
+            key = sub
+        return key
+
+    def _setup(self, key, tree):
+        for k, v in tree.items():
+            if isinstance(v, dict):
+                self._setup(self._find(key, k, create=True), v)
+            else:
+                key.values[k] = v
+                key.last_write = self.tick()
+
+    def setup(self, hive, subkey, x86_only=None, **tree):
+        self._setup(self._find(self._root(hive, x86_only), subkey, create=True), tree)
+
+    def open(self, key, subkey, x86_only=None):
+        from manage.pep514utils import KeyNotFoundSentinel
+        if not isinstance(key, FakeRegistryKey):
+            key = self._root(key, x86_only)
+        return self._find(key, subkey) or KeyNotFoundSentinel()
+
+    def iter_keys(self, key):
+        if not key:
+            return iter(())
+        return iter(list(key.subkeys))
+
+    def query_value(self, key, name):
+        self.value_reads += 1
+        try:
+            v = key.values[name or ""]
+        except KeyError:
+            raise FileNotFoundError(name) from None
+        if isinstance(v, int):
+            return v, winreg.REG_DWORD
+        return v, winreg.REG_SZ
+
+    def last_write_time(self, key):
+        return key.last_write
+
+
+@pytest.fixture
+def fake_registry():
+    return FakeRegistry()
+
 
 def make_install(tag, **kwargs):
     run_for = []
@@ -311,6 +447,10 @@ def fake_get_unmanaged_installs():
     return []
 
 
+def fake_get_unmanaged_run_for_tags():
+    return set()
+
+
 def fake_get_venv_install(virtualenv):
     raise LookupError
 
@@ -319,6 +459,7 @@ def fake_get_venv_install(virtualenv):
 def patched_installs(monkeypatch):
     monkeypatch.setattr(manage.installs, "_get_installs", fake_get_installs)
     monkeypatch.setattr(manage.installs, "_get_unmanaged_installs", fake_get_unmanaged_installs)
+    monkeypatch.setattr(manage.installs, "_get_unmanaged_run_for_tags", fake_get_unmanaged_run_for_tags)
     monkeypatch.setattr(manage.installs, "_get_venv_install", fake_get_venv_install)
 
 
@@ -326,4 +467,5 @@ def patched_installs(monkeypatch):
 def patched_installs2(monkeypatch):
     monkeypatch.setattr(manage.installs, "_get_installs", fake_get_installs2)
     monkeypatch.setattr(manage.installs, "_get_unmanaged_installs", fake_get_unmanaged_installs)
+    monkeypatch.setattr(manage.installs, "_get_unmanaged_run_for_tags", fake_get_unmanaged_run_for_tags)
     monkeypatch.setattr(manage.installs, "_get_venv_install", fake_get_venv_install)
@@ -56,6 +56,167 @@ class Handler(BaseHTTPRequestHandler):
                     self.wfile.write(os.urandom(1024))
                     time.sleep(0.05)
             return
+        if self.path.startswith("/cached/"):
+            # Supports conditional requests, and counts full responses in
+            # the body so that tests can tell when they were sent.
+            etag = '"cached-v1"'
+            last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+            inm = self.headers.get("If-None-Match")
+            if (inm == etag or
+                (inm is None and self.headers.get("If-Modified-Since") == last_modified)):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.server.cached_count = getattr(self.server, "cached_count", 0) + 1
+            body = ('{"versions": [], "count": %s}' % self.server.cached_count).encode()
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            if self.path.endswith(".nostore.json"):
+                self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", len(body))
+            self.end_headers()
+            if not header_only:
+                self.wfile.write(body)
+            return
+        if self.path == "/compressed/index.json":
+            # Encodes the response as requested, and reports the encoding
+            # that was used in the body
+            import gzip
+            accept = [e.strip() for e in self.headers.get("Accept-Encoding", "").split(",")]
+            encoding = next((e for e in ["zstd", "gzip"] if e in accept), None)
+            body = ('{"versions": [], "encoding": "%s"}' % encoding).encode()
+            if encoding == "zstd":
+                from compression import zstd
+                body = zstd.compress(body)
+            elif encoding == "gzip":
+                body = gzip.compress(body)
+            self.send_response(200)
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", len(body))
+            self.end_headers()
+            if not header_only:
+                self.wfile.write(body)
+            return
+        if self.path.startswith("/chain/"):
+            # Index pages that link to the next one, ending at page 3, and a
+            # manifest that lists them as shards
+            if self.path == "/chain/manifest.json":
+                page = 0
+            else:
+                page = int(self.path[7:].partition(".")[0])
+            if page == 0:
+                body = ('{"versions": [], "page": 0, "shards": ['
+                        '{"url": "1.json", "install-for": ["3.14", "3.13-64"]}, '
+                        '{"url": "2.json", "install-for": ["3.12", "Company\\\\3.12"]}, '
+                        '{"url": "3.json"}]}')
+            elif page < 3:
+                body = '{"versions": [], "page": %s, "next": "%s.json"}' % (page, page + 1)
+            else:
+                body = '{"versions": [], "page": %s}' % page
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Length", len(body))
+            self.end_headers()
+            if not header_only:
+                self.wfile.write(body)
+            return
+        if self.path == "/ranged/stats":
+            # Returns the Range headers received since the last call
+            import json
+            body = json.dumps(getattr(self.server, "ranges", [])).encode()
+            self.server.ranges = []
+            self.send_response(200)
+            self.send_header("Content-Length", len(body))
+            self.end_headers()
+            if not header_only:
+                self.wfile.write(body)
+            return
+        if self.path.startswith(("/ranged/", "/ranged-ignored/")):
+            # Deterministic content of the requested size in KiB that
+            # supports Range and If-Range requests, unless the path is
+            # /ranged-ignored/, which advertises support but always returns
+            # the entire content.
+            # The 251 byte period ensures misplaced ranges are detected.
+            size = int(self.path.rpartition("/")[2]) * 1024
+            data = (bytes(range(251)) * (size // 251 + 1))[:size]
+            etag = f'"ranged-{size}"'
+            rng = self.headers.get("Range")
+            if_range = self.headers.get("If-Range")
+            self.server.__dict__.setdefault("ranges", []).append(rng)
+            first, last = 0, size - 1
+            if if_range and if_range != etag:
+                rng = None
+            if rng and self.path.startswith("/ranged/"):
+                unit, _, spec = rng.partition("=")
+                start, _, end = spec.partition("-")
+                if unit != "bytes" or "," in spec or not start or int(start) >= size:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.end_headers()
+                    return
+                first = int(start)
+                last = min(int(end), size - 1) if end else size - 1
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", last - first + 1)
+            self.end_headers()
+            if not header_only:
+                try:
+                    for i in range(first, last + 1, 16 * 1024):
+                        self.wfile.write(data[i:min(i + 16 * 1024, last + 1)])
+                        time.sleep(0.01)
+                except ConnectionError:
+                    # Clients may stop reading once they have what they need
+                    pass
+            return
+        if self.path.startswith("/nuget/"):
+            # A minimal NuGet feed that keeps connections alive, supports
+            # conditional requests, and reports what it has served at
+            # /nuget/stats
+            import json
+            self.protocol_version = "HTTP/1.1"
+            self.close_connection = self.headers.get("Connection", "").lower() == "close"
+            stats = self.server.__dict__.setdefault("nuget_stats", {
+                "requests": 0, "full": 0, "connections": set(),
+            })
+            etag = None
+            if self.path == "/nuget/stats":
+                body = {k: len(v) if isinstance(v, set) else v for k, v in stats.items()}
+            elif self.path == "/nuget/index.json":
+                base = "http://{}/nuget/flat/".format(self.headers["Host"])
+                body = {"resources": [{"@type": "PackageBaseAddress/3.0.0", "@id": base}]}
+                etag = '"nuget-index-v1"'
+            elif self.path.startswith("/nuget/flat/") and self.path.endswith("/index.json"):
+                body = {"versions": ["3.12.10", "3.13.0", "3.14.0-rc1", "3.14.0"]}
+                etag = '"nuget-package-v1"'
+            else:
+                self.send_error(404)
+                return
+            if etag:
+                stats["requests"] += 1
+                stats["connections"].add(self.client_address)
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                stats["full"] += 1
+            body = json.dumps(body).encode()
+            self.send_response(200)
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", len(body))
+            self.end_headers()
+            if not header_only:
+                self.wfile.write(body)
+            return
         if self.path == "/withauth":
             if "Authorization" not in self.headers:
                 self.send_response(401)
@@ -118,3 +118,16 @@ def test_install_command_args():
     ]:
         cmd = commands.InstallCommand(args)
         assert cmd.log_file == "C:\\LOG.txt"
+
+
+def test_install_command_jobs():
+    assert commands.InstallCommand(["--jobs", "3"]).jobs == 3
+    assert commands.InstallCommand(["--jobs=2"]).jobs == 2
+    for args in [
+        ["--jobs", "abc"],
+        ["--jobs=1.5"],
+        ["--jobs", "0"],
+        ["--jobs=-1"],
+    ]:
+        with pytest.raises(ArgumentError):
+            commands.InstallCommand(args)
@@ -1,6 +1,8 @@
+import json
 import pytest
 
 from manage.config import (
+    ConfigInputs,
     _expand_vars,
     config_append,
     config_bool,
@@ -200,4 +202,69 @@ def test_config_split_append_does_not_mutate_existing_list():
 
     assert actual == ["first", ["second", "third"]]
     assert existing == ["first"]
-    assert actual is not existing
\ No newline at end of file
+    assert actual is not existing
+
+
+def test_config_inputs(tmp_path, monkeypatch):
+    from manage.config import load_config
+    schema = {"_config_files": (str, config_append, "path"), "x": (str, None, "env")}
+    file = tmp_path / "config.json"
+    file.write_text(json.dumps({"x": "%PYMANAGER_TEST_X%"}), encoding="utf-8")
+    monkeypatch.setenv("PYMANAGER_TEST_X", "1")
+
+    inputs = ConfigInputs()
+    cfg = load_config(tmp_path, file, schema, inputs=inputs)
+    assert cfg["x"] == "1"
+    assert inputs.env == {"PYMANAGER_TEST_X": "1"}
+    assert str(file) in inputs.files
+    assert ConfigInputs.from_json(json.loads(json.dumps(inputs.to_json()))).is_current()
+
+    monkeypatch.setenv("PYMANAGER_TEST_X", "2")
+    assert not inputs.is_current()
+    monkeypatch.setenv("PYMANAGER_TEST_X", "1")
+    assert inputs.is_current()
+
+    file.write_text(json.dumps({"x": "%PYMANAGER_TEST_X%", "#": "changed"}), encoding="utf-8")
+    assert not inputs.is_current()
+
+
+def test_config_snapshot(tmp_path, monkeypatch):
+    import manage.config
+    from manage.config import load_config
+    from manage.pathutils import Path
+    schema = {
+        "_config_files": (str, config_append, "path"),
+        "x": (str, None, "env"),
+        "dir": (str, None, "path"),
+        "sub": {"y": (config_bool, None)},
+    }
+    file = tmp_path / "config.json"
+    file.write_text(json.dumps({
+        "x": "%PYMANAGER_TEST_X%",
+        "dir": str(tmp_path / "subdir"),
+        "sub": {"y": "true"},
+    }), encoding="utf-8")
+    snapshot = tmp_path / "snapshot.json"
+    monkeypatch.setattr(manage.config, "get_config_snapshot_file", lambda: snapshot)
+    monkeypatch.setenv("PYMANAGER_TEST_X", "1")
+
+    cfg = load_config(tmp_path, file, schema, use_snapshot=True)
+    assert snapshot.is_file()
+
+    def _no_load(*args):
+        raise AssertionError("should have used the snapshot")
+
+    with monkeypatch.context() as m:
+        m.setattr(manage.config, "_load_config", _no_load)
+        inputs = ConfigInputs()
+        cfg2 = load_config(tmp_path, file, schema, inputs=inputs, use_snapshot=True)
+    assert cfg2 == cfg
+    assert isinstance(cfg2["dir"], Path)
+    assert cfg2["dir"] == Path(tmp_path) / "subdir"
+    assert cfg2["sub"] == {"y": True}
+    assert inputs.env == {"PYMANAGER_TEST_X": "1"}
+
+    # Any change to the inputs makes the snapshot stale
+    monkeypatch.setenv("PYMANAGER_TEST_X", "2")
+    assert load_config(tmp_path, file, schema, use_snapshot=True)["x"] == "2"
+    assert load_config(tmp_path, None, schema, use_snapshot=True).get("x") is None
@@ -183,3 +183,114 @@ def test_select_package():
     assert select_package([index], "3.13-32", "-64")["tag"] == "3.13.0-32"
     assert select_package([index], "3.13", "-32")["tag"] == "3.13.0-32"
     assert select_package([index], "3.13-64", "-32")["tag"] == "3.13.0-64"
+
+
+def test_index_validates_lazily():
+    bad = {**fake_install_data("3.10.4"), "unexpected-key": 1}
+    data = {
+        "versions": [
+            bad,
+            fake_install_data("3.11.3"),
+            fake_install_data("3.13.1"),
+        ],
+    }
+    index = iu.Index("https://localhost/", data)
+    assert index.find_to_install("3.13")["tag"] == "3.13.1"
+    assert index.find_to_install("3.11")["tag"] == "3.11.3"
+    assert isinstance(index.find_to_install("3.11")["sort-version"], iu.Version)
+    with pytest.raises(InvalidFeedError):
+        index.find_to_install("3.10")
+    with pytest.raises(InvalidFeedError):
+        index.versions
+
+    with pytest.raises(InvalidFeedError):
+        iu.Index("https://localhost/", data, strict=True)
+
+    # Entries that cannot be sorted are reported immediately
+    data["versions"][0] = {**bad, "sort-version": "not a version"}
+    with pytest.raises(InvalidFeedError):
+        iu.Index("https://localhost/", data)
+
+
+def test_index_lazy_order_matches_strict():
+    data = {
+        "next": "index2.json",
+        "versions": [
+            fake_install_data("3.12.2-32", sort_version="3.12.2"),
+            fake_install_data("3.13.1"),
+            fake_install_data("3.12.2-64", sort_version="3.12.2"),
+            fake_install_data("3.14.0a1"),
+        ],
+    }
+    lazy = iu.Index("https://localhost/", data)
+    strict = iu.Index("https://localhost/", data, strict=True)
+    assert lazy.next_url == strict.next_url == "index2.json"
+    assert lazy.versions == strict.versions
+    assert [v["tag"] for v in lazy.versions] == ["3.14.0a1", "3.13.1", "3.12.2-32", "3.12.2-64"]
+
+
+def _linear_find_to_install(versions, tag, loose_company, prefer_prerelease):
+    # The original multi-pass search, used to check the lookup tables
+    filters = [iu.tag_or_range(tag)] if tag else []
+    attempts = [(loose_company, prefer_prerelease), (True, prefer_prerelease), (True, True)]
+    for loose, with_pre in attempts:
+        for v in versions:
+            if with_pre or not v["sort-version"].is_prerelease:
+                if iu.install_matches_any(v, filters, loose_company=loose):
+                    return v
+    return None
+
+
+def test_index_lookup_matches_linear_search():
+    versions = []
+    for company in ["PythonCore", "Company", "CompanyTwo"]:
+        for v in ["3.10.4", "3.11.3", "3.12.2", "3.13.1", "3.14.0a1", "3.14.0", "3.15.0b2"]:
+            versions.append(fake_install_data(v, company=company))
+            versions.append(fake_install_data(f"{v}-32", company=company, sort_version=v))
+    index = iu.Index("https://localhost/", {"versions": versions})
+    ordered = index.versions
+
+    tags = ["", "3", "3.14", "3.15", "3.12-32", "3.14.0a1", "4", "Company\\3", "company/3.15",
+            "CompanyTwo\\3.10", "Comp\\3.13", "cpy\\3", ">=3.13", "<3.12", "!=3.13",
+            "Company\\>=3.12,<3.14", "!=3.14,!=3.15"]
+    for tag in tags:
+        for loose in (False, True):
+            for pre in (False, True):
+                expect = _linear_find_to_install(ordered, tag, loose, pre)
+                try:
+                    actual = index.find_to_install(tag, loose_company=loose, prefer_prerelease=pre)
+                except LookupError:
+                    actual = None
+                else:
+                    assert actual.pop("source") == "https://localhost/"
+                assert actual == expect, (tag, loose, pre)
+        for pre in (False, True):
+            filters = [iu.tag_or_range(tag)] if tag else []
+            expect = [v for v in ordered
+                      if (pre or not v["sort-version"].is_prerelease)
+                      and iu.install_matches_any(v, filters)]
+            assert list(index.find_all([tag] if tag else [], with_prerelease=pre)) == expect, tag
+
+    for v in ordered:
+        assert index.find_by_id(v["id"].upper()) is v
+    assert index.find_by_id("PythonCore-3.15.0b2", with_prerelease=False) is None
+    assert index.find_by_id("PythonCore-2.7") is None
+
+
+def test_index_entries_materialized_on_demand():
+    data = {"versions": [fake_install_data(v) for v in ["3.13.1", "3.12.2", "3.11.3"]]}
+    index = iu.Index("https://localhost/", data)
+    entries = {e.tag: e for e in index._entries}
+    e = entries["3.12.2"]
+    assert e["id"] == "PythonCore-3.12.2"
+    assert e["install-for"] == ["3.12.2", "3.12", "3"]
+    assert isinstance(e["sort-version"], iu.Version)
+    assert not hasattr(e, "__dict__")
+    assert e._full is None
+    # Reading other fields validates the entry
+    assert e.get("default") is None
+    assert e._full is not None
+    assert index.find_to_install("3.11")["tag"] == "3.11.3"
+    assert [t for t, e in entries.items() if e._full is not None] == ["3.12.2", "3.11.3"]
+    assert entries["3.11.3"]._raw is None
+    assert entries["3.13.1"]._raw is data["versions"][0]
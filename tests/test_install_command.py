@@ -6,7 +6,7 @@ from pathlib import Path, PurePath
 from manage import install_command as IC
 from manage import installs
 from manage.commands import BaseCommand
-from manage.exceptions import NoInstallFoundError
+from manage.exceptions import HashMismatchError, NoInstallFoundError
 from manage.logging import LOGGER
 
 
@@ -101,6 +101,94 @@ def test_download_package_yes_aborts_background_download(tmp_path):
     assert dest.read_bytes() == b"download"
 
 
+def test_download_package_validates_while_downloading(tmp_path, monkeypatch):
+    class Cmd:
+        force = False
+        bundled_dir = None
+        source = "https://example.com/index.json"
+
+    def urlretrieve(url, dest, *, hashes, **kwargs):
+        assert hashes == ["sha256"]
+        dest.write_bytes(b"download")
+        return {"sha256": digest}
+
+    def multihash(file, hashes):
+        assert False, "package should not be read again"
+
+    monkeypatch.setattr(IC, "_multihash", multihash)
+    install = {"url": "https://example.com/download.zip", "hash": {"sha256": "ABCDEF"}}
+    dest = tmp_path / "download.zip"
+
+    digest = "abcdef"
+    assert IC.download_package(Cmd(), install, dest, {}, urlretrieve=urlretrieve) == dest
+    assert dest.is_file()
+
+    digest = "012345"
+    with pytest.raises(HashMismatchError):
+        IC.download_package(Cmd(), install, tmp_path / "other.zip", {}, urlretrieve=urlretrieve)
+    assert not (tmp_path / "other.zip").exists()
+
+
+def test_download_one_uses_package_cache(tmp_path, monkeypatch):
+    cmd = InstallCommandTestCmd(tmp_path, force=False)
+    downloads = []
+
+    def download_package(cmd, install, dest, cache, **kwargs):
+        if not dest.is_file():
+            downloads.append(install["id"])
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            dest.write_bytes(b"package")
+        return dest
+
+    monkeypatch.setattr(IC, "download_package", download_package)
+    install = {"id": "test-1", "sort-version": "1.0", "url": "https://example.com/1.zip",
+               "hash": {"sha256": "0123"}}
+    # Same contents under a different ID and URL
+    install2 = {**install, "id": "test-2", "url": "https://example.com/2.zip"}
+
+    # A package saved by an earlier version is moved into the cache
+    legacy = cmd.download_dir / "test-1-1.0.zip"
+    legacy.parent.mkdir(parents=True)
+    legacy.write_bytes(b"package")
+
+    package = IC._download_one(cmd, cmd.source, install, cmd.download_dir)
+    assert package.name == "sha256-0123.zip"
+    assert not legacy.exists()
+    assert IC._download_one(cmd, cmd.source, install2, cmd.download_dir) == package
+    assert downloads == []
+
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    dst = IC._download_one(cmd, cmd.source, install2, bundle, must_copy=True)
+    assert dst == bundle / "test-2-1.0.zip"
+    assert dst.read_bytes() == b"package"
+    assert os.path.samefile(dst, package)
+
+    from manage.cacheutils import get_download_cache
+    assert [e["id"] for e in get_download_cache(cmd).entries()] == ["test-2"]
+
+
+def test_download_one_uses_bundled_package(tmp_path, monkeypatch):
+    import hashlib
+    cmd = InstallCommandTestCmd(tmp_path, force=False)
+    cmd.bundled_dir = tmp_path / "bundled"
+    cmd.bundled_dir.mkdir()
+    # Bundles are prepared with 'py install --download'
+    bundled = cmd.bundled_dir / "test-1-1.0.zip"
+    bundled.write_bytes(b"package")
+    install = {"id": "test-1", "sort-version": "1.0", "url": "https://example.com/1.zip",
+               "hash": {"sha256": hashlib.sha256(b"package").hexdigest()}}
+
+    def urlretrieve(*args, **kwargs):
+        assert False, "bundled package should be used"
+
+    def download_package(*args, _orig=IC.download_package, **kwargs):
+        return _orig(*args, **kwargs, urlretrieve=urlretrieve)
+
+    monkeypatch.setattr(IC, "download_package", download_package)
+    assert IC._download_one(cmd, cmd.source, install, cmd.download_dir) == bundled
+
+
 def test_merge_existing_index_not_found(tmp_path):
     existing = tmp_path / "index.json"
     try:
@@ -266,6 +354,7 @@ class InstallCommandTestCmd:
         self.dry_run = kwargs.pop("dry_run", True)
         self.fallback_source = kwargs.pop("fallback_source", None)
         self.force = kwargs.pop("force", True)
+        self.jobs = kwargs.pop("jobs", 1)
         self.from_script = kwargs.pop("from_script", None)
         self.log_file = kwargs.pop("log_file", None)
         self.refresh = kwargs.pop("refresh", False)
@@ -636,3 +725,105 @@ def test_user_provided_source_retained(tmp_path, assert_log, monkeypatch):
         assert_log.skip_until("Installing %s", ["Test 1.1 (32)"]),
         ("Tag: %s\\\\%s", ["Test", "1.1-32"]),
     )
+
+
+def test_install_all_pipelined(tmp_path, monkeypatch, assert_log):
+    import threading
+    cmd = InstallCommandTestCmd(tmp_path, jobs=3, dry_run=False)
+    items = [
+        (cmd.source, {"id": f"test-{n}", "sort-version": "1.0", "display-name": f"Test {n}"})
+        for n in range(3)
+    ]
+    # Each download waits for the others to start, so this only passes if
+    # they are concurrent.
+    all_started = threading.Barrier(len(items), timeout=5)
+    installed = []
+
+    def download_one(cmd, source, install, download_dir, *, must_copy=False, progress=None,
+                     cancel=None):
+        with progress.begin("Downloading"):
+            all_started.wait()
+            if install["id"] == "test-1":
+                raise RuntimeError("failed for test reasons")
+        return f"<{install['id']}>"
+
+    def install_one(cmd, source, install, *, package=None, progress=None):
+        installed.append(package)
+
+    monkeypatch.setattr(IC, "_download_one", download_one)
+    monkeypatch.setattr(IC, "_install_one", install_one)
+
+    done, exc = IC._install_all(cmd, items)
+    assert installed == ["<test-0>", "<test-2>"]
+    assert [(i["id"], p) for i, p in done] == [("test-0", "<test-0>"), ("test-2", "<test-2>")]
+    assert isinstance(exc, RuntimeError)
+    assert_log(
+        assert_log.skip_until("Completed %s %s", ["install", "Test 0"]),
+        ("Completed %s %s", ["install", "Test 2"]),
+        ("Failed to %s %s: %s", ["install", "Test 1", "failed for test reasons"]),
+    )
+
+
+def test_install_all_pipelined_interrupted(tmp_path, monkeypatch):
+    import threading
+    import time
+    cmd = InstallCommandTestCmd(tmp_path, jobs=2, dry_run=False)
+    items = [
+        (cmd.source, {"id": f"test-{n}", "sort-version": "1.0", "display-name": f"Test {n}"})
+        for n in range(2)
+    ]
+    blocked = threading.Event()
+    cancelled = []
+
+    def download_one(cmd, source, install, download_dir, *, must_copy=False, progress=None,
+                     cancel=None):
+        if install["id"] == "test-1":
+            # Stands in for a download that only stops when cancelled
+            blocked.set()
+            cancelled.append(cancel.wait(timeout=10))
+            raise KeyboardInterrupt
+        return f"<{install['id']}>"
+
+    def install_one(cmd, source, install, *, package=None, progress=None):
+        assert blocked.wait(timeout=5)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(IC, "_download_one", download_one)
+    monkeypatch.setattr(IC, "_install_one", install_one)
+
+    start = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        IC._install_all(cmd, items)
+    assert time.monotonic() - start < 5
+    for _ in range(50):
+        if cancelled:
+            break
+        time.sleep(0.1)
+    assert cancelled == [True]
+
+
+def test_install_all_serial(tmp_path, monkeypatch, assert_log):
+    cmd = InstallCommandTestCmd(tmp_path, jobs=1, dry_run=False)
+    items = [
+        (cmd.source, {"id": f"test-{n}", "sort-version": "1.0", "display-name": f"Test {n}"})
+        for n in [0, 1, 0, 2]
+    ]
+    installed = []
+
+    def install_one(cmd, source, install, *, package=None, progress=None):
+        if install["id"] == "test-1":
+            raise RuntimeError("failed for test reasons")
+        installed.append(install["id"])
+
+    monkeypatch.setattr(IC, "_install_one", install_one)
+
+    # Failures do not stop later runtimes, and duplicates are only installed once
+    done, exc = IC._install_all(cmd, items)
+    assert installed == ["test-0", "test-2"]
+    assert [i["id"] for i, _ in done] == ["test-0", "test-2"]
+    assert isinstance(exc, RuntimeError)
+    assert_log(
+        assert_log.skip_until("Completed %s %s", ["install", "Test 0"]),
+        ("Completed %s %s", ["install", "Test 2"]),
+        ("Failed to %s %s: %s", ["install", "Test 1", "failed for test reasons"]),
+    )
@@ -1,3 +1,4 @@
+import json
 import pytest
 
 from pathlib import PurePath
@@ -128,6 +129,126 @@ def test_get_install_to_run_with_range(patched_installs):
     assert i["executable"].match("python.exe")
 
 
+def test_get_install_to_run_reads_unmanaged_lazily(patched_installs, monkeypatch):
+    from manage.exceptions import NoInstallFoundError
+    unmanaged = {
+        "unmanaged": 1,
+        "id": "PythonCore-1.5",
+        "sort-version": "1.5",
+        "company": "PythonCore",
+        "tag": "1.5",
+        "run-for": [
+            {"tag": "1.5", "target": "python.exe"},
+            {"tag": "1", "target": "python.exe"},
+        ],
+        "prefix": PurePath(r"C:\1.5"),
+        "executable": "python.exe",
+    }
+    reads = []
+
+    def get_unmanaged():
+        reads.append(1)
+        return [unmanaged]
+
+    monkeypatch.setattr(installs, "_get_unmanaged_installs", get_unmanaged)
+    monkeypatch.setattr(installs, "_get_unmanaged_run_for_tags", lambda: {("PythonCore", "1.5"), ("PythonCore", "1")})
+
+    def lazy(tag, **kwargs):
+        i = installs.get_install_to_run("<none>", "1.0", tag, **kwargs)
+        return i["id"], str(i["executable"])
+
+    def full(tag, **kwargs):
+        all_installs = installs.get_installs("<none>")
+        i = installs.select_install_to_run(all_installs, "1.0", tag, **kwargs)
+        return i["id"], str(i["executable"])
+
+    # Managed installs decide these without reading unmanaged installs
+    for tag in ["", "1.0", "2", "Company\\1.1", ">1.0"]:
+        reads.clear()
+        assert lazy(tag) == full(tag)
+        assert lazy(tag, windowed=True) == full(tag, windowed=True)
+        reads.clear()
+        lazy(tag)
+        assert not reads, tag
+
+    # An exact match on an unmanaged install beats managed prefix matches
+    reads.clear()
+    assert lazy("1")[0] == "PythonCore-1.5"
+    assert reads
+    assert lazy("1") == full("1")
+
+    # No managed match at all, so unmanaged installs are read
+    reads.clear()
+    assert lazy("1.5")[0] == "PythonCore-1.5"
+    assert reads
+    with pytest.raises(NoInstallFoundError):
+        lazy("9")
+
+
+def _match_without_index(installs_, tag, single_tag):
+    # The original linear search, kept to check the index against
+    from manage.tagutils import CompanyTag, companies_match, tag_or_range
+    exact, core, other, unmanaged, fallback = [], [], [], [], []
+    tag = tag_or_range(tag) if tag else None
+    for i in installs_:
+        matched_any = False
+        for t in i.get("run-for", ()):
+            ct = CompanyTag(i["company"], t["tag"])
+            if tag and ct == tag:
+                exact.append((i["id"], t["tag"]))
+                matched_any = True
+            elif not tag or tag.satisfied_by(ct):
+                if isinstance(tag, CompanyTag) and not companies_match(tag.company, i["company"]):
+                    fallback.append((i["id"], t["tag"]))
+                elif i.get("unmanaged"):
+                    unmanaged.append((i["id"], t["tag"]))
+                elif ct.is_core:
+                    core.append((i["id"], t["tag"]))
+                else:
+                    other.append((i["id"], t["tag"]))
+                matched_any = True
+            if single_tag and matched_any:
+                break
+    return [*exact, *core, *other, *unmanaged] or fallback
+
+
+def test_install_tag_index_matches_linear_search():
+    def make(company, tag, *run_for, **kwargs):
+        return {
+            "id": f"{company}-{tag}",
+            "company": company,
+            "tag": tag,
+            "sort-version": "1.0",
+            "run-for": [{"tag": t, "target": "python.exe"} for t in run_for],
+            **kwargs,
+        }
+    all_installs = [
+        make("---", "---", "---"),
+        make("PythonCore", "3.13t", "3.13t", "3.13t-64", "3t"),
+        make("PythonCore", "3.12-64", "3.12-64", "3.12", "3-64", "3"),
+        make("PythonCore", "3.12-32", "3.12-32", "3-32"),
+        make("PythonCore", "3.1", "3.1", "3.1.4", "3"),
+        make("Company", "3.12", "3.12", "3", "Tagged"),
+        make("CompanyTwo", "3.12", "3.12", "3.12.1.2.3.4.5.6.7.8"),
+        make("PythonCore", "3.15dev", "3.15dev", "3.*", "3.15-dev"),
+        make("Other", "", ""),
+        make("PythonCore", "2.7", "2.7", "2", "", unmanaged=1),
+    ]
+    index = installs.InstallTagIndex(all_installs)
+    for tag in [
+        "", "3", "3.1", "3.12", "3.12-32", "3.12-64", "3.13", "3.13t", "3t",
+        "3.15", "3.15.0", "3.15a1", "3.12.1.2.3.4.5.6.7.8.9", "2", "-64",
+        "Company\\3", "Comp\\3.12", "Company\\", "Other\\", "Other\\3",
+        "PythonCore\\3.12", "CPython\\3.1", "---", "Tagged", "Company\\Tag",
+        ">=3.12", "<3.12,!=3.1", ">3,<=3.13", "!=Company\\3.12", "<=Company\\3",
+    ]:
+        for single_tag in [False, True]:
+            expect = _match_without_index(all_installs, tag, single_tag)
+            for source in [all_installs, index]:
+                actual = installs.get_matching_install_tags(source, tag, single_tag=single_tag)
+                assert [(i["id"], t["tag"]) for i, t in actual] == expect, (tag, single_tag)
+
+
 def test_install_alias_make_alias_sortkey():
     assert ("pythonw00000000000000000003-00000000000000000064.exe"
             == installs._make_alias_name_sortkey("pythonw3-64.exe"))
@@ -157,3 +278,66 @@ def test_install_alias_names():
     expectw = ["py[w]3[-64].exe", "xy[w]3[-64].exe"]
     assert expect == installs.get_install_alias_names(input, friendly=True, windowed=False)
     assert expectw == installs.get_install_alias_names(input, friendly=True, windowed=True)
+
+
+def _write_install(root, tag, **kwargs):
+    d = root / f"PythonCore-{tag}"
+    d.mkdir(exist_ok=True)
+    (d / "__install__.json").write_text(json.dumps({
+        "schema": 1,
+        "id": f"PythonCore-{tag}",
+        "sort-version": tag,
+        "company": "PythonCore",
+        "tag": tag,
+        "display-name": f"Python {tag}",
+        "run-for": [{"tag": tag, "target": "python.exe"}],
+        "executable": "python.exe",
+        **kwargs,
+    }), encoding="utf-8")
+    return d
+
+
+def test_install_cache(tmp_path, monkeypatch):
+    _write_install(tmp_path, "3.10")
+    _write_install(tmp_path, "3.12")
+    ii = installs.get_installs(tmp_path, include_unmanaged=False)
+    assert [i["id"] for i in ii] == ["PythonCore-3.12", "PythonCore-3.10"]
+    assert (tmp_path / installs._INSTALL_CACHE_NAME).is_file()
+
+    def _no_scan(install_dir):
+        raise AssertionError("should have used the cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(installs, "_scan_installs", _no_scan)
+        ii2 = installs.get_installs(tmp_path, include_unmanaged=False)
+    assert [i["id"] for i in ii2] == ["PythonCore-3.12", "PythonCore-3.10"]
+    assert [i["prefix"] for i in ii2] == [i["prefix"] for i in ii]
+    assert [i["executable"] for i in ii2] == [i["executable"] for i in ii]
+
+    # New directories invalidate the cache
+    _write_install(tmp_path, "3.11")
+    ii = installs.get_installs(tmp_path, include_unmanaged=False)
+    assert [i["id"] for i in ii] == ["PythonCore-3.12", "PythonCore-3.11", "PythonCore-3.10"]
+
+    # Modified files invalidate the cache
+    _write_install(tmp_path, "3.10", **{"display-name": "Updated Python 3.10"})
+    ii = installs.get_installs(tmp_path, include_unmanaged=False)
+    assert ii[-1]["display-name"] == "Updated Python 3.10"
+
+
+def test_install_cache_corrupt(tmp_path):
+    _write_install(tmp_path, "3.12")
+    cache = tmp_path / installs._INSTALL_CACHE_NAME
+    cache.write_bytes(b"not json")
+    ii = installs.get_installs(tmp_path, include_unmanaged=False)
+    assert [i["id"] for i in ii] == ["PythonCore-3.12"]
+    assert json.loads(cache.read_bytes())["schema"] == 1
+
+
+def test_install_cache_not_written_when_broken(tmp_path):
+    _write_install(tmp_path, "3.12")
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "__install__.json").write_text("invalid")
+    ii = installs.get_installs(tmp_path, include_unmanaged=False)
+    assert [i["id"] for i in ii] == ["PythonCore-3.12"]
+    assert not (tmp_path / installs._INSTALL_CACHE_NAME).exists()
@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import sys
+
+from manage import launch
+
+
+LAUNCH_SCRIPT = r"""
+import json
+import sys
+
+import _native
+if not hasattr(_native, "coinitialize"):
+    import _native_test
+    for k in dir(_native_test):
+        if k[:1] not in ("", "_"):
+            setattr(_native, k, getattr(_native_test, k))
+
+# HACK: Work around gh-148750 in 3.15 (see conftest.py)
+import encodings
+_orig_encodings_path = encodings.__path__[:]
+import manage
+encodings.__path__[:] = _orig_encodings_path
+
+import manage.config
+manage.config.load_global_config = lambda cfg, schema: None
+manage.config.load_registry_config = lambda key, schema: {}
+
+exe, args = manage.find_one(sys.argv[1], "", "", 0, 0, 0)
+print(json.dumps({
+    "exe": exe,
+    "modules": sorted(m for m in sys.modules if m.partition(".")[0] == "manage"),
+}))
+"""
+
+
+# Modules that are imported when launching. Adding to this list makes every
+# launch slower, so please avoid it!
+LAUNCH_MODULES = {
+    "manage",
+    "manage.config",
+    "manage.exceptions",
+    "manage.installs",
+    "manage.launch",
+    "manage.launchtable",
+    "manage.logging",
+    "manage.pathutils",
+    "manage.pep514utils",
+    "manage.scriptutils",
+    "manage.tagutils",
+    "manage.verutils",
+}
+
+
+def test_launch_imports(tmp_path):
+    root = tmp_path / "root"
+    install = root / "pkgs" / "PythonCore-3.12"
+    install.mkdir(parents=True)
+    (install / "__install__.json").write_text(json.dumps({
+        "schema": 1,
+        "id": "PythonCore-3.12",
+        "sort-version": "3.12",
+        "company": "PythonCore",
+        "tag": "3.12",
+        "display-name": "Python 3.12",
+        "run-for": [{"tag": "3.12", "target": "python.exe"}],
+        "executable": "python.exe",
+    }), encoding="utf-8")
+
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(sys.path),
+        "LocalAppData": str(tmp_path / "appdata"),
+    }
+    for attempt in ("first launch", "cached launch"):
+        out = subprocess.check_output(
+            [sys.executable, "-c", LAUNCH_SCRIPT, str(root)],
+            env=env,
+            encoding="utf-8",
+        )
+        result = json.loads(out.splitlines()[-1])
+        assert result["exe"] == str(install / "python.exe"), attempt
+        modules = set(result["modules"]) - {"manage._version"}
+        assert modules == LAUNCH_MODULES, attempt
+
+
+def test_launch_config_matches_commands(tmp_path):
+    from manage.commands import load_default_config
+    cmd = load_default_config(tmp_path)
+    cfg = launch.load_launch_config(tmp_path)
+    for k in vars(launch.LaunchConfig):
+        if k.startswith("_") or callable(getattr(cfg, k)):
+            continue
+        assert getattr(cfg, k) == getattr(cmd, k), k
@@ -0,0 +1,83 @@
+import json
+import pytest
+
+import manage
+from manage import installs, launch, launchtable
+
+
+def _write_install(pkgs, tag):
+    d = pkgs / f"PythonCore-{tag}"
+    d.mkdir()
+    (d / "__install__.json").write_text(json.dumps({
+        "schema": 1,
+        "id": f"PythonCore-{tag}",
+        "sort-version": tag,
+        "company": "PythonCore",
+        "tag": tag,
+        "display-name": f"Python {tag}",
+        "run-for": [
+            {"tag": tag, "target": "python.exe"},
+            {"tag": tag, "target": "pythonw.exe", "windowed": 1},
+        ],
+        "executable": "python.exe",
+    }), encoding="utf-8")
+    return d
+
+
+class LaunchTableCmd:
+    def __init__(self, root, launch_table):
+        self.root = root
+        self.launch_table = launch_table
+
+
+@pytest.fixture
+def table_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(installs, "_get_unmanaged_installs", lambda: [])
+    monkeypatch.setattr(installs, "_get_unmanaged_run_for_tags", set)
+    root = tmp_path / "root"
+    (root / "pkgs").mkdir(parents=True)
+    return root
+
+
+def test_launch_table(table_root, tmp_path):
+    pkgs = table_root / "pkgs"
+    p312 = _write_install(pkgs, "3.12")
+    p310 = _write_install(pkgs, "3.10")
+    file = tmp_path / "launch.json"
+    launchtable.update_launch_table(LaunchTableCmd(table_root, file))
+    assert file.is_file()
+
+    def find(tag, windowed=False):
+        return launchtable.find_in_launch_table(table_root, tag, windowed, file)
+
+    assert find("") == (str(p312 / "python.exe"), "")
+    assert find("", True) == (str(p312 / "pythonw.exe"), "")
+    assert find("3.10") == (str(p310 / "python.exe"), "")
+    assert find("PythonCore\\3.10") == (str(p310 / "python.exe"), "")
+    assert find("PythonCore\\3.10", True) == (str(p310 / "pythonw.exe"), "")
+    assert find("3.11") is None
+    assert launchtable.find_in_launch_table(table_root / "other", "", False, file) is None
+
+    # Adding an install makes the table stale until it is rewritten
+    p313 = _write_install(pkgs, "3.13")
+    assert find("") is None
+    launchtable.update_launch_table(LaunchTableCmd(table_root, file))
+    assert find("") == (str(p313 / "python.exe"), "")
+
+
+def test_launch_table_ignored_without_file(table_root):
+    # Commands used in tests do not have a launch_table, and should not write
+    launchtable.update_launch_table(object())
+
+
+def test_find_one_uses_launch_table(table_root, tmp_path, monkeypatch):
+    p312 = _write_install(table_root / "pkgs", "3.12")
+    file = tmp_path / "launch.json"
+    launchtable.update_launch_table(LaunchTableCmd(table_root, file))
+
+    def _no_config(root):
+        raise AssertionError("should have used the launch table")
+
+    monkeypatch.setattr(launchtable, "get_launch_table_file", lambda: file)
+    monkeypatch.setattr(launch, "load_launch_config", _no_config)
+    assert manage.find_one(str(table_root), "", "", 0, 0, 0) == (str(p312 / "python.exe"), "")
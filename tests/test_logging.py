@@ -57,3 +57,42 @@ def test_wrap_and_indent():
         "   123456",
         "   1234567890",
     ]
+
+
+def test_multi_progress_printer_live():
+    import io
+    out = io.StringIO()
+    log = logging.Logger(print_console=out, console=out)
+    log.print_console_colour = True
+    with logging.MultiProgressPrinter(maxwidth=30, logger=log) as p:
+        t1 = p.add("A")
+        t2 = p.add("B")
+        with t1.begin("Get") as on_progress:
+            on_progress(50)
+        log.print("between")
+        with pytest.raises(RuntimeError):
+            with t2.begin("Get") as on_progress:
+                raise RuntimeError()
+    # Other output goes above the progress lines, which are redrawn after it
+    before, _, after = out.getvalue().partition("between\n")
+    assert before.endswith("\033[2F\033[J")
+    assert after.startswith("A: Get: ")
+    lines = out.getvalue().rpartition("\033[J")[2].splitlines()
+    assert lines == [
+        "A: Get: " + "." * 19 + p._marks[True],
+        "B: Get: " + p._marks[False],
+    ]
+    assert log._live_progress is None
+
+
+def test_multi_progress_printer_not_live():
+    import io
+    out = io.StringIO()
+    log = logging.Logger(print_console=out, console=out)
+    log.print_console_colour = False
+    with logging.MultiProgressPrinter(maxwidth=30, logger=log) as p:
+        t1 = p.add("A")
+        with t1.begin("Get") as on_progress:
+            on_progress(50)
+            assert not out.getvalue()
+    assert out.getvalue() == "A: Get: " + "." * 19 + p._marks[True] + "\n"
@@ -58,3 +58,72 @@ def test_is_tag_managed_warning(registry, tmp_path, assert_log):
         "Registry key %s appears invalid.+",
         assert_log.skip_until("An existing registry key for %s"),
     )
+
+
+def test_unmanaged_installs_cached(fake_registry, tmp_path, monkeypatch):
+    monkeypatch.setenv("LocalAppData", str(tmp_path / "appdata"))
+    (tmp_path / "appdata" / "Microsoft" / "WindowsApps").mkdir(parents=True)
+    fake_registry.setup(winreg.HKEY_CURRENT_USER, r"SOFTWARE\Python", PythonCore={
+        "3.10": {"InstallPath": {"": r"C:\Python310"}},
+        "3.11": {"InstallPath": {"": r"C:\Python311"}, "ManagedByPyManager": 1},
+    })
+    cache_file = tmp_path / "cache.json"
+
+    def get_ids():
+        installs = pep514utils.get_unmanaged_installs(backend=fake_registry, cache_file=cache_file)
+        return [i["id"] for i in installs]
+
+    assert get_ids() == ["__unmanaged-PythonCore-3.10"]
+    assert cache_file.is_file()
+
+    reads = fake_registry.value_reads
+    installs = pep514utils.get_unmanaged_installs(backend=fake_registry, cache_file=cache_file)
+    assert fake_registry.value_reads == reads
+    assert [i["id"] for i in installs] == ["__unmanaged-PythonCore-3.10"]
+    assert installs[0]["executable"].match("python.exe")
+
+    # New roots invalidate the cache
+    fake_registry.setup(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Python", x86_only=True, PythonCore={
+        "3.9-32": {"InstallPath": {"": r"C:\Python39-32"}},
+    })
+    assert get_ids() == ["__unmanaged-PythonCore-3.10", "__unmanaged-PythonCore-3.9-32"]
+
+    # New tags in existing companies invalidate the cache
+    fake_registry.setup(winreg.HKEY_CURRENT_USER, r"SOFTWARE\Python\PythonCore", **{
+        "3.12": {"InstallPath": {"": r"C:\Python312"}},
+    })
+    assert get_ids() == [
+        "__unmanaged-PythonCore-3.10",
+        "__unmanaged-PythonCore-3.12",
+        "__unmanaged-PythonCore-3.9-32",
+    ]
+
+
+def test_unmanaged_state(fake_registry, tmp_path, monkeypatch):
+    monkeypatch.setenv("LocalAppData", str(tmp_path))
+    state = pep514utils.get_unmanaged_state(fake_registry)
+    assert state == {"HKCU": None, "HKLM-64": None, "HKLM-32": None, "Store": None}
+    fake_registry.setup(winreg.HKEY_CURRENT_USER, r"SOFTWARE\Python", Company={"1.0": {}})
+    state2 = pep514utils.get_unmanaged_state(fake_registry)
+    assert state2["HKCU"]
+    assert pep514utils.get_unmanaged_state(fake_registry) == state2
+
+
+def test_unmanaged_run_for_tags(fake_registry, tmp_path, monkeypatch):
+    monkeypatch.setenv("LocalAppData", str(tmp_path))
+    store = tmp_path / "Microsoft" / "WindowsApps"
+    (store / "PythonSoftwareFoundation.Python.3.13_qbz5n2kfra8p0").mkdir(parents=True)
+    fake_registry.setup(winreg.HKEY_CURRENT_USER, r"SOFTWARE\Python", PythonCore={
+        "3.10": {"InstallPath": {"": r"C:\Python310"}},
+    }, Company={
+        "Tag": {"InstallPath": {"": r"C:\Company"}},
+    })
+    tags = pep514utils.get_unmanaged_run_for_tags(fake_registry)
+    assert fake_registry.value_reads == 0
+    assert tags == {
+        ("PythonCore", "3.10"),
+        ("PythonCore", "3"),
+        ("Company", "Tag"),
+        ("PythonCore", "3.13"),
+        ("PythonCore", "3.13-64"),
+    }
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+from urllib.request import urlopen
+
+
+SCRIPTS = Path(__file__).absolute().parent.parent / "scripts"
+
+
+def test_generate_nuget_index(localserver, tmp_path):
+    def stats():
+        with urlopen(localserver + "/nuget/stats") as r:
+            return json.load(r)
+
+    env = {
+        **os.environ,
+        "NUGET_SOURCE": localserver + "/nuget/index.json",
+        "NUGET_CACHE": str(tmp_path / "cache"),
+        "NUGET_WORKERS": "2",
+    }
+    outputs = []
+    results = []
+    for run in range(2):
+        before = stats()
+        out = tmp_path / f"run{run}" / "index.json"
+        subprocess.check_call(
+            [sys.executable, SCRIPTS / "generate-nuget-index.py", out],
+            env=env,
+        )
+        after = stats()
+        results.append({k: after[k] - before[k] for k in after})
+        outputs.append(json.loads(out.read_text(encoding="utf-8")))
+
+    # Service index and one request for each of the six packages
+    assert results[0]["requests"] == 7
+    assert results[0]["full"] == 7
+    # The main thread and two workers each reuse their connection
+    assert results[0]["connections"] <= 3
+    # Everything is revalidated on the second run
+    assert results[1]["requests"] == 7
+    assert results[1]["full"] == 0
+
+    assert outputs[0] == outputs[1]
+    ids = [i["id"] for i in outputs[0]["versions"]]
+    assert "pythoncore-3.14-64" in ids
+    assert "pythoncore-3.13-arm64" in ids
+    assert outputs[0]["next"] == "index-legacy.json"
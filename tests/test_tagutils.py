@@ -1,6 +1,6 @@
 import pytest
 
-from manage.tagutils import CompanyTag, TagRange
+from manage.tagutils import CompanyTag, TagIndex, TagRange, install_matches_any, installs_matching_any, tag_or_range
 
 
 @pytest.mark.parametrize("tag_str", [
@@ -135,3 +135,79 @@ def test_tag_concatenate():
     assert CompanyTag("3.13") + "-64" == CompanyTag("3.13-64")
     assert CompanyTag("3.13-64") + "-64" == CompanyTag("3.13-64-64")
     assert CompanyTag("3.13-arm64") + "-64" == CompanyTag("3.13-arm64-64")
+
+
+def test_tag_parse_cached():
+    t1 = CompanyTag("Company", "3.13-64")
+    t2 = CompanyTag("Company\\3.13-64")
+    assert t1 is not t2
+    assert t1 == t2
+    assert t1._company is t2._company
+    assert t1._sortkey is t2._sortkey
+    assert not hasattr(t1, "__dict__")
+    # Company keys are cached separately for loose and strict matching
+    assert CompanyTag("Company\\3.13", loose_company=False)._company is not t1._company
+    assert CompanyTag("Company\\3.13").match(CompanyTag("Comp\\3.13"))
+
+
+def _random_tag(rnd, with_company=True):
+    v = ".".join(str(rnd.randrange(4)) for _ in range(rnd.randrange(1, 4)))
+    v += rnd.choice(["", "", "t", "a1", "-embed", "-1.0", "-dev"])
+    v += rnd.choice(["", "", "-64", "-32", "-arm64"])
+    if with_company:
+        v = rnd.choice(["", "PythonCore\\", "Company\\", "CompanyTwo\\", "Comp\\"]) + v
+    return v
+
+
+def _satisfied(tag_range, tag):
+    # Some mismatched tags raise when compared, depending on the order that
+    # ranges are checked. The index may exclude these, so we treat them as
+    # not matching.
+    try:
+        return tag_range.satisfied_by(tag)
+    except AttributeError:
+        return False
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tag_index_range_matches_linear_search(seed):
+    import random
+    rnd = random.Random(seed)
+    tags = [CompanyTag(_random_tag(rnd)) for _ in range(300)]
+    tags.append(CompanyTag("Company", ""))
+    tags.append(CompanyTag("Company", "Version1"))
+    index = TagIndex()
+    for n, t in enumerate(tags):
+        index.add(t, n)
+
+    ops = ["=", "==", "~=", ">=", ">", "<=", "<", "!="]
+    for _ in range(100):
+        spec = ",".join(rnd.choice(ops) + _random_tag(rnd, rnd.random() < 0.3)
+                        for _ in range(rnd.randrange(1, 4)))
+        r = TagRange(spec)
+        expect = [n for n, t in enumerate(tags) if _satisfied(r, t)]
+        actual = [n for t, n in index.candidates(r) if _satisfied(r, t)]
+        assert actual == expect, spec
+
+    # Ranges should only return the tags near their bounds
+    r = TagRange(">=Company\\1.1,<Company\\1.2")
+    assert len(index.candidates(r)) < len(tags) // 10
+
+
+def test_installs_matching_any():
+    import random
+    rnd = random.Random(0)
+    installs = []
+    for n in range(100):
+        company, _, tag = _random_tag(rnd).rpartition("\\")
+        installs.append({
+            "company": company,
+            "tag": tag,
+            "install-for": [tag, tag.partition(".")[0]],
+            "default": n == 50,
+        })
+    for spec in ["3", "Company\\1", ">=1.2", "<2,!=1.1", "", ">Comp\\1"]:
+        for loose in (False, True):
+            filters = [tag_or_range(spec)]
+            expect = [i for i in installs if install_matches_any(i, filters, loose_company=loose)]
+            assert installs_matching_any(installs, filters, loose_company=loose) == expect, spec
@@ -304,6 +304,184 @@ def test_urllib_urlretrieve(local_128kb, tmp_path):
     assert sorted(progress) == progress
 
 
+def _ranged_request(url, tmp_path):
+    req = UU._Request(url)
+    req.outfile = tmp_path / "read.bin"
+    req.chunksize = 4096
+    req.segments = 4
+    req.min_segment_size = 16 * 1024
+    req.progress = []
+    req._on_progress = req.progress.append
+    return req
+
+
+def _ranged_stats(localserver):
+    import json
+    from urllib.request import urlopen
+    with urlopen(localserver + "/ranged/stats") as r:
+        return json.load(r)
+
+
+def test_urllib_urlretrieve_segmented(localserver, tmp_path):
+    _ranged_stats(localserver)
+    req = _ranged_request(localserver + "/ranged/256", tmp_path)
+    UU._urllib_urlretrieve(req)
+    assert req.outfile.read_bytes() == bytes(i % 251 for i in range(256 * 1024))
+    assert req.progress[:1] + req.progress[-1:] == [0, 100]
+    assert sorted(req.progress) == req.progress
+    # The first request is used for the first segment
+    assert sorted(_ranged_stats(localserver), key=str) == [
+        None,
+        "bytes=131072-196607",
+        "bytes=196608-262143",
+        "bytes=65536-131071",
+    ]
+
+
+def test_urllib_urlretrieve_segmented_hashes(localserver, tmp_path):
+    import hashlib
+    expect = bytes(i % 251 for i in range(256 * 1024))
+    req = _ranged_request(localserver + "/ranged/256", tmp_path)
+    req.hashes = ("sha256", "md5")
+    UU._urllib_urlretrieve(req)
+    assert req.outfile.read_bytes() == expect
+    assert req.digests == {
+        "sha256": hashlib.sha256(expect).hexdigest(),
+        "md5": hashlib.md5(expect).hexdigest(),
+    }
+
+
+@pytest.mark.parametrize("kib, chunksize", [(250, 1000), (300, 3000)])
+def test_urllib_urlretrieve_segmented_hashes_unaligned(localserver, tmp_path, kib, chunksize):
+    # Segments and reads that do not line up with file buffers must not hash
+    # any part of the file before it has been written.
+    import hashlib
+    expect = bytes(i % 251 for i in range(kib * 1024))
+    req = _ranged_request(localserver + f"/ranged/{kib}", tmp_path)
+    req.chunksize = chunksize
+    req.hashes = ("sha256",)
+    UU._urllib_urlretrieve(req)
+    assert req.outfile.read_bytes() == expect
+    assert req.digests == {"sha256": hashlib.sha256(expect).hexdigest()}
+
+
+def test_urlretrieve_file_hashes(tmp_path):
+    import hashlib
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"0123456789" * 1000)
+    dest = tmp_path / "dest.bin"
+    digests = UU.urlretrieve(src.as_uri(), dest, chunksize=1024, hashes=["sha256"])
+    assert dest.read_bytes() == src.read_bytes()
+    assert digests == {"sha256": hashlib.sha256(src.read_bytes()).hexdigest()}
+    assert UU.urlretrieve(src.as_uri(), dest) is None
+
+
+def test_urllib_urlretrieve_segmented_small(localserver, tmp_path):
+    _ranged_stats(localserver)
+    req = _ranged_request(localserver + "/ranged/20", tmp_path)
+    UU._urllib_urlretrieve(req)
+    assert req.outfile.read_bytes() == bytes(i % 251 for i in range(20 * 1024))
+    # Too small to split
+    assert _ranged_stats(localserver) == [None]
+
+
+def test_urllib_urlretrieve_segmented_fallback(localserver, tmp_path):
+    req = _ranged_request(localserver + "/ranged-ignored/256", tmp_path)
+    UU._urllib_urlretrieve(req)
+    assert req.outfile.read_bytes() == bytes(i % 251 for i in range(256 * 1024))
+    assert req.progress[-1] == 100
+
+
+def test_urllib_urlretrieve_resume(localserver, tmp_path, assert_log):
+    expect = bytes(i % 251 for i in range(1024 * 1024))
+    req = _ranged_request(localserver + "/ranged/1024", tmp_path)
+    req.min_segment_size = 256 * 1024
+
+    def interrupt(progress):
+        if progress:
+            raise KeyboardInterrupt
+    req._on_progress = interrupt
+    req._on_cancel = lambda: True
+    with pytest.raises(KeyboardInterrupt):
+        UU._urllib_urlretrieve(req)
+    partial = UU._PartialDownload(req)
+    assert partial.load()
+    assert not req.outfile.exists()
+    written = partial.written()
+    assert 0 < written < len(expect)
+
+    _ranged_stats(localserver)
+    req = _ranged_request(localserver + "/ranged/1024", tmp_path)
+    req.hashes = ("sha256",)
+    UU._urllib_urlretrieve(req)
+    assert req.outfile.read_bytes() == expect
+    # Data that was downloaded before resuming is included in the hash
+    import hashlib
+    assert req.digests == {"sha256": hashlib.sha256(expect).hexdigest()}
+    assert not partial.file.exists()
+    assert not partial.state_file.exists()
+    # Only the remaining part of each segment was requested
+    ranges = [r.partition("=")[2].split("-") for r in _ranged_stats(localserver)]
+    assert sum(int(last) - int(first) + 1 for first, last in ranges) == len(expect) - written
+    assert_log(assert_log.skip_until("Resuming download from %s of %s bytes"))
+
+
+def test_urllib_urlretrieve_cancel_event(localserver, tmp_path):
+    import threading
+    req = _ranged_request(localserver + "/ranged/1024", tmp_path)
+    req.min_segment_size = 256 * 1024
+    req.cancel_event = threading.Event()
+    asked = []
+    req._on_cancel = lambda: asked.append(1)
+
+    def cancel(progress):
+        if progress:
+            req.cancel_event.set()
+    req._on_progress = cancel
+    with pytest.raises(KeyboardInterrupt):
+        UU._urllib_urlretrieve(req)
+    # Cancelling from another thread does not prompt, and can be resumed
+    assert not asked
+    assert not req.outfile.exists()
+    assert UU._PartialDownload(req).load()
+
+
+def test_urlretrieve_resume(localserver, tmp_path, monkeypatch):
+    # The public function uses our own Path type for the output file
+    monkeypatch.setattr(UU, "ENABLE_BITS", False)
+    monkeypatch.setattr(UU, "ENABLE_WINHTTP", False)
+    monkeypatch.setattr(UU, "ENABLE_POWERSHELL", False)
+    expect = bytes(i % 251 for i in range(256 * 1024))
+    dest = tmp_path / "read.bin"
+    req = _ranged_request(localserver + "/ranged/256", tmp_path)
+    partial = UU._PartialDownload(req)
+    partial.start(len(expect), '"ranged-262144"', [(0, len(expect) - 1)])
+    with open(partial.file, "r+b") as f:
+        f.write(expect[:1024])
+    partial.segments[0][2] = 1024
+    partial.save(force=True)
+
+    _ranged_stats(localserver)
+    UU.urlretrieve(localserver + "/ranged/256", dest)
+    assert dest.read_bytes() == expect
+    assert not partial.file.exists()
+    assert _ranged_stats(localserver) == [f"bytes=1024-{len(expect) - 1}"]
+
+
+def test_urllib_urlretrieve_resume_changed(localserver, tmp_path, assert_log):
+    import json
+    expect = bytes(i % 251 for i in range(256 * 1024))
+    req = _ranged_request(localserver + "/ranged/256", tmp_path)
+    partial = UU._PartialDownload(req)
+    partial.start(len(expect), '"previous"', [(0, len(expect) - 1)])
+    partial.segments[0][2] = 1024
+    partial.save(force=True)
+
+    UU._urllib_urlretrieve(req)
+    assert req.outfile.read_bytes() == expect
+    assert_log(assert_log.skip_until("Restarting download because the file has changed"))
+
+
 def test_urllib_urlopen(local_1kb):
     progress = local_1kb.progress
     data = UU._urllib_urlopen(local_1kb)
@@ -561,3 +739,175 @@ def test_bits_errors(localserver, tmp_path, inject_error):
     # The final error is the missing message
     assert ex.value.winerror & 0xFFFFFFFF == ERROR_MR_MID_NOT_FOUND
 
+
+
+@pytest.mark.parametrize("value, expect", [
+    (None, None),
+    ("", None),
+    ("public, max-age=60", 60),
+    ('max-age="60"', 60),
+    ("max-age=60, no-cache", 0),
+    ("no-cache, max-age=60", 0),
+    ("max-age=invalid", 0),
+    ("max-age=60, no-store", -1),
+])
+def test_cache_control_max_age(value, expect):
+    assert UU._cache_control_max_age(value) == expect
+
+
+class IndexCacheCmd:
+    source_settings = {}
+
+    def __init__(self, download_dir, max_age):
+        self.download_dir = download_dir
+        self.index_cache_max_age = max_age
+
+
+def _fetch_index(cmd, url):
+    return list(UU.IndexDownloader(cmd, url, lambda url, data: data))
+
+
+def test_index_cache(localserver, tmp_path, monkeypatch):
+    # Only the urllib backend reports the validators needed to revalidate
+    monkeypatch.setattr(UU, "ENABLE_WINHTTP", False)
+    url = localserver + "/cached/index.json"
+    cache_dir = tmp_path / UU.INDEX_CACHE_DIR_NAME
+
+    cmd = IndexCacheCmd(tmp_path, 0)
+    first = _fetch_index(cmd, url)
+    assert len(list(cache_dir.glob("*.cache"))) == 1
+    # A 304 response reuses the cached copy
+    assert _fetch_index(cmd, url) == first
+
+    # Fresh entries are used without any request
+    cmd.index_cache_max_age = 3600
+    def no_request(*args, **kwargs):
+        raise AssertionError("unexpected request")
+    with monkeypatch.context() as m:
+        m.setattr(UU, "urlopen", no_request)
+        assert _fetch_index(cmd, url) == first
+
+    # Disabling the cache always requests the full index
+    cmd.index_cache_max_age = -1
+    assert _fetch_index(cmd, url)[0]["count"] > first[0]["count"]
+
+    # Revalidate using the last modified time alone
+    cmd.index_cache_max_age = 0
+    UU.IndexCache(cache_dir, 0).put(url, b'{"count": -1}', {
+        "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+    })
+    assert _fetch_index(cmd, url) == [{"count": -1}]
+
+    # Responses marked no-store are not kept
+    for f in cache_dir.glob("*.cache"):
+        f.unlink()
+    _fetch_index(cmd, localserver + "/cached/index.nostore.json")
+    assert not list(cache_dir.glob("*.cache"))
+
+
+def test_index_prefetch(localserver):
+    url = localserver + "/chain/1.json"
+    def index_cls(url, data):
+        return data["page"]
+    assert list(UU.IndexDownloader(None, url, index_cls)) == [1, 2, 3]
+
+    fetched = []
+    with UU.IndexDownloader(None, url, index_cls, prefetch=True) as idx:
+        orig_fetch = idx._fetch
+        def fetch(u, accept, **kwargs):
+            fetched.append(u.rpartition("/")[2])
+            return orig_fetch(u, accept, **kwargs)
+        idx._fetch = fetch
+        assert next(idx) == 1
+        assert idx._prefetch.url == localserver + "/chain/2.json"
+        assert list(idx) == [2, 3]
+    # Each page is only downloaded once
+    assert fetched == ["1.json", "2.json", "3.json"]
+
+    # Stopping early discards the page being prefetched
+    idx = UU.IndexDownloader(None, url, index_cls, prefetch=True)
+    assert next(idx) == 1
+    prefetch = idx._prefetch
+    idx.close()
+    assert prefetch.cancelled
+    assert not idx._prefetch
+
+
+def test_index_prefetch_cancel(localserver, tmp_path):
+    import threading
+    url = localserver + "/chain/1.json"
+    idx = UU.IndexDownloader(IndexCacheCmd(tmp_path, 0), url, lambda url, data: data["page"],
+                             prefetch=True)
+    started = threading.Event()
+    orig_urlopen = idx._urlopen
+    def urlopen(u, *args, cancel_event=None, **kwargs):
+        if cancel_event:
+            # Stands in for a backend that cannot be interrupted
+            started.set()
+            assert cancel_event.wait(5)
+        return orig_urlopen(u, *args, cancel_event=cancel_event, **kwargs)
+    idx._urlopen = urlopen
+
+    assert next(idx) == 1
+    assert started.wait(5)
+    prefetch = idx._prefetch
+    idx.close()
+    assert prefetch.cancelled
+    assert not prefetch._thread.is_alive()
+    assert prefetch.result() == (None, None)
+    # The cancelled page was not written to the disk cache
+    assert len(list((tmp_path / UU.INDEX_CACHE_DIR_NAME).glob("*.cache"))) == 1
+
+
+def test_index_shards(localserver):
+    url = localserver + "/chain/manifest.json"
+    def index_cls(url, data):
+        return data["page"]
+    # Shards are read instead of following 'next'
+    assert list(UU.IndexDownloader(None, url, index_cls)) == [0, 1, 2, 3]
+    assert list(UU.IndexDownloader(None, url, index_cls, tags=[""])) == [0, 1, 2, 3]
+    # Shards without any matching tags are skipped. Shards that do not list
+    # their tags are always read.
+    assert list(UU.IndexDownloader(None, url, index_cls, tags=["3.13"])) == [0, 1, 3]
+    assert list(UU.IndexDownloader(None, url, index_cls, tags=["Company\\3"])) == [0, 2, 3]
+    assert list(UU.IndexDownloader(None, url, index_cls, tags=["3.15", ">=3.12"])) == [0, 1, 2, 3]
+    assert list(UU.IndexDownloader(None, url, index_cls, tags=["<3.12"])) == [0, 3]
+
+    fetched = []
+    with UU.IndexDownloader(None, url, index_cls, prefetch=True, tags=["3.12"]) as idx:
+        orig_fetch = idx._fetch
+        def fetch(u, accept, **kwargs):
+            fetched.append(u.rpartition("/")[2])
+            return orig_fetch(u, accept, **kwargs)
+        idx._fetch = fetch
+        assert next(idx) == 0
+        assert idx._prefetch.url == localserver + "/chain/2.json"
+        assert list(idx) == [2, 3]
+    assert fetched == ["manifest.json", "2.json", "3.json"]
+
+
+def test_compressed_index(localserver, monkeypatch):
+    import json
+    monkeypatch.setattr(UU, "ENABLE_WINHTTP", False)
+    url = localserver + "/compressed/index.json"
+    assert json.loads(UU.urlopen(url))["encoding"] == "None"
+    try:
+        from compression import zstd
+    except ImportError:
+        expect = "gzip"
+    else:
+        expect = "zstd"
+    assert json.loads(UU.urlopen(url, compressed=True))["encoding"] == expect
+
+    # Index pages are requested compressed
+    index = next(UU.IndexDownloader(None, url, lambda url, data: data))
+    assert index["encoding"] == expect
+
+    # Without zstd support we fall back to gzip
+    import gzip
+    monkeypatch.setattr(UU, "_get_content_decoders", lambda: {"gzip": gzip.decompress})
+    assert json.loads(UU.urlopen(url, compressed=True))["encoding"] == "gzip"
+
+    with pytest.raises(OSError):
+        UU._decode_content(b"data", "br", {})
+    assert UU._decode_content(b"data", "identity", {}) == b"data"
@@ -290,3 +290,52 @@ def test_verify_index_not_later(assert_log):
         "Fetching.+",
         "No signature to verify for %s",
     )
+
+
+def test_verify_index_remembered(tmp_path, monkeypatch):
+    import _native
+    calls = []
+    def fake_verify_trust(*args):
+        calls.append(args[2:])
+    monkeypatch.setattr(_native, "verify_trust", fake_verify_trust)
+
+    cmd = MockConfig()
+    cmd.download_dir = tmp_path / "cache"
+    cmd.index_cache_max_age = 0
+    dest = tmp_path / INDEX_NAMES[0]
+    shutil.copy2(TEST_INDEX, dest)
+    shutil.copy2(TEST_CAT, dest.with_suffix(".json.cat"))
+    cmd.source_settings[dest.as_uri()] = MockConfig.REQUIRE_FULL
+
+    def verify():
+        idx = IndexDownloader(cmd, dest.as_uri(), MockIndex)
+        return next(idx)
+
+    verify()
+    assert len(calls) == 1
+    verify()
+    assert len(calls) == 1
+
+    # Any changed setting or content requires verifying again
+    cmd.source_settings[dest.as_uri()] = MockConfig.REQUIRE_LEAF
+    verify()
+    assert len(calls) == 2
+    dest.write_bytes(dest.read_bytes() + b" ")
+    verify()
+    assert len(calls) == 3
+    dest.with_suffix(".json.cat").write_bytes(Path(UNTRUSTED_CAT).read_bytes())
+    verify()
+    assert len(calls) == 4
+    verify()
+    assert len(calls) == 4
+
+    # Failed verification is never remembered
+    def fail_verify_trust(*args):
+        calls.append(args[2:])
+        raise OSError("not trusted")
+    monkeypatch.setattr(_native, "verify_trust", fail_verify_trust)
+    dest.write_bytes(dest.read_bytes() + b" ")
+    for _ in range(2):
+        with pytest.raises(InvalidFeedError):
+            verify()
+    assert len(calls) == 6
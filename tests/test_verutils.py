@@ -21,8 +21,11 @@ def test_long_version(assert_log):
     v = "3.1.2.3.4.5.6.7.8.9"
     v2 = "3.1.2.3.4.5.6.7"
     Version(v)
+    # Parsing is cached, but the warning is repeated
+    Version(v)
     assert_log(
         (".*is too long.*", (v, v2)),
+        (".*is too long.*", (v, v2)),
     )
 
 
@@ -67,3 +70,13 @@ def test_version_startswith():
     assert Version("3.13.0").startswith(Version("3.13"))
     assert Version("3.13.0").startswith(Version("3.13.0"))
     assert not Version("3.13").startswith(Version("3.13.0"))
+
+
+def test_version_parse_cached():
+    v1 = Version("3.14.0b2")
+    v2 = Version("3.14.0b2")
+    assert v1 is not v2
+    assert v1.sortkey is v2.sortkey
+    assert not hasattr(v1, "__dict__")
+    with pytest.raises(ValueError):
+        Version("not a version")